@@ -1,9 +1,13 @@
 from dataclasses import dataclass
-from typing import Optional
-from ..llm.base import LLMClient
+from typing import Awaitable, Callable, List, Optional
+from ..llm.base import ChatMessage, LLMClient
 from ..storage.memory_store import Chat
 
 
+# Called with each text delta as the LLM streams its answer.
+TokenCallback = Callable[[str], Awaitable[None]]
+
+
 @dataclass
 class AgentResult:
     text: str
@@ -14,6 +18,8 @@ class BaseAgent:
     id: str
     name: str
     description: str
+    # Fixed instructions sent with every run; part of the result cache key.
+    system_prompt: str = ""
 
     async def run(
         self,
@@ -21,5 +27,43 @@ class BaseAgent:
         prompt: str,
         llm_client: LLMClient,
         chat: Chat,
+        on_token: Optional[TokenCallback] = None,
+        history: Optional[List[ChatMessage]] = None,
     ) -> AgentResult:
+        """
+        ``history`` holds the chat's earlier turns (already bounded by the
+        context builder) for follow-up jobs; agents place it after their
+        stable prompt prefix.
+        """
         raise NotImplementedError
+
+    def batch_messages(self, prompt: str) -> Optional[List[ChatMessage]]:
+        """
+        Messages for a single provider batch request producing this agent's
+        output (offline mode), or None if the agent needs several dependent
+        calls; such jobs run online instead.
+        """
+        return None
+
+    async def from_completion(self, job_id: str, prompt: str, text: str) -> AgentResult:
+        """Turn an offline batch completion into the agent's result."""
+        return AgentResult(text=text)
+
+    @staticmethod
+    async def complete(
+        llm_client: LLMClient,
+        messages: List[ChatMessage],
+        on_token: Optional[TokenCallback] = None,
+    ) -> str:
+        """
+        Run one completion. When ``on_token`` is given the completion is
+        streamed and every delta is forwarded as it arrives.
+        """
+        if on_token is None:
+            return await llm_client.chat(messages)
+
+        parts: List[str] = []
+        async for delta in llm_client.stream(messages):
+            parts.append(delta)
+            await on_token(delta)
+        return "".join(parts)
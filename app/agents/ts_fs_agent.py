@@ -1,16 +1,47 @@
-from pathlib import Path
-from .base_agent import BaseAgent, AgentResult
+import asyncio
+from typing import List, Optional
+
+from .base_agent import BaseAgent, AgentResult, TokenCallback
+from ..config import settings
 from ..llm.base import ChatMessage
 from ..rag.simple_rag import get_context_for_abap
 from ..storage.memory_store import Chat
 from ..llm.base import LLMClient
-from ..utils.docx_generator import create_ts_docx
+from ..utils.abap_parser import AbapProgram, AbapUnit, group_units, parse_abap
+from ..utils.docx_generator import GENERATED_DIR, StreamingDocxBuilder, render_ts_docx
+from ..utils.logger import logger
+from ..utils.tracing import span
+
+
+SYSTEM_PROMPT = (
+    "You are an expert SAP ABAP Technical Architect. "
+    "Generate a comprehensive Technical Specification (TS) for the given ABAP code.\n"
+    "Use the RAG knowledge base context for structure and best practices.\n"
+    "Output as well structured markdown with clear sections like:\n"
+    "## Introduction\n## Business Requirement Overview\n## Solution Overview\n"
+    "## SAP Objects\n## Data Model\n## Processing Logic\n## Error Handling\n## Performance & Security\n"
+    "## Transport & Dependencies\n"
+)
+
+UNIT_SYSTEM_PROMPT = (
+    "You are an expert SAP ABAP Technical Architect documenting one part of a larger program. "
+    "For the given code units, write concise markdown notes covering: purpose, SAP objects and "
+    "tables used, processing logic step by step, error handling/messages, and performance or "
+    "security observations. Do not write an introduction or a full TS; your notes will be merged "
+    "with notes for the other units.\n"
+)
+
+
+def _rag_query(program: AbapProgram, code: str) -> str:
+    # Object names first so they are always part of the query, then the code.
+    return "\n".join(program.sap_objects()) + "\n" + code
 
 
 class TSFSAgent(BaseAgent):
     id = "ts_fs_agent"
     name = "TS/FS Generator"
     description = "Takes ABAP code and generates Technical Specification using RAG KB (outputs DOCX)."
+    system_prompt = SYSTEM_PROMPT + UNIT_SYSTEM_PROMPT
 
     async def run(
         self,
@@ -18,42 +49,147 @@ class TSFSAgent(BaseAgent):
         prompt: str,
         llm_client: LLMClient,
         chat: Chat,
+        on_token: Optional[TokenCallback] = None,
+        history: Optional[List[ChatMessage]] = None,
     ) -> AgentResult:
         # prompt = ABAP code
         abap_code = prompt
-        rag_ctx = get_context_for_abap(abap_code)
+        program = parse_abap(abap_code)
+        groups = group_units(program.units, settings.ABAP_UNIT_CHARS)
 
-        system_msg = ChatMessage(
-            role="system",
-            content=(
-                "You are an expert SAP ABAP Technical Architect. "
-                "Generate a comprehensive Technical Specification (TS) for the given ABAP code.\n"
-                "Use the RAG knowledge base context for structure and best practices.\n"
-                "Output as well structured markdown with clear sections like:\n"
-                "## Introduction\n## Business Requirement Overview\n## Solution Overview\n"
-                "## SAP Objects\n## Data Model\n## Processing Logic\n## Error Handling\n## Performance & Security\n"
-                "## Transport & Dependencies\n"
-            ),
-        )
+        # The DOCX is built from the final completion as it streams, so it
+        # is ready moments after the last token.
+        output_path = GENERATED_DIR / f"{job_id}_ts.docx"
+        docx_builder = StreamingDocxBuilder(output_path)
 
-        user_msg = ChatMessage(
-            role="user",
-            content=(
-                "ABAP code:\n\n"
-                f"{abap_code}\n\n"
-                "RAG context:\n\n"
-                f"{rag_ctx}\n"
-            ),
-        )
+        async def on_delta(text: str) -> None:
+            await docx_builder.feed(text)
+            if on_token is not None:
+                await on_token(text)
 
-        ts_markdown = await llm_client.chat([system_msg, user_msg])
+        try:
+            if len(abap_code) <= settings.ABAP_SINGLE_PASS_CHARS or len(groups) <= 1:
+                ts_markdown = await self._generate_single(abap_code, program, llm_client, on_delta, history)
+            else:
+                logger.info(f"[TSFSAgent] Job {job_id}: {len(program.units)} units in {len(groups)} groups")
+                ts_markdown = await self._generate_by_units(groups, abap_code, program, llm_client, on_delta, history)
+        except BaseException:
+            await docx_builder.abort()
+            raise
 
-        # Save DOCX
-        output_dir = Path(__file__).resolve().parents[2] / "generated"
-        output_path = output_dir / f"{job_id}_ts.docx"
-        create_ts_docx(ts_markdown, output_path)
+        # Rendering overlaps the stream; this is only the tail after the last token.
+        with span("docx_finish"):
+            await docx_builder.finish()
 
         return AgentResult(
             text=ts_markdown,
             output_docx_path=str(output_path),
         )
+
+    def batch_messages(self, prompt: str) -> Optional[List[ChatMessage]]:
+        # Programs that need unit-by-unit generation take several dependent
+        # calls and are run online.
+        program = parse_abap(prompt)
+        if len(prompt) > settings.ABAP_SINGLE_PASS_CHARS and len(group_units(program.units, settings.ABAP_UNIT_CHARS)) > 1:
+            return None
+        return self._single_messages(prompt, program)
+
+    async def from_completion(self, job_id: str, prompt: str, text: str) -> AgentResult:
+        output_path = GENERATED_DIR / f"{job_id}_ts.docx"
+        await render_ts_docx(text, output_path)
+        return AgentResult(text=text, output_docx_path=str(output_path))
+
+    @staticmethod
+    def _single_messages(
+        abap_code: str,
+        program: AbapProgram,
+        history: Optional[List[ChatMessage]] = None,
+    ) -> List[ChatMessage]:
+        # Stable content first so providers can cache the prefix: the fixed
+        # system prompt, then the RAG context (often identical for similar
+        # programs), then earlier turns, then the code.
+        rag_ctx = get_context_for_abap(_rag_query(program, abap_code))
+        return [
+            ChatMessage(role="system", content=SYSTEM_PROMPT, cache=True),
+            ChatMessage(role="user", content=f"RAG context:\n\n{rag_ctx}\n", cache=True),
+            *(history or []),
+            ChatMessage(role="user", content=f"ABAP code:\n\n{abap_code}\n"),
+        ]
+
+    async def _generate_single(
+        self,
+        abap_code: str,
+        program: AbapProgram,
+        llm_client: LLMClient,
+        on_token: Optional[TokenCallback] = None,
+        history: Optional[List[ChatMessage]] = None,
+    ) -> str:
+        return await self.complete(llm_client, self._single_messages(abap_code, program, history), on_token)
+
+    async def _generate_by_units(
+        self,
+        groups: List[List[AbapUnit]],
+        abap_code: str,
+        program: AbapProgram,
+        llm_client: LLMClient,
+        on_token: Optional[TokenCallback] = None,
+        history: Optional[List[ChatMessage]] = None,
+    ) -> str:
+        """
+        Document each group of units in parallel, then merge the notes into
+        one TS. Wall time is roughly the slowest group plus the merge call.
+        Only the merge call is streamed to ``on_token`` and sees ``history``.
+        """
+        semaphore = asyncio.Semaphore(settings.ABAP_UNIT_CONCURRENCY)
+        inventory = program.summary()
+
+        async def analyse(group: List[AbapUnit]) -> str:
+            code = "\n\n".join(
+                f"* --- {u.label} (lines {u.start_line}-{u.end_line})\n{u.source}" for u in group
+            )
+            rag_ctx = get_context_for_abap(
+                _rag_query(program, code),
+                k=settings.ABAP_UNIT_RAG_TOP_K,
+                max_tokens=settings.RAG_MAX_CONTEXT_TOKENS // 2,
+            )
+            # The inventory is the same for every group of this program.
+            messages = [
+                ChatMessage(role="system", content=UNIT_SYSTEM_PROMPT, cache=True),
+                ChatMessage(role="user", content=f"Program inventory:\n{inventory}\n", cache=True),
+                ChatMessage(
+                    role="user",
+                    content=(
+                        f"Code units:\n\n{code}\n\n"
+                        f"RAG context:\n\n{rag_ctx}\n"
+                    ),
+                ),
+            ]
+            async with semaphore:
+                return await llm_client.chat(messages)
+
+        notes = await asyncio.gather(*(analyse(g) for g in groups))
+
+        rag_ctx = get_context_for_abap(_rag_query(program, abap_code))
+        merged_notes = "\n\n".join(
+            f"### Notes for: {', '.join(u.label for u in group)}\n{note}"
+            for group, note in zip(groups, notes)
+        )
+        merge_msg = ChatMessage(
+            role="user",
+            content=(
+                "The ABAP program is too large to send at once; it was documented unit by unit.\n"
+                "Merge the unit notes below into a single Technical Specification.\n\n"
+                f"Program inventory:\n{inventory}\n\n"
+                f"Unit notes:\n\n{merged_notes}\n"
+            ),
+        )
+        return await self.complete(
+            llm_client,
+            [
+                ChatMessage(role="system", content=SYSTEM_PROMPT, cache=True),
+                ChatMessage(role="user", content=f"RAG context:\n\n{rag_ctx}\n", cache=True),
+                *(history or []),
+                merge_msg,
+            ],
+            on_token,
+        )
@@ -5,12 +5,198 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     OPENAI_API_KEY: str | None = None
     ANTHROPIC_API_KEY: str | None = None
+    # Alternative API endpoints: gateways/proxies, or benchmarks/fake_llm.py
+    # (OPENAI_BASE_URL ends in /v1, ANTHROPIC_BASE_URL does not).
+    OPENAI_BASE_URL: str | None = None
+    ANTHROPIC_BASE_URL: str | None = None
 
     DEFAULT_MODELS: dict = {
         "openai": ["gpt-4o-mini", "gpt-4.1", "gpt-5.1"],
         "claude": ["claude-3-5-sonnet-latest", "claude-3-5-haiku-latest"],
     }
 
+    # Pooled LLM HTTP clients (keep-alive; HTTP/2 when the h2 package is installed)
+    LLM_HTTP2: bool = True
+    LLM_MAX_CONNECTIONS: int = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_TIMEOUT: float = 600.0
+
+    # Per-process LLM rate limits (requests/min, tokens/min) and the AIMD
+    # concurrency controller's starting/maximum concurrency.
+    LLM_RATE_LIMITS: dict = {
+        "openai": {"rpm": 500, "tpm": 200_000, "concurrency": 16, "max_concurrency": 128},
+        "claude": {"rpm": 50, "tpm": 40_000, "concurrency": 8, "max_concurrency": 64},
+    }
+    LLM_RATE_LIMIT_RETRIES: int = 5
+    LLM_OUTPUT_TOKEN_ALLOWANCE: int = 1024
+
+    # Prompt prefix caching: cache_control breakpoints for Claude and a
+    # prompt_cache_key (routing hint for automatic caching) for OpenAI.
+    LLM_PROMPT_CACHING: bool = True
+
+    # Retries / hedging / failover around LLM calls (app/llm/resilient.py).
+    # Failover targets are the chat's model, then other DEFAULT_MODELS.
+    LLM_RESILIENCE_ENABLED: bool = True
+    LLM_RETRY_ATTEMPTS: int = 3
+    LLM_RETRY_BASE_DELAY: float = 0.5
+    LLM_RETRY_MAX_DELAY: float = 8.0
+    LLM_FAILOVER_TARGETS: int = 3
+    LLM_HEDGING_ENABLED: bool = True
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_MIN_DELAY: float = 2.0
+    LLM_HEDGE_MAX_RATIO: float = 0.1
+
+    # RAG retrieval
+    RAG_TOP_K: int = 6
+    RAG_MAX_CONTEXT_TOKENS: int = 1500
+    RAG_CHUNK_CHARS: int = 1200
+    RAG_INDEX_DIR: str | None = None  # defaults to app/data/rag_index
+    RAG_EMBED_DIM: int = 1024
+    RAG_CONTEXT_CACHE_SIZE: int = 512  # memoised retrievals per process
+
+    # ABAP chunking in TSFSAgent: programs above ABAP_SINGLE_PASS_CHARS are
+    # documented per unit group (ABAP_UNIT_CHARS each) and then merged.
+    ABAP_SINGLE_PASS_CHARS: int = 12000
+    ABAP_UNIT_CHARS: int = 8000
+    ABAP_UNIT_CONCURRENCY: int = 8
+    ABAP_UNIT_RAG_TOP_K: int = 3
+
+    # Threads rendering DOCX output while the LLM streams
+    DOCX_RENDER_WORKERS: int = 4
+    # TS template (.docx) loaded once per process; defaults to python-docx's.
+    DOCX_TEMPLATE_PATH: str | None = None
+    # "python-docx", "ooxml" (direct writer) or "auto" (ooxml above the threshold)
+    DOCX_ENGINE: str = "auto"
+    DOCX_OOXML_MIN_BLOCKS: int = 150
+
+    # GET /chat/{id}/history page sizes (messages)
+    CHAT_HISTORY_PAGE_SIZE: int = 50
+    CHAT_HISTORY_MAX_PAGE_SIZE: int = 500
+
+    # History sent with follow-up jobs (with_history=true): the newest
+    # messages verbatim within CHAT_CONTEXT_MAX_TOKENS, older ones folded
+    # into a rolling summary by a cheap model, cached per chat and process.
+    CHAT_CONTEXT_MAX_TOKENS: int = 6000
+    CHAT_CONTEXT_MIN_RECENT: int = 2  # messages always kept (truncated if needed)
+    CHAT_SUMMARY_PROVIDER: str = "openai"
+    CHAT_SUMMARY_MODEL: str = "gpt-4o-mini"
+    CHAT_SUMMARY_MAX_TOKENS: int = 800
+    CHAT_SUMMARY_CHUNK_TOKENS: int = 12000  # history folded per summary call
+    CHAT_SUMMARY_CACHE_SIZE: int = 1024  # chats
+
+    # Job execution: "celery" or "inprocess" (asyncio tasks in the API process)
+    JOB_EXECUTOR: str = "celery"
+    # Jobs still running after this long are cancelled on their event loop
+    # and marked failed (any executor / worker pool). None: no limit.
+    JOB_SOFT_TIME_LIMIT: float | None = 1800
+
+    # Celery workers (celery_app.make_celery). "threads" runs
+    # CELERY_WORKER_CONCURRENCY jobs per process on the worker's persistent
+    # event loop (LLM calls are I/O-bound); "prefork" runs one per process.
+    CELERY_WORKER_POOL: str = "prefork"
+    CELERY_WORKER_CONCURRENCY: int | None = None  # default: CPU count (prefork), 50 (threads)
+    CELERY_PREFETCH_MULTIPLIER: int = 1  # jobs are long: don't hoard messages
+    CELERY_ACKS_LATE: bool = True  # redeliver jobs of a worker that died
+    # Redis broker: unacked messages are redelivered after this long, so it
+    # must exceed the longest job (and CELERY_TASK_TIME_LIMIT).
+    CELERY_VISIBILITY_TIMEOUT: int = 7200
+    # Hard limit backing JOB_SOFT_TIME_LIMIT: the prefork pool kills the
+    # process (not enforced by the threads pool).
+    CELERY_TASK_TIME_LIMIT: int | None = 2100
+    EXECUTOR_MAX_CONCURRENCY: int = 200
+    EXECUTOR_PROVIDER_CONCURRENCY: dict = {"openai": 50, "claude": 50}
+    EXECUTOR_DEFAULT_PROVIDER_CONCURRENCY: int = 10
+    EXECUTOR_DRAIN_TIMEOUT: float = 30.0
+
+    # Offline mode (offline=true): jobs go through provider batch APIs.
+    # LLM_BATCH_BACKEND: "provider" or "fake" (local stand-in for testing).
+    LLM_BATCH_BACKEND: str = "provider"
+    LLM_BATCH_FLUSH_INTERVAL: float = 300.0
+    LLM_BATCH_POLL_INTERVAL: float = 60.0
+    LLM_BATCH_MAX_REQUESTS: int = 1000
+    LLM_BATCH_FAKE_DELAY: float = 5.0
+    LLM_BATCH_QUEUE: str = "offline"  # Celery queue; consume with a single worker
+    LLM_BATCH_STATE_PATH: str | None = None  # defaults to <repo>/.llm_batches.json
+
+    # Batch generation (POST /batches): child jobs run in waves of
+    # BATCH_MAX_PARALLEL; zip uploads are limited to BATCH_MAX_UPLOAD_BYTES.
+    BATCH_MAX_OBJECTS: int = 500
+    BATCH_MAX_PARALLEL: int = 50
+    BATCH_MAX_UPLOAD_BYTES: int = 50 * 1024 * 1024
+    BATCH_ZIP_EXTENSIONS: tuple = (".abap", ".txt")
+
+    # Result cache for identical (ABAP, provider, model, agent, KB) jobs
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_TTL: int = 7 * 24 * 3600
+    RESULT_CACHE_MAX_ENTRIES: int = 256
+    RESULT_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    RESULT_CACHE_DIR: str | None = None  # defaults to <repo>/.result_cache
+    RESULT_CACHE_SCAN_INTERVAL: float = 300.0  # seconds between disk size rescans
+
+    # Job outputs (DOCX, batch archives) are stored by content hash and
+    # served from /artifacts/{key} with strong ETags, Range support and
+    # ARTIFACT_CACHE_CONTROL. "local": ARTIFACT_DIR (share it between
+    # replicas); "s3": an S3-compatible bucket, downloads are redirected to
+    # presigned URLs (needs boto3).
+    ARTIFACT_BACKEND: str = "local"
+    ARTIFACT_DIR: str | None = None  # defaults to <repo>/generated/artifacts
+    # Internal nginx location aliased to ARTIFACT_DIR, e.g. "/_artifacts/":
+    # local downloads are handed to nginx (X-Accel-Redirect, sendfile).
+    ARTIFACT_ACCEL_REDIRECT: str | None = None
+    ARTIFACT_CACHE_CONTROL: str = "private, max-age=31536000, immutable"
+    ARTIFACT_S3_BUCKET: str | None = None
+    ARTIFACT_S3_PREFIX: str = "artifacts/"
+    ARTIFACT_S3_ENDPOINT_URL: str | None = None  # MinIO, moto_server...
+    ARTIFACT_S3_REGION: str | None = None
+    ARTIFACT_S3_URL_TTL: int = 3600  # presigned URL lifetime (seconds)
+
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Chat/job storage: "memory" (per process), "redis" or "sqlite".
+    # Use redis/sqlite (with EVENT_BUS_BACKEND=redis) when the API and Celery
+    # workers run as separate processes.
+    STORAGE_BACKEND: str = "memory"
+    SQLITE_PATH: str = "chatpwc.sqlite3"
+    STORAGE_TTL: int | None = None  # seconds, Redis keys only
+
+    # Bounds for STORAGE_BACKEND=memory: least recently used / idle chats
+    # and finished jobs leave memory and are spilled to MEMORY_SPILL_DIR
+    # (loaded back on access), where they are kept MEMORY_SPILL_RETENTION.
+    MEMORY_MAX_CHATS: int = 2000
+    MEMORY_MAX_JOBS: int = 1000
+    MEMORY_IDLE_TTL: int = 1800  # seconds since last access
+    MEMORY_SPILL_ENABLED: bool = True
+    MEMORY_SPILL_DIR: str | None = None  # defaults to <repo>/.memory_spill
+    MEMORY_SPILL_RETENTION: int = 7 * 24 * 3600
+
+    # Observability: GET /metrics needs prometheus_client (with Celery set
+    # PROMETHEUS_MULTIPROC_DIR so worker metrics are included); spans are
+    # exported over OTLP when OTEL_ENABLED and the OpenTelemetry SDK is installed.
+    METRICS_ENABLED: bool = True
+    OTEL_ENABLED: bool = False
+    OTEL_SERVICE_NAME: str = "chatpwc-backend"
+    OTEL_EXPORTER_OTLP_ENDPOINT: str | None = None  # exporter default when unset
+
+    # Per-job profiling (profile=true): cProfile + tracemalloc, one job at a
+    # time per process, reports downloadable from GET /jobs/{id}/profile.
+    JOB_PROFILING_ENABLED: bool = False
+    JOB_PROFILE_DIR: str | None = None  # defaults to <repo>/.job_profiles
+    JOB_PROFILE_TOP: int = 40  # functions / allocation sites in the text report
+    JOB_PROFILE_TRACEMALLOC_FRAMES: int = 5
+
+    # Job event bus: "memory" (single process) or "redis" (API + workers)
+    EVENT_BUS_BACKEND: str = "memory"
+    EVENT_HISTORY_SIZE: int = 2000
+    EVENT_HISTORY_TTL: int = 3600
+    # Token chunks are replayed from a history of their own, so long streams
+    # don't push log/status events out of EVENT_HISTORY_SIZE.
+    EVENT_TOKEN_HISTORY_SIZE: int = 500
+    # Streamed tokens are published in chunks of about this many characters
+    # or seconds, whichever comes first.
+    JOB_TOKEN_FLUSH_CHARS: int = 256
+    JOB_TOKEN_FLUSH_INTERVAL: float = 0.05
+
     class Config:
         env_file = ".env"
 
@@ -1,7 +1,11 @@
 import os
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from .base import LLMClient, ChatMessage
+from .base import LLMClient, ChatMessage, make_sdk_http_client, parse_raw_response, timed_request, timed_stream
+from .rate_limiter import get_rate_limiter
+from .tokens import count_message_tokens
+from .usage import anthropic_usage, record_usage
+from ..config import settings
 from ..utils.logger import logger
 
 try:
@@ -11,30 +15,104 @@ except ImportError:
 
 
 class AnthropicClient(LLMClient):
-    def __init__(self, model: str, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        model: str,
+        api_key: Optional[str] = None,
+        http_options: Optional[Dict[str, Any]] = None,
+        base_url: Optional[str] = None,
+    ):
         if anthropic is None:
             logger.warning("anthropic package not installed; Claude calls will be mocked")
             self.client = None
         else:
-            self.client = anthropic.AsyncAnthropic(api_key=api_key or os.getenv("ANTHROPIC_API_KEY"))
+            self.client = anthropic.AsyncAnthropic(
+                api_key=api_key or os.getenv("ANTHROPIC_API_KEY"),
+                base_url=base_url,
+                http_client=make_sdk_http_client(anthropic, http_options),
+                # 429/529 retries are handled by the rate limiter
+                max_retries=0,
+            )
         self.model = model
+        self.limiter = get_rate_limiter("claude", model)
 
-    async def chat(self, messages: List[ChatMessage]) -> str:
-        if self.client is None:
-            joined = "\n".join(f"{m.role}: {m.content}" for m in messages)
-            return f"[MOCK CLAUDE {self.model}] Generated TS/FS based on:\n{joined[:1000]}"
+    async def aclose(self) -> None:
+        if self.client is not None:
+            await self.client.close()
+
+    def _mock_text(self, messages: List[ChatMessage]) -> str:
+        joined = "\n".join(f"{m.role}: {m.content}" for m in messages)
+        return f"[MOCK CLAUDE {self.model}] Generated TS/FS based on:\n{joined[:1000]}"
+
+    @staticmethod
+    def _split_messages(messages: List[ChatMessage]) -> Tuple[Any, List[Dict[str, Any]]]:
+        # For Claude, separate system + user/assistant blocks. Messages marked
+        # ``cache`` become text blocks with a cache breakpoint (at most 4 per
+        # request; prefixes below the model's minimum are simply not cached).
+        marked = [i for i, m in enumerate(messages) if m.cache] if settings.LLM_PROMPT_CACHING else []
+        breakpoints = set(marked[:4])
+
+        def block(i: int, m: ChatMessage) -> Dict[str, Any]:
+            text: Dict[str, Any] = {"type": "text", "text": m.content}
+            if i in breakpoints:
+                text["cache_control"] = {"type": "ephemeral"}
+            return text
 
-        # For Claude, separate system + user/assistant blocks
-        system_msg = "\n".join(m.content for m in messages if m.role == "system") or None
+        system = [(i, m) for i, m in enumerate(messages) if m.role == "system"]
+        if any(i in breakpoints for i, _ in system):
+            system_msg: Any = [block(i, m) for i, m in system]
+        else:
+            system_msg = "\n".join(m.content for _, m in system) or None
         user_blocks = [
-            {"role": m.role, "content": m.content}
-            for m in messages
+            {"role": m.role, "content": [block(i, m)] if i in breakpoints else m.content}
+            for i, m in enumerate(messages)
             if m.role in ("user", "assistant")
         ]
-        resp = await self.client.messages.create(
-            model=self.model,
-            max_tokens=4096,
-            system=system_msg,
-            messages=user_blocks,
-        )
+        return system_msg, user_blocks
+
+    def request_params(self, messages: List[ChatMessage]) -> Dict[str, Any]:
+        """Messages API parameters (also used for batch requests)."""
+        system_msg, user_blocks = self._split_messages(messages)
+        request: Dict[str, Any] = {"model": self.model, "max_tokens": 4096, "messages": user_blocks}
+        if system_msg:
+            request["system"] = system_msg
+        return request
+
+    async def chat(self, messages: List[ChatMessage]) -> str:
+        if self.client is None:
+            return self._mock_text(messages)
+
+        async def _create():
+            raw = await self.client.messages.with_raw_response.create(**self.request_params(messages))
+            return await parse_raw_response(raw), raw.headers
+
+        with timed_request("claude", self.model):
+            resp = await self.limiter.call(self._estimate_tokens(messages), _create)
+        record_usage(anthropic_usage(resp.usage), "claude", self.model)
         return resp.content[0].text
+
+    async def stream(self, messages: List[ChatMessage]) -> AsyncIterator[str]:
+        if self.client is None:
+            for piece in self._mock_text(messages).splitlines(keepends=True):
+                yield piece
+            return
+        async for delta in timed_stream("claude", self.model, self._stream(messages)):
+            yield delta
+
+    async def _stream(self, messages: List[ChatMessage]) -> AsyncIterator[str]:
+        async def _open():
+            stream = await self.client.messages.create(**self.request_params(messages), stream=True)
+            return stream, stream.response.headers
+
+        usage = None
+        async for event in self.limiter.stream(self._estimate_tokens(messages), _open):
+            if event.type == "content_block_delta" and event.delta.type == "text_delta":
+                yield event.delta.text
+            elif event.type == "message_start":
+                usage = anthropic_usage(event.message.usage)
+            elif event.type == "message_delta" and usage is not None and event.usage is not None:
+                usage.output_tokens = event.usage.output_tokens or usage.output_tokens
+        record_usage(usage, "claude", self.model)
+
+    def _estimate_tokens(self, messages: List[ChatMessage]) -> int:
+        return count_message_tokens(messages, "claude", self.model) + settings.LLM_OUTPUT_TOKEN_ALLOWANCE
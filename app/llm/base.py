@@ -1,13 +1,85 @@
+import inspect
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import List
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from ..utils.metrics import LLM_SECONDS, LLM_TTFT_SECONDS
+from ..utils.tracing import record_span, span
 
 
 @dataclass
 class ChatMessage:
     role: str  # "system" | "user" | "assistant"
     content: str
+    # End of a stable prompt prefix: providers with explicit prompt caching
+    # (Anthropic) put a cache breakpoint after this message.
+    cache: bool = False
 
 
 class LLMClient:
     async def chat(self, messages: List[ChatMessage]) -> str:
         raise NotImplementedError("chat() must be implemented by subclasses")
+
+    async def stream(self, messages: List[ChatMessage]) -> AsyncIterator[str]:
+        """
+        Yield the completion as text deltas as they arrive.
+        Default implementation falls back to a single chat() call.
+        """
+        yield await self.chat(messages)
+
+    async def aclose(self) -> None:
+        """Release network resources (connection pools)."""
+        return None
+
+
+def make_sdk_http_client(sdk: Any, http_options: Optional[Dict[str, Any]]) -> Any:
+    """
+    Build a keep-alive HTTP client for an openai/anthropic SDK module using
+    the SDK's own httpx client class, so its defaults (and httpx version)
+    are kept. Returns None (SDK default client) when no options are given.
+    """
+    if not http_options:
+        return None
+    limits_cls = type(sdk.DEFAULT_CONNECTION_LIMITS)
+    return sdk.DefaultAsyncHttpxClient(
+        http2=http_options.get("http2", False),
+        limits=limits_cls(
+            max_connections=http_options["max_connections"],
+            max_keepalive_connections=http_options["max_keepalive_connections"],
+            keepalive_expiry=http_options["keepalive_expiry"],
+        ),
+        timeout=http_options["timeout"],
+    )
+
+
+async def parse_raw_response(raw: Any) -> Any:
+    """Parse an SDK ``with_raw_response`` result (``parse()`` is async in newer SDKs)."""
+    parsed = raw.parse()
+    if inspect.isawaitable(parsed):
+        parsed = await parsed
+    return parsed
+
+
+@contextmanager
+def timed_request(provider: str, model: str) -> Iterator[None]:
+    """Time one non-streaming request (job span and per-model histogram)."""
+    began = time.perf_counter()
+    with span("llm_chat", provider=provider, model=model):
+        yield
+    LLM_SECONDS.labels(provider, model, "chat").observe(time.perf_counter() - began)
+
+
+async def timed_stream(provider: str, model: str, deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Pass a stream through, recording time to first token and total time."""
+    began = time.perf_counter()
+    first = True
+    with span("llm_stream", provider=provider, model=model):
+        async for delta in deltas:
+            if first:
+                first = False
+                ttft = time.perf_counter() - began
+                record_span("llm_ttft", ttft, provider=provider, model=model)
+                LLM_TTFT_SECONDS.labels(provider, model).observe(ttft)
+            yield delta
+    LLM_SECONDS.labels(provider, model, "stream").observe(time.perf_counter() - began)
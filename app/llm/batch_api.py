@@ -0,0 +1,197 @@
+"""
+Provider batch APIs for offline (non-interactive) generation.
+
+Batch requests are billed at about half the synchronous price and use a
+separate quota, so overnight runs don't compete with interactive traffic.
+
+- OpenAIBatchBackend: JSONL request file + /v1/batches (chat completions)
+- AnthropicBatchBackend: Message Batches API
+- FakeBatchBackend: local stand-in that "completes" after a delay with mock
+  output; used when LLM_BATCH_BACKEND=fake or the SDK is not installed
+
+Each backend works on ``BatchRequest`` (custom_id + request parameters) and
+returns ``BatchResult`` per custom_id.
+"""
+
+import io
+import itertools
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .base import LLMClient
+from .provider_registry import create_llm_client
+from .usage import LLMUsage, anthropic_usage, openai_usage
+from ..config import settings
+from ..utils.logger import logger
+
+
+@dataclass
+class BatchRequest:
+    custom_id: str
+    params: Dict[str, Any]
+
+
+@dataclass
+class BatchResult:
+    custom_id: str
+    text: Optional[str] = None
+    error: Optional[str] = None
+    usage: Optional[LLMUsage] = None
+
+
+class BatchBackend:
+    name = "base"
+
+    async def submit(self, requests: List[BatchRequest]) -> str:
+        """Submit requests; returns the provider batch id."""
+        raise NotImplementedError
+
+    async def is_done(self, batch_id: str) -> bool:
+        raise NotImplementedError
+
+    async def results(self, batch_id: str) -> List[BatchResult]:
+        raise NotImplementedError
+
+
+class OpenAIBatchBackend(BatchBackend):
+    name = "openai"
+    _TERMINAL = ("completed", "failed", "expired", "cancelled")
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+
+    async def submit(self, requests: List[BatchRequest]) -> str:
+        lines = "\n".join(
+            json.dumps({
+                "custom_id": r.custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": r.params,
+            })
+            for r in requests
+        )
+        upload = await self.client.files.create(
+            file=("batch.jsonl", io.BytesIO(lines.encode("utf-8"))),
+            purpose="batch",
+        )
+        batch = await self.client.batches.create(
+            input_file_id=upload.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        return batch.id
+
+    async def is_done(self, batch_id: str) -> bool:
+        batch = await self.client.batches.retrieve(batch_id)
+        return batch.status in self._TERMINAL
+
+    async def _read_jsonl(self, file_id: Optional[str]) -> List[Dict[str, Any]]:
+        if not file_id:
+            return []
+        content = await self.client.files.content(file_id)
+        return [json.loads(line) for line in content.text.splitlines() if line.strip()]
+
+    async def results(self, batch_id: str) -> List[BatchResult]:
+        batch = await self.client.batches.retrieve(batch_id)
+        results: List[BatchResult] = []
+        for row in await self._read_jsonl(batch.output_file_id) + await self._read_jsonl(batch.error_file_id):
+            response = row.get("response") or {}
+            body = response.get("body") or {}
+            if response.get("status_code") == 200 and body.get("choices"):
+                results.append(BatchResult(
+                    row["custom_id"],
+                    text=body["choices"][0]["message"]["content"],
+                    usage=openai_usage(body.get("usage")),
+                ))
+            else:
+                error = row.get("error") or body.get("error") or f"HTTP {response.get('status_code')}"
+                results.append(BatchResult(row["custom_id"], error=json.dumps(error) if isinstance(error, dict) else str(error)))
+        if batch.status != "completed":
+            logger.warning(f"[BatchAPI] OpenAI batch {batch_id} ended with status {batch.status}")
+        return results
+
+
+class AnthropicBatchBackend(BatchBackend):
+    name = "claude"
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+
+    async def submit(self, requests: List[BatchRequest]) -> str:
+        batch = await self.client.messages.batches.create(
+            requests=[{"custom_id": r.custom_id, "params": r.params} for r in requests],
+        )
+        return batch.id
+
+    async def is_done(self, batch_id: str) -> bool:
+        batch = await self.client.messages.batches.retrieve(batch_id)
+        return batch.processing_status == "ended"
+
+    async def results(self, batch_id: str) -> List[BatchResult]:
+        results: List[BatchResult] = []
+        async for entry in await self.client.messages.batches.results(batch_id):
+            result = entry.result
+            if result.type == "succeeded":
+                text = "".join(block.text for block in result.message.content if block.type == "text")
+                results.append(BatchResult(entry.custom_id, text=text, usage=anthropic_usage(result.message.usage)))
+            else:
+                error = getattr(result, "error", None)
+                results.append(BatchResult(entry.custom_id, error=str(error) if error else result.type))
+        return results
+
+
+class FakeBatchBackend(BatchBackend):
+    """In-process stand-in for a provider batch service (development/tests)."""
+
+    name = "fake"
+    _ids = itertools.count(1)
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self._batches: Dict[str, Dict[str, Any]] = {}
+
+    async def submit(self, requests: List[BatchRequest]) -> str:
+        batch_id = f"fakebatch_{next(self._ids)}"
+        self._batches[batch_id] = {"ready_at": time.monotonic() + self.delay, "requests": list(requests)}
+        return batch_id
+
+    async def is_done(self, batch_id: str) -> bool:
+        batch = self._batches.get(batch_id)
+        return batch is None or time.monotonic() >= batch["ready_at"]
+
+    async def results(self, batch_id: str) -> List[BatchResult]:
+        batch = self._batches.pop(batch_id, None)
+        if batch is None:
+            return []
+        results = []
+        for request in batch["requests"]:
+            messages = request.params.get("messages", [])
+            prompt = messages[-1]["content"] if messages else ""
+            model = request.params.get("model", "")
+            results.append(BatchResult(
+                request.custom_id,
+                text=f"## Introduction\n[MOCK BATCH {model}] Generated TS/FS based on:\n\n{prompt[:1000]}",
+            ))
+        return results
+
+
+_FAKE = FakeBatchBackend()
+
+
+def batch_backend_for(provider: str, model: str) -> Tuple[BatchBackend, LLMClient]:
+    """
+    The batch backend for (provider, model) and the pooled client whose
+    ``request_params`` build the requests.
+    """
+    client = create_llm_client(provider, model)
+    sdk_client = getattr(client, "client", None)
+    if settings.LLM_BATCH_BACKEND == "fake" or sdk_client is None:
+        _FAKE.delay = settings.LLM_BATCH_FAKE_DELAY
+        return _FAKE, client
+    if provider == "openai":
+        return OpenAIBatchBackend(sdk_client), client
+    if provider in ("claude", "anthropic"):
+        return AnthropicBatchBackend(sdk_client), client
+    raise ValueError(f"No batch API for provider: {provider}")
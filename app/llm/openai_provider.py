@@ -1,33 +1,117 @@
+import hashlib
 import os
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from .base import LLMClient, ChatMessage
+from .base import LLMClient, ChatMessage, make_sdk_http_client, parse_raw_response, timed_request, timed_stream
+from .rate_limiter import get_rate_limiter
+from .tokens import count_message_tokens
+from .usage import openai_usage, record_usage
+from ..config import settings
 from ..utils.logger import logger
 
 try:
+    import openai
     from openai import AsyncOpenAI
 except ImportError:
+    openai = None
     AsyncOpenAI = None
 
 
 class OpenAIClient(LLMClient):
-    def __init__(self, model: str, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        model: str,
+        api_key: Optional[str] = None,
+        http_options: Optional[Dict[str, Any]] = None,
+        base_url: Optional[str] = None,
+    ):
         if AsyncOpenAI is None:
             logger.warning("openai package not installed; OpenAI calls will be mocked")
             self.client = None
         else:
-            self.client = AsyncOpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+            self.client = AsyncOpenAI(
+                api_key=api_key or os.getenv("OPENAI_API_KEY"),
+                base_url=base_url,
+                http_client=make_sdk_http_client(openai, http_options),
+                # 429/overload retries are handled by the rate limiter
+                max_retries=0,
+            )
         self.model = model
+        self.limiter = get_rate_limiter("openai", model)
+
+    async def aclose(self) -> None:
+        if self.client is not None:
+            await self.client.close()
+
+    def _mock_text(self, messages: List[ChatMessage]) -> str:
+        # Fallback mock for development without keys
+        joined = "\n".join(f"{m.role}: {m.content}" for m in messages)
+        return f"[MOCK OPENAI {self.model}] Generated TS/FS based on:\n{joined[:1000]}"
+
+    def request_params(self, messages: List[ChatMessage]) -> Dict[str, Any]:
+        """Chat Completions parameters (also used for batch requests)."""
+        params: Dict[str, Any] = {
+            "model": self.model,
+            "messages": [{"role": m.role, "content": m.content} for m in messages],
+            "temperature": 0.1,
+        }
+        cache_key = self._prompt_cache_key(messages)
+        if cache_key:
+            params["prompt_cache_key"] = cache_key
+        return params
+
+    @staticmethod
+    def _prompt_cache_key(messages: List[ChatMessage]) -> Optional[str]:
+        """
+        OpenAI caches prompt prefixes automatically; requests with the same
+        key are routed to the same cache. The key is a hash of the messages
+        up to the last one marked ``cache`` (the stable prefix).
+        """
+        if not settings.LLM_PROMPT_CACHING:
+            return None
+        last = max((i for i, m in enumerate(messages) if m.cache), default=-1)
+        if last < 0:
+            return None
+        digest = hashlib.sha256()
+        for m in messages[: last + 1]:
+            digest.update(f"{m.role}\0{m.content}\0".encode("utf-8"))
+        return digest.hexdigest()[:32]
 
     async def chat(self, messages: List[ChatMessage]) -> str:
         if self.client is None:
-            # Fallback mock for development without keys
-            joined = "\n".join(f"{m.role}: {m.content}" for m in messages)
-            return f"[MOCK OPENAI {self.model}] Generated TS/FS based on:\n{joined[:1000]}"
-
-        resp = await self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": m.role, "content": m.content} for m in messages],
-            temperature=0.1,
-        )
+            return self._mock_text(messages)
+
+        async def _create():
+            raw = await self.client.chat.completions.with_raw_response.create(**self.request_params(messages))
+            return await parse_raw_response(raw), raw.headers
+
+        with timed_request("openai", self.model):
+            resp = await self.limiter.call(self._estimate_tokens(messages), _create)
+        record_usage(openai_usage(resp.usage), "openai", self.model)
         return resp.choices[0].message.content
+
+    async def stream(self, messages: List[ChatMessage]) -> AsyncIterator[str]:
+        if self.client is None:
+            for piece in self._mock_text(messages).splitlines(keepends=True):
+                yield piece
+            return
+        async for delta in timed_stream("openai", self.model, self._stream(messages)):
+            yield delta
+
+    async def _stream(self, messages: List[ChatMessage]) -> AsyncIterator[str]:
+        async def _open():
+            stream = await self.client.chat.completions.create(
+                **self.request_params(messages),
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            return stream, stream.response.headers
+
+        async for chunk in self.limiter.stream(self._estimate_tokens(messages), _open):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if chunk.usage is not None:  # final chunk
+                record_usage(openai_usage(chunk.usage), "openai", self.model)
+
+    def _estimate_tokens(self, messages: List[ChatMessage]) -> int:
+        return count_message_tokens(messages, "openai", self.model) + settings.LLM_OUTPUT_TOKEN_ALLOWANCE
@@ -1,18 +1,135 @@
-from typing import Dict, List
+import asyncio
+import hashlib
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
 from .base import LLMClient
 from .openai_provider import OpenAIClient
 from .anthropic_provider import AnthropicClient
+from .resilient import LLMTarget, ResilientLLMClient
 from ..config import settings
+from ..utils.logger import logger
+
+try:
+    import h2  # noqa: F401  (presence enables HTTP/2 in httpx)
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+
+# Long-lived clients, one per (provider, model, api key) and event loop.
+# The underlying HTTP pools are bound to the loop that created them.
+PoolKey = Tuple[str, str, str]
+_CLIENT_POOL: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[PoolKey, LLMClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_SYNC_POOL: Dict[PoolKey, LLMClient] = {}
 
 
 def list_providers_and_models() -> Dict[str, List[str]]:
     return settings.DEFAULT_MODELS
 
 
-def create_llm_client(provider: str, model: str) -> LLMClient:
-    provider = provider.lower()
+def _http_options() -> Dict[str, Any]:
+    return {
+        "http2": settings.LLM_HTTP2 and _HTTP2,
+        "max_connections": settings.LLM_MAX_CONNECTIONS,
+        "max_keepalive_connections": settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        "keepalive_expiry": settings.LLM_KEEPALIVE_EXPIRY,
+        "timeout": settings.LLM_TIMEOUT,
+    }
+
+
+def _build_client(provider: str, model: str) -> LLMClient:
     if provider == "openai":
-        return OpenAIClient(model=model, api_key=settings.OPENAI_API_KEY)
+        return OpenAIClient(
+            model=model,
+            api_key=settings.OPENAI_API_KEY,
+            http_options=_http_options(),
+            base_url=settings.OPENAI_BASE_URL,
+        )
     if provider in ("claude", "anthropic"):
-        return AnthropicClient(model=model, api_key=settings.ANTHROPIC_API_KEY)
+        return AnthropicClient(
+            model=model,
+            api_key=settings.ANTHROPIC_API_KEY,
+            http_options=_http_options(),
+            base_url=settings.ANTHROPIC_BASE_URL,
+        )
     raise ValueError(f"Unknown provider: {provider}")
+
+
+def _pool_key(provider: str, model: str) -> PoolKey:
+    api_key = settings.OPENAI_API_KEY if provider == "openai" else settings.ANTHROPIC_API_KEY
+    # Don't keep raw keys around as dict keys.
+    key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+    return provider, model, key_hash
+
+
+def _current_pool() -> Dict[PoolKey, LLMClient]:
+    try:
+        loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if loop is None:
+        return _SYNC_POOL
+    pool = _CLIENT_POOL.get(loop)
+    if pool is None:
+        pool = _CLIENT_POOL[loop] = {}
+    return pool
+
+
+def create_llm_client(provider: str, model: str) -> LLMClient:
+    """
+    Return the pooled client for (provider, model, api key) on the current
+    event loop, creating it on first use.
+    """
+    provider = provider.lower()
+    if provider == "anthropic":
+        provider = "claude"
+    pool = _current_pool()
+    key = _pool_key(provider, model)
+    client = pool.get(key)
+    if client is None:
+        client = pool[key] = _build_client(provider, model)
+        logger.info(f"[LLM] Created pooled client for {provider}/{model}")
+    return client
+
+
+def failover_candidates(provider: str, model: str) -> List[Tuple[str, str]]:
+    """(provider, model) pairs to try in order: the requested one, other
+    models of the same provider, then the other providers' models."""
+    provider = "claude" if provider.lower() == "anthropic" else provider.lower()
+    candidates = [(provider, model)]
+    ordered = sorted(settings.DEFAULT_MODELS.items(), key=lambda item: item[0] != provider)
+    for name, models in ordered:
+        candidates.extend((name, m) for m in models if (name, m) not in candidates)
+    return candidates[: max(1, settings.LLM_FAILOVER_TARGETS)]
+
+
+def create_resilient_llm_client(provider: str, model: str) -> LLMClient:
+    """
+    Pooled client for (provider, model) wrapped with retries, hedging and
+    failover to the other configured models. Returns the plain client when
+    LLM_RESILIENCE_ENABLED is off.
+    """
+    if not settings.LLM_RESILIENCE_ENABLED:
+        return create_llm_client(provider, model)
+    targets: List[LLMTarget] = []
+    for i, (name, candidate) in enumerate(failover_candidates(provider, model)):
+        try:
+            targets.append(LLMTarget(name, candidate, create_llm_client(name, candidate)))
+        except Exception as exc:
+            if i == 0:
+                raise
+            # e.g. no API key configured for a failover provider
+            logger.warning(f"[LLM] Skipping failover target {name}/{candidate}: {exc}")
+    return ResilientLLMClient(targets)
+
+
+async def aclose_llm_clients() -> None:
+    """Close every pooled client bound to the running loop."""
+    pool = _CLIENT_POOL.pop(asyncio.get_running_loop(), {})
+    for client in pool.values():
+        try:
+            await client.aclose()
+        except Exception as exc:
+            logger.warning(f"[LLM] Failed to close client: {exc}")
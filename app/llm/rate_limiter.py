@@ -0,0 +1,308 @@
+"""
+Provider-aware rate limiting and adaptive concurrency for LLM calls.
+
+Each (provider, model) gets a ``RateLimiter`` combining:
+- two token buckets: requests/min and tokens/min (prompt tokens counted
+  with ``count_message_tokens``, plus an allowance for the completion)
+- an AIMD concurrency controller: +1/limit per successful call, halved on
+  429/overload responses (at most once per cooldown window); other errors
+  (timeouts, connection errors, 5xx) leave the limit unchanged
+- rate-limit headers: ``retry-after`` and the OpenAI ``x-ratelimit-*`` /
+  Anthropic ``anthropic-ratelimit-*`` remaining/reset headers pause the
+  buckets until the provider's window resets
+
+Overload responses are retried after the advised delay instead of failing
+the job. Limits are per process; divide the provider quota by the number
+of worker processes when configuring LLM_RATE_LIMITS.
+"""
+
+import asyncio
+import re
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Mapping, Optional, Tuple, TypeVar
+
+from ..config import settings
+from ..utils.logger import logger
+from ..utils.metrics import LLM_RETRIES
+
+T = TypeVar("T")
+
+# 429 = rate limited, 503/529 = provider overloaded
+OVERLOAD_STATUS_CODES = (429, 503, 529)
+
+
+class TokenBucket:
+    """Continuous-refill bucket holding at most ``per_minute`` units."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+    def sync_remaining(self, remaining: float) -> None:
+        """Never believe we have more budget than the provider reports."""
+        self._refill(time.monotonic())
+        self.level = min(self.level, remaining)
+
+
+class CallResult:
+    """How a rate-limited call ended, for the concurrency controller."""
+
+    SUCCESS = "success"
+    OVERLOADED = "overloaded"
+    ERROR = "error"
+
+
+class AIMDController:
+    """Additive-increase / multiplicative-decrease concurrency limit."""
+
+    def __init__(self, initial: int, minimum: int, maximum: int, cooldown: float = 5.0) -> None:
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, result: str) -> None:
+        """Free a slot; ``result`` is a ``CallResult``. Only successes grow the limit."""
+        async with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if result == CallResult.OVERLOADED:
+                if now - self._last_decrease > self.cooldown:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self._last_decrease = now
+                    logger.warning(f"[RateLimit] Overloaded; concurrency limit -> {int(self.limit)}")
+            elif result == CallResult.SUCCESS:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+@dataclass
+class CallOutcome:
+    headers: Optional[Mapping[str, str]] = None
+    # Anything that does not reach SUCCESS (incl. cancellation) is an error.
+    result: str = CallResult.ERROR
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse OpenAI reset durations like '1s', '6m0s', '20ms', '1h2m3.5s'."""
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        matched = True
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if matched else None
+
+
+def _parse_reset(value: str) -> Optional[float]:
+    """Seconds until a reset given as a duration, plain seconds or RFC 3339 time."""
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    duration = _parse_duration(value)
+    if duration is not None:
+        return duration
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return max(0.0, (reset_at - datetime.now(timezone.utc)).total_seconds())
+    except ValueError:
+        return None
+
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def overload_headers(exc: BaseException) -> Tuple[bool, Optional[Mapping[str, str]]]:
+    """(is_overload, response headers) for an SDK exception."""
+    status = getattr(exc, "status_code", None)
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    return status in OVERLOAD_STATUS_CODES, headers
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        initial_concurrency: int,
+        max_concurrency: int,
+        provider: str = "",
+        model: str = "",
+    ) -> None:
+        self.provider = provider
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AIMDController(initial_concurrency, minimum=1, maximum=max_concurrency)
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _take_budget(self, tokens: int) -> None:
+        # Serialised so waiters are served in arrival order.
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                wait = max(
+                    self.blocked_until - now,
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(tokens, now),
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+
+    def _block_for(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def observe_headers(self, headers: Optional[Mapping[str, str]]) -> None:
+        if not headers:
+            return
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}") or headers.get(f"anthropic-ratelimit-{kind}-remaining")
+            reset = headers.get(f"x-ratelimit-reset-{kind}") or headers.get(f"anthropic-ratelimit-{kind}-reset")
+            if remaining is None:
+                continue
+            try:
+                remaining_value = float(remaining)
+            except ValueError:
+                continue
+            bucket.sync_remaining(remaining_value)
+            if remaining_value <= 0 and reset:
+                seconds = _parse_reset(reset)
+                if seconds:
+                    self._block_for(seconds)
+
+    @asynccontextmanager
+    async def slot(self, tokens: int) -> AsyncIterator[CallOutcome]:
+        """Wait for rate budget and a concurrency slot; report the outcome on exit."""
+        await self._take_budget(tokens)
+        await self.concurrency.acquire()
+        outcome = CallOutcome()
+        try:
+            yield outcome
+        finally:
+            self.observe_headers(outcome.headers)
+            if outcome.result == CallResult.OVERLOADED:
+                self._block_for(retry_after_seconds(outcome.headers) or 1.0)
+            await self.concurrency.release(outcome.result)
+
+    async def call(
+        self,
+        tokens: int,
+        fn: Callable[[], Awaitable[Tuple[T, Optional[Mapping[str, str]]]]],
+        max_retries: Optional[int] = None,
+    ) -> T:
+        """
+        Run ``fn`` (returning ``(result, response_headers)``) inside a slot,
+        retrying overload responses after the advised delay.
+        """
+        retries = settings.LLM_RATE_LIMIT_RETRIES if max_retries is None else max_retries
+        for attempt in range(retries + 1):
+            async with self.slot(tokens) as outcome:
+                try:
+                    result, outcome.headers = await fn()
+                    outcome.result = CallResult.SUCCESS
+                    return result
+                except Exception as exc:
+                    self._on_error(exc, outcome, attempt, retries)
+        raise RuntimeError("unreachable")
+
+    async def stream(
+        self,
+        tokens: int,
+        open_fn: Callable[[], Awaitable[Tuple[AsyncIterable[T], Optional[Mapping[str, str]]]]],
+        max_retries: Optional[int] = None,
+    ) -> AsyncIterator[T]:
+        """
+        Like ``call`` for streaming responses: only opening the stream is
+        retried, and the concurrency slot is held until the stream ends.
+        """
+        retries = settings.LLM_RATE_LIMIT_RETRIES if max_retries is None else max_retries
+        for attempt in range(retries + 1):
+            async with self.slot(tokens) as outcome:
+                try:
+                    stream, outcome.headers = await open_fn()
+                except Exception as exc:
+                    self._on_error(exc, outcome, attempt, retries)
+                    continue
+                async for item in stream:
+                    yield item
+                outcome.result = CallResult.SUCCESS
+                return
+
+    def _on_error(self, exc: Exception, outcome: CallOutcome, attempt: int, retries: int) -> None:
+        """Record an overload on the outcome; re-raise unless a retry is due."""
+        overloaded, headers = overload_headers(exc)
+        if overloaded:
+            outcome.result, outcome.headers = CallResult.OVERLOADED, headers
+        if not overloaded or attempt == retries:
+            raise exc
+        LLM_RETRIES.labels(self.provider, self.model, "rate_limit").inc()
+        logger.warning(f"[RateLimit] {exc.__class__.__name__}; retry {attempt + 1}/{retries}")
+
+
+_LIMITERS: Dict[Tuple[str, str], RateLimiter] = {}
+
+
+def get_rate_limiter(provider: str, model: str) -> RateLimiter:
+    key = (provider, model)
+    limiter = _LIMITERS.get(key)
+    if limiter is None:
+        limits: Dict[str, Any] = settings.LLM_RATE_LIMITS.get(provider, {})
+        limiter = _LIMITERS[key] = RateLimiter(
+            rpm=limits.get("rpm", 60),
+            tpm=limits.get("tpm", 100_000),
+            initial_concurrency=limits.get("concurrency", 8),
+            max_concurrency=limits.get("max_concurrency", 64),
+            provider=provider,
+            model=model,
+        )
+    return limiter
@@ -0,0 +1,264 @@
+"""
+Retry, hedging and failover around LLMClient.
+
+``ResilientLLMClient`` wraps an ordered list of targets (the chat's own
+provider/model first, then failover alternatives from DEFAULT_MODELS):
+
+- transient errors (timeouts, connection errors, 5xx) are retried with
+  full-jitter exponential backoff; 429/overload is already handled by the
+  per-client rate limiter
+- hedging: if the primary hasn't answered (or, when streaming, produced its
+  first token) within its observed p95 latency, the same request is sent to
+  the next target; the first to answer wins and the loser is cancelled.
+  Hedges are capped at LLM_HEDGE_MAX_RATIO of calls to bound extra cost.
+- failover: when a target still fails with a transient error after retries,
+  the next target not yet tried (by the hedge) is used; other errors (bad
+  request, auth) are raised as they would fail anywhere. A stream only
+  fails over before its first token has been forwarded.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from .base import ChatMessage, LLMClient
+from ..config import settings
+from ..utils.logger import logger
+from ..utils.metrics import LLM_FAILOVERS, LLM_HEDGES, LLM_RETRIES
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = (408, 409, 500, 502, 504)
+_RETRYABLE_ERROR_NAMES = ("APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout", "RemoteProtocolError")
+
+
+def is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    if getattr(exc, "status_code", None) in RETRYABLE_STATUS_CODES:
+        return True
+    return any(cls.__name__ in _RETRYABLE_ERROR_NAMES for cls in type(exc).__mro__)
+
+
+class LatencyTracker:
+    """Rolling latency samples per (provider, model, kind) for hedge deadlines."""
+
+    def __init__(self, window: int = 200) -> None:
+        self.window = window
+        self._samples: Dict[Tuple[str, str, str], Deque[float]] = {}
+        self.calls = 0
+        self.hedges = 0
+
+    def record(self, key: Tuple[str, str, str], seconds: float) -> None:
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def p95(self, key: Tuple[str, str, str]) -> Optional[float]:
+        samples = self._samples.get(key)
+        if not samples or len(samples) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def hedge_allowed(self) -> bool:
+        return self.hedges < settings.LLM_HEDGE_MAX_RATIO * max(1, self.calls)
+
+
+LATENCY = LatencyTracker()
+
+
+@dataclass
+class LLMTarget:
+    provider: str
+    model: str
+    client: LLMClient
+
+    @property
+    def label(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+
+async def _cancel(task: "asyncio.Future") -> None:
+    if not task.done():
+        task.cancel()
+    try:
+        await task
+    except BaseException:
+        pass
+
+
+class ResilientLLMClient(LLMClient):
+    def __init__(self, targets: List[LLMTarget]) -> None:
+        if not targets:
+            raise ValueError("ResilientLLMClient needs at least one target")
+        self.targets = targets
+
+    @property
+    def model(self) -> str:
+        return self.targets[0].model
+
+    # -----------------------
+    # Retries
+    # -----------------------
+
+    @staticmethod
+    async def _retry(target: LLMTarget, fn: Callable[[], Awaitable[T]]) -> T:
+        attempts = max(1, settings.LLM_RETRY_ATTEMPTS)
+        for attempt in range(attempts):
+            try:
+                return await fn()
+            except Exception as exc:
+                if attempt == attempts - 1 or not is_transient(exc):
+                    raise
+                delay = random.uniform(0, min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * 2 ** attempt))
+                LLM_RETRIES.labels(target.provider, target.model, "transient").inc()
+                logger.warning(
+                    f"[LLM] {target.label} transient error ({exc.__class__.__name__}); "
+                    f"retry {attempt + 1}/{attempts - 1} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+        raise RuntimeError("unreachable")
+
+    def _hedge_delay(self, target: LLMTarget, kind: str) -> Optional[float]:
+        if not settings.LLM_HEDGING_ENABLED:
+            return None
+        p95 = LATENCY.p95((target.provider, target.model, kind))
+        if p95 is None:
+            return None
+        return max(settings.LLM_HEDGE_MIN_DELAY, p95)
+
+    async def _race(
+        self,
+        index: int,
+        kind: str,
+        start: Callable[[LLMTarget], Awaitable[T]],
+        tried: List[int],
+    ) -> Tuple[T, int]:
+        """
+        Run ``start`` on target ``index``; hedge to ``index + 1`` once the
+        primary exceeds its p95. Returns (result, winning target index);
+        the indices started are appended to ``tried``.
+        """
+        primary = self.targets[index]
+        LATENCY.calls += 1
+
+        async def timed(i: int) -> T:
+            target = self.targets[i]
+            began = time.monotonic()
+            result = await self._retry(target, lambda: start(target))
+            LATENCY.record((target.provider, target.model, kind), time.monotonic() - began)
+            return result
+
+        tasks: Dict["asyncio.Task", int] = {asyncio.ensure_future(timed(index)): index}
+        tried.append(index)
+        delay = self._hedge_delay(primary, kind) if index + 1 < len(self.targets) else None
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and LATENCY.hedge_allowed():
+                    LATENCY.hedges += 1
+                    LLM_HEDGES.labels(primary.provider, primary.model).inc()
+                    alternate = index + 1
+                    logger.info(
+                        f"[LLM] {primary.label} exceeded p95 ({delay:.1f}s); hedging to {self.targets[alternate].label}"
+                    )
+                    tasks[asyncio.ensure_future(timed(alternate))] = alternate
+                    tried.append(alternate)
+
+            first_error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result(), tasks[task]
+                    first_error = first_error or task.exception()
+            assert first_error is not None
+            raise first_error
+        finally:
+            for task in tasks:
+                await _cancel(task)
+
+    # -----------------------
+    # LLMClient interface
+    # -----------------------
+
+    async def chat(self, messages: List[ChatMessage]) -> str:
+        index = 0
+        while True:
+            tried: List[int] = []
+            try:
+                text, _ = await self._race(index, "chat", lambda target: target.client.chat(messages), tried)
+                return text
+            except Exception as exc:
+                index = self._failover(tried, exc)
+
+    async def stream(self, messages: List[ChatMessage]) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            opened: List[AsyncIterator[str]] = []
+            tried: List[int] = []
+
+            async def open_stream(target: LLMTarget) -> Tuple[AsyncIterator[str], str]:
+                # Time-to-first-token is what hedging and failover act on.
+                agen = target.client.stream(messages).__aiter__()
+                opened.append(agen)
+                try:
+                    first = await agen.__anext__()
+                except StopAsyncIteration:
+                    first = ""
+                return agen, first
+
+            winner: Optional[AsyncIterator[str]] = None
+            try:
+                (winner, first), _ = await self._race(index, "ttft", open_stream, tried)
+            except Exception as exc:
+                index = self._failover(tried, exc)
+                continue
+            finally:
+                for agen in opened:
+                    if agen is not winner:
+                        await _aclose(agen)
+
+            try:
+                if first:
+                    yield first
+                async for delta in winner:
+                    yield delta
+            finally:
+                await _aclose(winner)
+            return
+
+    def _failover(self, tried: List[int], exc: Exception) -> int:
+        """
+        Index of the target to try next: the one after every target of the
+        failed race (a hedge may already have used ``index + 1``). Re-raises
+        ``exc`` if it is not transient or no target is left.
+        """
+        failed, following = self.targets[tried[0]], max(tried) + 1
+        if not is_transient(exc) or following >= len(self.targets):
+            raise exc
+        LLM_FAILOVERS.labels(failed.provider, failed.model).inc()
+        logger.warning(
+            f"[LLM] {failed.label} failed ({exc.__class__.__name__}: {exc}); "
+            f"failing over to {self.targets[following].label}"
+        )
+        return following
+
+    async def aclose(self) -> None:
+        # Targets are pooled clients owned by the provider registry.
+        return None
+
+
+async def _aclose(agen: AsyncIterator[str]) -> None:
+    aclose = getattr(agen, "aclose", None)
+    if aclose is not None:
+        try:
+            await aclose()
+        except Exception:
+            pass
@@ -0,0 +1,65 @@
+"""
+Token estimation helpers.
+
+``estimate_tokens`` is a cheap character-based approximation (~4 characters
+per token for English and code) used where an exact count is not required
+(RAG chunk sizes).
+
+``count_tokens`` / ``count_message_tokens`` are provider-aware and used for
+the rate limiter's tokens/min budget and context-window accounting: OpenAI
+models are counted with tiktoken when it is installed; otherwise (and for
+Claude, whose tokenizer is not published) a per-provider characters per
+token ratio is used.
+"""
+
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+from .base import ChatMessage
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Fixed per-message framing overhead (role markers etc.).
+_MESSAGE_OVERHEAD = 4
+
+# Average characters per token on ABAP/markdown. Claude's tokenizer splits
+# code into more tokens than OpenAI's o200k vocabulary.
+_CHARS_PER_TOKEN = {"openai": 4.0, "claude": 3.5}
+_DEFAULT_CHARS_PER_TOKEN = 3.5
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)."""
+    return max(1, len(text) // 4) if text else 0
+
+
+@lru_cache(maxsize=32)
+def _encoding(model: str) -> Optional[Any]:
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None  # encoding files could not be loaded (offline)
+
+
+def count_tokens(text: str, provider: str = "openai", model: Optional[str] = None) -> int:
+    """Token count of ``text`` for the provider's tokenizer (exact for OpenAI with tiktoken)."""
+    if not text:
+        return 0
+    provider = "claude" if provider.lower() == "anthropic" else provider.lower()
+    if provider == "openai":
+        encoding = _encoding(model or "gpt-4o")
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+    ratio = _CHARS_PER_TOKEN.get(provider, _DEFAULT_CHARS_PER_TOKEN)
+    return max(1, int(len(text) / ratio + 0.5))
+
+
+def count_message_tokens(messages: Iterable[ChatMessage], provider: str = "openai", model: Optional[str] = None) -> int:
+    return sum(count_tokens(m.content, provider, model) + _MESSAGE_OVERHEAD for m in messages)
@@ -0,0 +1,102 @@
+"""
+Token usage per job, including prompt-cache hits.
+
+The provider clients call ``record_usage`` after every completion. The job
+runner wraps the agent in ``track_usage()``; calls made anywhere below it
+(parallel unit calls, hedged requests) add to the same totals through a
+context variable, which are then stored in the job's metadata. Every call
+also feeds the ``chatpwc_llm_tokens_total`` counter.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..utils.metrics import LLM_TOKENS
+
+
+@dataclass
+class LLMUsage:
+    calls: int = 0
+    input_tokens: int = 0  # all prompt tokens, cached or not
+    cached_input_tokens: int = 0  # read from the provider's prompt cache
+    cache_write_tokens: int = 0  # written to the prompt cache (Claude)
+    output_tokens: int = 0
+    # Models that answered (more than one after a failover or hedge)
+    models: List[str] = field(default_factory=list)
+
+    def add(self, other: "LLMUsage") -> None:
+        self.calls += other.calls
+        self.input_tokens += other.input_tokens
+        self.cached_input_tokens += other.cached_input_tokens
+        self.cache_write_tokens += other.cache_write_tokens
+        self.output_tokens += other.output_tokens
+        self.models.extend(m for m in other.models if m not in self.models)
+
+    def as_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = asdict(self)
+        data["cache_hit_ratio"] = round(self.cached_input_tokens / self.input_tokens, 3) if self.input_tokens else 0.0
+        return data
+
+
+_CURRENT: "contextvars.ContextVar[Optional[LLMUsage]]" = contextvars.ContextVar("llm_usage", default=None)
+
+
+@contextmanager
+def track_usage() -> Iterator[LLMUsage]:
+    usage = LLMUsage()
+    token = _CURRENT.set(usage)
+    try:
+        yield usage
+    finally:
+        _CURRENT.reset(token)
+
+
+def record_usage(usage: Optional[LLMUsage], provider: str, model: str) -> None:
+    if usage is None:
+        return
+    for kind in ("input", "cached_input", "cache_write", "output"):
+        LLM_TOKENS.labels(provider, model, kind).inc(getattr(usage, f"{kind}_tokens"))
+    current = _CURRENT.get()
+    if current is not None:
+        current.add(usage)
+        if model not in current.models:
+            current.models.append(model)
+
+
+def _field(obj: Any, name: str) -> Any:
+    # SDK objects or plain dicts (batch API output)
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def openai_usage(usage: Any) -> Optional[LLMUsage]:
+    """From a Chat Completions ``usage`` (prompt_tokens include cached ones)."""
+    if usage is None:
+        return None
+    details = _field(usage, "prompt_tokens_details")
+    return LLMUsage(
+        calls=1,
+        input_tokens=_field(usage, "prompt_tokens") or 0,
+        cached_input_tokens=_field(details, "cached_tokens") or 0,
+        output_tokens=_field(usage, "completion_tokens") or 0,
+    )
+
+
+def anthropic_usage(usage: Any) -> Optional[LLMUsage]:
+    """From a Messages API ``usage`` (input_tokens exclude cache reads/writes)."""
+    if usage is None:
+        return None
+    read = _field(usage, "cache_read_input_tokens") or 0
+    write = _field(usage, "cache_creation_input_tokens") or 0
+    return LLMUsage(
+        calls=1,
+        input_tokens=(_field(usage, "input_tokens") or 0) + read + write,
+        cached_input_tokens=read,
+        cache_write_tokens=write,
+        output_tokens=_field(usage, "output_tokens") or 0,
+    )
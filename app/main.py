@@ -1,10 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 
-from .routers import chat, jobs, meta
+from .config import settings
+from .llm.provider_registry import aclose_llm_clients
+from .services.async_executor import CANCEL_GRACE, executor
+from .services import batch_service
+from .services.offline_batch import offline_dispatcher
+from .routers import artifacts, batches, chat, jobs, meta
 from .utils.logger import logger
+from .utils.metrics import render as render_metrics
+from .utils.tracing import setup_tracing
 
 app = FastAPI(title="AI Agent Wrapper Backend")
 
@@ -33,8 +40,46 @@ app.mount("/generated", StaticFiles(directory=str(generated_dir)), name="generat
 app.include_router(meta.router)
 app.include_router(chat.router)
 app.include_router(jobs.router)
+app.include_router(batches.router)
+app.include_router(artifacts.router)
 
 
 @app.get("/")
 async def root():
     return {"message": "AI Agent Wrapper Backend is running"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (job stages, LLM latency/tokens/retries, cache hits)."""
+    rendered = render_metrics()
+    if rendered is None:
+        return Response("prometheus_client is not installed or METRICS_ENABLED is off", status_code=501)
+    body, content_type = rendered
+    return Response(body, media_type=content_type)
+
+
+@app.on_event("startup")
+async def start_tracing():
+    setup_tracing()
+
+
+@app.on_event("startup")
+async def start_executor():
+    if settings.JOB_EXECUTOR == "inprocess":
+        await executor.start()
+        # Resumes polling provider batches left open by a previous run.
+        offline_dispatcher.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    await offline_dispatcher.stop()
+    if executor.started:
+        await executor.shutdown(drain_timeout=settings.EXECUTOR_DRAIN_TIMEOUT)
+        await batch_service.wait_for_runners(timeout=CANCEL_GRACE)
+
+
+@app.on_event("shutdown")
+async def close_llm_clients():
+    await aclose_llm_clients()
@@ -0,0 +1,237 @@
+"""
+retriever.py
+------------
+Chunked, inverted-index retrieval over the TS RAG knowledge base.
+
+The KB is split into sections/chunks once at load time and indexed with
+Okapi BM25. Queries are built from the tokens of the ABAP source (plus a
+small ABAP -> KB vocabulary expansion) and the top-k chunks are returned
+within a token budget, so prompt size scales with k and not with KB size.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..llm.tokens import estimate_tokens
+
+
+_BANNER_RE = re.compile(r"^-{10,}\s*$")
+_TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z0-9_/]*")
+
+_STOPWORDS = frozenset(
+    """
+    a an and are as at be by for from if in into is it its of on or the this
+    to use used with when where which should can etc not no any all only
+    """.split()
+)
+
+# ABAP statements -> vocabulary the KB uses for the matching TS sections.
+_ABAP_EXPANSIONS: Dict[str, Tuple[str, ...]] = {
+    "select": ("data", "model", "tables", "database", "performance"),
+    "join": ("data", "model", "tables"),
+    "tables": ("data", "model", "tables"),
+    "parameters": ("selection", "screen", "processing", "logic"),
+    "select-options": ("selection", "screen", "processing", "logic"),
+    "form": ("subroutines", "processing", "logic"),
+    "perform": ("subroutines", "processing", "logic"),
+    "method": ("class", "methods", "objects"),
+    "class": ("class", "objects"),
+    "function": ("function", "modules", "objects"),
+    "include": ("includes", "objects"),
+    "message": ("error", "handling", "messages"),
+    "raise": ("error", "handling"),
+    "exceptions": ("error", "handling"),
+    "authority-check": ("authorization", "security"),
+    "cl_salv_table": ("alv", "output"),
+    "reuse_alv_grid_display": ("alv", "output"),
+    "idoc": ("interface", "idoc"),
+    "commit": ("transport", "dependencies"),
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased word tokens. Identifiers like ZR_SD_SALES_REPORT also emit
+    their underscore-separated parts so they can match prose in the KB.
+    """
+    tokens: List[str] = []
+    for raw in _TOKEN_RE.findall(text):
+        word = raw.lower()
+        if word not in _STOPWORDS:
+            tokens.append(word)
+        if "_" in word or "/" in word:
+            tokens.extend(
+                part for part in re.split(r"[_/]+", word)
+                if len(part) > 1 and part not in _STOPWORDS
+            )
+    return tokens
+
+
+def abap_query_terms(abap_code: str) -> List[str]:
+    """
+    Build the retrieval query from ABAP source: its own tokens plus the KB
+    vocabulary associated with the statements it uses.
+    """
+    lowered = abap_code.lower()
+    terms = tokenize(abap_code)
+    for statement, expansion in _ABAP_EXPANSIONS.items():
+        if re.search(rf"(?<![\w-]){re.escape(statement)}(?![\w-])", lowered):
+            terms.extend(expansion)
+    return terms
+
+
+# =======================
+# Chunking
+# =======================
+
+@dataclass
+class Chunk:
+    id: int
+    title: str
+    text: str
+    tokens: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.tokens:
+            self.tokens = estimate_tokens(self.text)
+
+
+def split_kb(kb_text: str, max_chunk_chars: int = 1200) -> List[Chunk]:
+    """
+    Split the KB into chunks.
+
+    Top-level sections are delimited by dashed banners (``-----`` / title /
+    ``-----``); inside a section every ``## `` heading starts a new chunk, and
+    chunks larger than ``max_chunk_chars`` are further split on blank lines.
+    Sub-chunks carry their section title so they stay self-describing.
+    """
+    lines = kb_text.splitlines()
+    sections: List[Tuple[str, List[str]]] = [("", [])]
+
+    i = 0
+    while i < len(lines):
+        if (
+            _BANNER_RE.match(lines[i])
+            and i + 2 < len(lines)
+            and _BANNER_RE.match(lines[i + 2])
+        ):
+            sections.append((lines[i + 1].strip(), []))
+            i += 3
+            continue
+        sections[-1][1].append(lines[i])
+        i += 1
+
+    pieces: List[Tuple[str, str]] = []
+    for title, body in sections:
+        current: List[str] = []
+        for line in body:
+            if line.startswith("## ") and any(x.strip() for x in current):
+                pieces.append((title, "\n".join(current)))
+                current = []
+            current.append(line)
+        if any(x.strip() for x in current):
+            pieces.append((title, "\n".join(current)))
+
+    chunks: List[Chunk] = []
+    for title, text in pieces:
+        for part in _split_oversized(text.strip(), max_chunk_chars):
+            body = f"{title}\n{part}" if title else part
+            chunks.append(Chunk(id=len(chunks), title=title, text=body))
+    return chunks
+
+
+def _split_oversized(text: str, max_chars: int) -> List[str]:
+    if len(text) <= max_chars:
+        return [text]
+    parts: List[str] = []
+    current = ""
+    for para in re.split(r"\n\s*\n", text):
+        if current and len(current) + len(para) + 2 > max_chars:
+            parts.append(current)
+            current = para
+        else:
+            current = f"{current}\n\n{para}" if current else para
+    if current:
+        parts.append(current)
+    return parts
+
+
+# =======================
+# BM25 Index
+# =======================
+
+@dataclass
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 scoring.
+
+    ``postings`` maps a term to ``[(chunk_id, term_frequency), ...]`` so a
+    query only touches the chunks that contain at least one query term.
+    """
+
+    chunks: List[Chunk]
+    k1: float = 1.5
+    b: float = 0.75
+    postings: Dict[str, List[Tuple[int, int]]] = field(default_factory=dict)
+    idf: Dict[str, float] = field(default_factory=dict)
+    doc_len: List[int] = field(default_factory=list)
+    avg_len: float = 0.0
+
+    def __post_init__(self) -> None:
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for chunk in self.chunks:
+            counts = Counter(tokenize(chunk.text))
+            self.doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term].append((chunk.id, tf))
+        self.postings = dict(postings)
+
+        n = len(self.chunks)
+        self.avg_len = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for term, p in self.postings.items()
+        }
+
+    def score(self, query_terms: Iterable[str]) -> Dict[int, float]:
+        # Repeated query terms count, but sub-linearly, so a term used 200
+        # times in a program doesn't drown out everything else.
+        weights = {t: 1.0 + math.log(c) for t, c in Counter(query_terms).items()}
+        scores: Dict[int, float] = defaultdict(float)
+        for term, qw in weights.items():
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for chunk_id, tf in plist:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[chunk_id] / (self.avg_len or 1.0))
+                scores[chunk_id] += qw * idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query_terms: Iterable[str], k: int) -> List[Tuple[Chunk, float]]:
+        scores = self.score(query_terms)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self.chunks[cid], s) for cid, s in ranked]
+
+
+def pack_chunks(
+    ranked: List[Tuple[Chunk, float]],
+    max_tokens: Optional[int],
+) -> List[Chunk]:
+    """
+    Keep the best-ranked chunks that fit into ``max_tokens`` and return them
+    in KB order so the context reads like the source document.
+    """
+    selected: List[Chunk] = []
+    used = 0
+    for chunk, _ in ranked:
+        if max_tokens is not None and used + chunk.tokens > max_tokens:
+            continue
+        selected.append(chunk)
+        used += chunk.tokens
+    return sorted(selected, key=lambda c: c.id)
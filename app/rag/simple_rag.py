@@ -1,8 +1,19 @@
+import hashlib
 from pathlib import Path
 from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
+from .retriever import BM25Index, Chunk, abap_query_terms, pack_chunks, split_kb
+from .vector_index import VectorIndex, load_index
+from ..config import settings
+from ..utils.tracing import span
 
-KB_PATH = Path(__file__).resolve().parents[2] / "data" / "ts_rag_kb.txt"
+
+KB_PATH = Path(__file__).resolve().parents[1] / "data" / "ts_rag_kb.txt"
+INDEX_DIR = Path(settings.RAG_INDEX_DIR) if settings.RAG_INDEX_DIR else KB_PATH.parent / "rag_index"
+
+# Reciprocal-rank-fusion constant (standard value from the RRF paper).
+_RRF_K = 60
 
 
 @lru_cache
@@ -12,9 +23,76 @@ def _load_kb() -> str:
     return ""
 
 
-def get_context_for_abap(abap_code: str) -> str:
+@lru_cache
+def _load_vector_index() -> Optional[VectorIndex]:
+    return load_index(INDEX_DIR, kb_path=KB_PATH)
+
+
+@lru_cache
+def _load_index() -> BM25Index:
+    # Prefer the chunks from the prebuilt index so workers don't re-parse the KB.
+    vindex = _load_vector_index()
+    chunks = vindex.chunks if vindex else split_kb(_load_kb(), max_chunk_chars=settings.RAG_CHUNK_CHARS)
+    return BM25Index(chunks)
+
+
+@lru_cache
+def kb_version() -> str:
+    """Hash of the indexed KB chunks; changes whenever retrievable content does."""
+    digest = hashlib.sha256()
+    for chunk in _load_index().chunks:
+        digest.update(chunk.text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def _fuse(*rankings: List[Tuple[Chunk, float]]) -> List[Tuple[Chunk, float]]:
+    scores: Dict[int, float] = {}
+    by_id: Dict[int, Chunk] = {}
+    for ranking in rankings:
+        for rank, (chunk, _) in enumerate(ranking):
+            by_id[chunk.id] = chunk
+            scores[chunk.id] = scores.get(chunk.id, 0.0) + 1.0 / (_RRF_K + rank + 1)
+    ordered = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return [(by_id[cid], s) for cid, s in ordered]
+
+
+def warm_up() -> None:
+    """
+    Load the KB and indexes now. Called in the Celery parent process so
+    forked workers share them (copy-on-write) instead of loading their own.
     """
-    Simple RAG: return the entire KB; you can later do semantic search.
+    _load_index()
+    kb_version()
+
+
+def get_context_for_abap(
+    abap_code: str,
+    k: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> str:
     """
-    kb = _load_kb()
-    return kb
+    Retrieve the top-k KB chunks relevant to the given ABAP code, capped at
+    ``max_tokens`` (estimated). Defaults come from settings.
+
+    BM25 ranking is fused with the persisted vector index when one has been
+    built (``python -m app.rag.vector_index``). Results are memoised, so
+    objects in a batch that share code (includes, duplicates) share the
+    retrieval.
+    """
+    with span("rag_retrieval"):
+        return _retrieve(abap_code, k or settings.RAG_TOP_K, max_tokens or settings.RAG_MAX_CONTEXT_TOKENS)
+
+
+@lru_cache(maxsize=settings.RAG_CONTEXT_CACHE_SIZE)
+def _retrieve(abap_code: str, k: int, max_tokens: int) -> str:
+    index = _load_index()
+    query_terms = abap_query_terms(abap_code)
+    ranked = index.search(query_terms, k=k)
+
+    vindex = _load_vector_index()
+    if vindex is not None:
+        ranked = _fuse(ranked, vindex.search(" ".join(query_terms), k=k))[:k]
+
+    chunks = pack_chunks(ranked, max_tokens=max_tokens)
+    return "\n\n".join(c.text for c in chunks)
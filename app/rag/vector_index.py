@@ -0,0 +1,187 @@
+"""
+vector_index.py
+---------------
+Persisted, memory-mapped vector index for the TS RAG knowledge base.
+
+Build offline (or at deploy time) with:
+
+    python -m app.rag.vector_index
+
+This writes two files to ``settings.RAG_INDEX_DIR``:
+
+- ``manifest.json``  : chunk texts/titles, content hashes and KB hash
+- ``embeddings.npy`` : float32 matrix, one L2-normalised row per chunk
+
+Workers open ``embeddings.npy`` with ``np.load(mmap_mode="r")`` so every
+Celery process shares the same pages through the OS page cache instead of
+parsing and embedding the KB on its own. Rebuilds only re-embed chunks
+whose content hash changed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .retriever import Chunk, split_kb, tokenize
+from ..utils.logger import logger
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+MANIFEST_NAME = "manifest.json"
+EMBEDDINGS_NAME = "embeddings.npy"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def kb_hash(kb_path: Path) -> str:
+    """
+    Content hash of the KB, used to detect a KB edited after the last build.
+    Unlike mtime/size it survives redeploys and touches of an unchanged file.
+    """
+    return hashlib.sha256(kb_path.read_bytes()).hexdigest()
+
+
+class HashingEmbedder:
+    """
+    Offline feature-hashing embedder.
+
+    Each token is hashed into one of ``dim`` buckets with a hash-derived sign
+    and weighted by sub-linear term frequency. Embeddings depend only on the
+    chunk's own text, which is what makes incremental rebuilds possible.
+    """
+
+    def __init__(self, dim: int = 1024) -> None:
+        if np is None:
+            raise RuntimeError("numpy is required for the vector index")
+        self.dim = dim
+
+    def _bucket(self, token: str) -> Tuple[int, float]:
+        h = zlib.crc32(token.encode("utf-8"))
+        return h % self.dim, (1.0 if (h >> 31) & 1 else -1.0)
+
+    def embed(self, text: str) -> "np.ndarray":
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token, tf in Counter(tokenize(text)).items():
+            idx, sign = self._bucket(token)
+            vec[idx] += sign * (1.0 + math.log(tf))
+        norm = float(np.linalg.norm(vec))
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def embed_many(self, texts: List[str]) -> "np.ndarray":
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack([self.embed(t) for t in texts])
+
+
+@dataclass
+class VectorIndex:
+    chunks: List[Chunk]
+    embeddings: Any  # np.ndarray / np.memmap, shape (n_chunks, dim)
+    embedder: HashingEmbedder
+
+    def search(self, query: str, k: int) -> List[Tuple[Chunk, float]]:
+        if not self.chunks:
+            return []
+        q = self.embedder.embed(query)
+        scores = self.embeddings @ q
+        k = min(k, len(self.chunks))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.chunks[int(i)], float(scores[i])) for i in top if scores[i] > 0]
+
+
+def build_index(kb_path: Path, index_dir: Path, dim: int = 1024, max_chunk_chars: int = 1200) -> Dict[str, int]:
+    """
+    (Re)build the persisted index. Chunks whose content hash is unchanged
+    reuse their previous embedding row.
+    """
+    embedder = HashingEmbedder(dim)
+    chunks = split_kb(kb_path.read_text(encoding="utf-8"), max_chunk_chars=max_chunk_chars)
+    hashes = [content_hash(c.text) for c in chunks]
+
+    previous: Dict[str, Any] = {}
+    manifest_path = index_dir / MANIFEST_NAME
+    emb_path = index_dir / EMBEDDINGS_NAME
+    if manifest_path.exists() and emb_path.exists():
+        old = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if old.get("dim") == dim:
+            old_emb = np.load(emb_path, mmap_mode="r")
+            previous = {h: old_emb[i] for i, h in enumerate(old["hashes"])}
+
+    matrix = np.zeros((len(chunks), dim), dtype=np.float32)
+    to_embed = [i for i, h in enumerate(hashes) if h not in previous]
+    for i, h in enumerate(hashes):
+        if h in previous:
+            matrix[i] = previous[h]
+    if to_embed:
+        matrix[to_embed] = embedder.embed_many([chunks[i].text for i in to_embed])
+
+    index_dir.mkdir(parents=True, exist_ok=True)
+    # Write-then-rename so running workers never map a half-written file.
+    tmp_emb = index_dir / (EMBEDDINGS_NAME + ".tmp")
+    with open(tmp_emb, "wb") as fh:
+        np.save(fh, matrix)
+    os.replace(tmp_emb, emb_path)
+
+    manifest = {
+        "dim": dim,
+        "kb_sha256": kb_hash(kb_path),
+        "hashes": hashes,
+        "chunks": [{"title": c.title, "text": c.text, "tokens": c.tokens} for c in chunks],
+    }
+    tmp_manifest = index_dir / (MANIFEST_NAME + ".tmp")
+    tmp_manifest.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(tmp_manifest, manifest_path)
+
+    stats = {"chunks": len(chunks), "embedded": len(to_embed), "reused": len(chunks) - len(to_embed)}
+    logger.info(f"[RAG] Built vector index at {index_dir}: {stats}")
+    return stats
+
+
+def load_index(index_dir: Path, kb_path: Optional[Path] = None) -> Optional[VectorIndex]:
+    """
+    Open a persisted index (embeddings memory-mapped read-only). Returns None
+    when numpy is missing, the index was never built, or the KB has changed
+    since it was built.
+    """
+    if np is None:
+        return None
+    manifest_path = index_dir / MANIFEST_NAME
+    emb_path = index_dir / EMBEDDINGS_NAME
+    if not (manifest_path.exists() and emb_path.exists()):
+        return None
+
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    if kb_path is not None and kb_path.exists() and manifest.get("kb_sha256") != kb_hash(kb_path):
+        logger.warning(f"[RAG] Vector index at {index_dir} is stale; rebuild with `python -m app.rag.vector_index`")
+        return None
+
+    chunks = [
+        Chunk(id=i, title=c["title"], text=c["text"], tokens=c["tokens"])
+        for i, c in enumerate(manifest["chunks"])
+    ]
+    embeddings = np.load(emb_path, mmap_mode="r")
+    return VectorIndex(chunks=chunks, embeddings=embeddings, embedder=HashingEmbedder(manifest["dim"]))
+
+
+if __name__ == "__main__":
+    from ..config import settings
+    from .simple_rag import KB_PATH, INDEX_DIR
+
+    build_index(KB_PATH, INDEX_DIR, dim=settings.RAG_EMBED_DIM, max_chunk_chars=settings.RAG_CHUNK_CHARS)
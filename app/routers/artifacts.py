@@ -0,0 +1,87 @@
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse, RedirectResponse, Response
+
+from ..config import settings
+from ..storage.artifacts import ARTIFACT_STORE, Artifact, LocalArtifactStore, is_artifact_key
+
+router = APIRouter(prefix="/artifacts", tags=["artifacts"])
+
+
+class _ArtifactFileResponse(FileResponse):
+    chunk_size = 1024 * 1024  # fewer thread round-trips per download
+
+
+def artifact_url(artifact: Dict[str, Any], filename: str) -> str:
+    """Immutable download URL of an artifact stored in a job's metadata."""
+    return f"/artifacts/{artifact['key']}?filename={quote(filename)}"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def _safe_filename(filename: Optional[str], default: str) -> str:
+    name = Path((filename or "").replace("\\", "/")).name
+    name = "".join(c for c in name if c.isprintable() and c != '"')
+    return name or default
+
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def serve_artifact(artifact: Artifact, filename: str, request: Request, cache_control: str) -> Response:
+    """
+    Download response for ``artifact``: 304 for a matching If-None-Match,
+    then a presigned redirect, an nginx X-Accel-Redirect or the file itself
+    (with Range support).
+    """
+    headers = {"ETag": artifact.etag, "Cache-Control": cache_control}
+    if _etag_matches(request.headers.get("if-none-match"), artifact.etag):
+        return Response(status_code=304, headers=headers)
+
+    url = ARTIFACT_STORE.download_url(artifact, _content_disposition(filename))
+    if url is not None:
+        # The presigned URL expires; only the redirect's target is immutable.
+        max_age = max(settings.ARTIFACT_S3_URL_TTL // 2, 0)
+        return RedirectResponse(url, status_code=307, headers={"Cache-Control": f"private, max-age={max_age}"})
+
+    path = ARTIFACT_STORE.local_path(artifact.key)
+    if path is None or not path.exists():
+        raise HTTPException(status_code=404, detail="Artifact not found")
+
+    if settings.ARTIFACT_ACCEL_REDIRECT and isinstance(ARTIFACT_STORE, LocalArtifactStore):
+        relative = path.relative_to(ARTIFACT_STORE.root).as_posix()
+        headers.update({
+            "X-Accel-Redirect": settings.ARTIFACT_ACCEL_REDIRECT.rstrip("/") + "/" + relative,
+            "Content-Disposition": _content_disposition(filename),
+        })
+        return Response(media_type=artifact.media_type, headers=headers)
+
+    return _ArtifactFileResponse(path, media_type=artifact.media_type, filename=filename, headers=headers)
+
+
+@router.api_route("/{key}", methods=["GET", "HEAD"])
+def download_artifact(key: str, request: Request, filename: Optional[str] = Query(None)):
+    """
+    Download a stored artifact by content hash. The URL never changes
+    meaning, so responses are cacheable forever (ARTIFACT_CACHE_CONTROL).
+    Served by whichever replica receives the request.
+    """
+    if not is_artifact_key(key):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    artifact = ARTIFACT_STORE.stat(key)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return serve_artifact(artifact, _safe_filename(filename, key), request, settings.ARTIFACT_CACHE_CONTROL)
@@ -0,0 +1,110 @@
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse
+
+from ..config import settings
+from ..storage.artifacts import Artifact
+from .artifacts import artifact_url, serve_artifact
+from ..schemas import BatchCreateRequest, BatchItemResponse, BatchResponse
+from ..services import batch_service
+from ..services.batch_service import BatchObject
+from ..storage.memory_store import MEMORY_STORE, Job
+
+router = APIRouter(prefix="/batches", tags=["batches"])
+
+
+def _output_url(job: Job, filename: str, fallback: str) -> Optional[str]:
+    if job.metadata.get("artifact"):
+        return artifact_url(job.metadata["artifact"], filename)
+    return fallback if job.output_docx_path else None
+
+
+async def _batch_response(batch: Job) -> BatchResponse:
+    # One store round-trip for all children.
+    children: Dict[str, Job] = {job.id: job for job in await MEMORY_STORE.aget_jobs(batch.metadata["job_ids"])}
+
+    items = []
+    for item in batch.metadata["items"]:
+        child = children[item["job_id"]]
+        items.append(BatchItemResponse(
+            name=item["name"],
+            job_id=child.id,
+            status=child.status,
+            output_docx_url=_output_url(child, f"{item['name']}.docx", f"/jobs/{child.id}/docx"),
+            error=child.error,
+        ))
+
+    return BatchResponse(
+        batch_id=batch.id,
+        chat_id=batch.chat_id,
+        status=batch.status,
+        total=len(items),
+        distinct=len(children),
+        items=items,
+        archive_url=_output_url(batch, f"{batch.id}_ts.zip", f"/batches/{batch.id}/archive"),
+    )
+
+
+async def _submit(chat_id: str, objects, offline: bool = False) -> BatchResponse:
+    try:
+        batch = await batch_service.submit_batch(chat_id, objects, offline=offline)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return await _batch_response(batch)
+
+
+@router.post("/{chat_id}", response_model=BatchResponse)
+async def create_batch(chat_id: str, req: BatchCreateRequest):
+    """
+    Document many ABAP objects (e.g. a whole transport) in one request.
+    Progress events for the batch are available at ``/jobs/{batch_id}/events``.
+    """
+    objects = [BatchObject(name=o.name, source=o.source) for o in req.objects]
+    return await _submit(chat_id, objects, offline=req.offline)
+
+
+@router.post("/{chat_id}/upload", response_model=BatchResponse)
+async def upload_batch(chat_id: str, file: UploadFile = File(...), offline: bool = Form(False)):
+    """Like ``POST /batches/{chat_id}`` with the sources in a zip archive."""
+    data = await file.read(settings.BATCH_MAX_UPLOAD_BYTES + 1)
+    if len(data) > settings.BATCH_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Upload too large")
+    try:
+        objects = batch_service.read_zip_objects(data)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return await _submit(chat_id, objects, offline=offline)
+
+
+@router.get("/{batch_id}", response_model=BatchResponse)
+async def get_batch_status(batch_id: str):
+    try:
+        batch = await batch_service.aget_batch(batch_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return await _batch_response(batch)
+
+
+@router.get("/{batch_id}/archive")
+def download_batch_archive(batch_id: str, request: Request):
+    try:
+        batch = batch_service.get_batch(batch_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    if not batch.output_docx_path:
+        raise HTTPException(status_code=404, detail="Batch archive not ready")
+
+    if batch.metadata.get("artifact"):
+        artifact = Artifact.from_dict(batch.metadata["artifact"])
+        return serve_artifact(artifact, Path(batch.output_docx_path).name, request, "no-cache")
+
+    path = Path(batch.output_docx_path)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Batch archive not found")
+
+    return FileResponse(path, filename=path.name, media_type="application/zip")
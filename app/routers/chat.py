@@ -1,6 +1,13 @@
-from fastapi import APIRouter, HTTPException
-from ..schemas import ChatCreateRequest, ChatResponse, ChatHistoryResponse, MessageSchema
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, Response
+
+from ..config import settings
+from ..schemas import ChatCreateRequest, ChatResponse, ChatHistoryResponse
 from ..services import chat_service
+from ..storage.memory_store import Message
  
 router = APIRouter(prefix="/chat", tags=["chat"])
  
@@ -23,17 +30,76 @@ async def create_chat(req: ChatCreateRequest):
     )
  
  
+_MESSAGE_FIELDS = ("role", "content", "timestamp")
+
+
+def _message_json(message: Message, fields: Set[str], max_chars: Optional[int]) -> Dict[str, Any]:
+    # Plain dicts: building a MessageSchema per message is the slow part of
+    # large pages.
+    item: Dict[str, Any] = {"seq": message.seq}
+    if "role" in fields:
+        item["role"] = message.role
+    if "timestamp" in fields:
+        item["timestamp"] = datetime.fromtimestamp(message.timestamp, tz=timezone.utc).isoformat()
+    if "content" in fields:
+        content = message.content
+        if max_chars is not None and len(content) > max_chars:
+            item["content"] = content[:max_chars]
+            item["truncated"] = True
+        else:
+            item["content"] = content
+    return item
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
 @router.get("/{chat_id}/history", response_model=ChatHistoryResponse)
-async def get_chat_history(chat_id: str):
+async def get_chat_history(
+    chat_id: str,
+    limit: int = Query(settings.CHAT_HISTORY_PAGE_SIZE, ge=1, le=settings.CHAT_HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, ge=1, description="next_cursor of the previous page"),
+    since: Optional[int] = Query(None, ge=0, description="Only messages after this seq"),
+    max_chars: Optional[int] = Query(None, ge=0, description="Truncate contents to this length"),
+    fields: str = Query(",".join(_MESSAGE_FIELDS), description="Comma-separated: role,content,timestamp"),
+    if_none_match: Optional[str] = Header(default=None),
+):
+    """
+    One page of chat history, oldest first.
+
+    - default: the newest ``limit`` messages; pass ``next_cursor`` back as
+      ``cursor`` for older pages
+    - ``since``: messages after that seq, for incremental polling (repeat
+      with the last seq while ``has_more``)
+
+    The ETag only changes when a message is added, so a poller sending it in
+    If-None-Match gets 304 without any messages being read.
+    """
+    selected = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = selected - set(_MESSAGE_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
     try:
-        chat = chat_service.get_chat(chat_id)
+        latest_seq = await chat_service.last_message_seq(chat_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Chat not found")
- 
-    messages = [
-        MessageSchema(role=m.role, content=m.content, timestamp=m.timestamp)
-        for m in chat.messages
-    ]
-    return ChatHistoryResponse(chat_id=chat.id, messages=messages)
- 
- 
\ No newline at end of file
+
+    etag = f'W/"{latest_seq}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    messages, has_more = await chat_service.get_history_page(chat_id, limit, cursor=cursor, since=since)
+    body = {
+        "chat_id": chat_id,
+        "messages": [_message_json(m, selected, max_chars) for m in messages],
+        "latest_seq": latest_seq,
+        "has_more": has_more,
+        "next_cursor": messages[0].seq if has_more and since is None and messages else None,
+    }
+    return JSONResponse(content=body, headers=headers)
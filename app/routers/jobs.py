@@ -1,90 +1,190 @@
 from pathlib import Path
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
-import asyncio
-from fastapi import APIRouter, HTTPException
+import json
+from fastapi import APIRouter, Header, HTTPException, Query, Request
 from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
 
-from ..schemas import JobCreateRequest, JobResponse
+from ..config import settings
+from ..schemas import JobCreateRequest, JobLogsResponse, JobResponse
 from ..services import job_service, job_manager
+from ..services.job_manager import JobStatus
+from ..services.event_bus import JobEvent, event_bus, job_channel
+from ..services.offline_batch import enqueue_offline
 # from ..storage.memory_store import JOB_STORE
-from ..storage.memory_store import MEMORY_STORE
+from ..storage.artifacts import DOCX_MEDIA_TYPE, Artifact
+from ..storage.memory_store import MEMORY_STORE, Job
 
 from ..utils.logger import logger
+from .artifacts import artifact_url, serve_artifact
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
 
-@router.post("/{chat_id}", response_model=JobResponse)
-async def create_job_for_chat(chat_id: str, req: JobCreateRequest):
+def _docx_url(job: Job) -> Optional[str]:
+    # Content-addressed URL (cacheable, any replica) once the DOCX is stored.
+    if job.metadata.get("artifact"):
+        return artifact_url(job.metadata["artifact"], f"{job.id}_ts.docx")
+    return f"/jobs/{job.id}/docx" if job.output_docx_path else None
+
+
+def _sse_data(text: str) -> str:
     """
-    Create a job and enqueue it to Celery.
+    ``data:`` fields for a plain-text payload, one per line: a multi-line
+    log entry would otherwise end the event early. Clients join them back
+    with newlines.
     """
-    job = await job_service.create_job(chat_id=chat_id, prompt=req.prompt)
-    job_service.enqueue_job(job.id)
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(f"data: {line}" for line in lines)
+
+
+def _is_final(event: JobEvent) -> bool:
+    return event.type == "status" and event.data["status"] in JobStatus.TERMINAL
+
+
+def _sse_event(event: JobEvent) -> str:
+    if event.type == "token":
+        # JSON-encoded so newlines survive SSE framing
+        return f"id: {event.id}\nevent: token\ndata: {json.dumps(event.data)}\n\n"
+    if event.type == "status":
+        if _is_final(event):
+            return f"id: {event.id}\ndata: {json.dumps(event.data)}\n\n"
+        return f"id: {event.id}\nevent: status\ndata: {json.dumps(event.data)}\n\n"
+    return f"id: {event.id}\n{_sse_data(event.data)}\n\n"
+
+
+def _job_response(job: Job) -> JobResponse:
     return JobResponse(
-        id=job.id,
+        job_id=job.id,
         chat_id=job.chat_id,
-        prompt=job.prompt,
         status=job.status,
         result_message=job.result_message,
-        output_docx_path=job.output_docx_path,
+        output_docx_url=_docx_url(job),
         error=job.error,
+        usage=job.metadata.get("llm_usage"),
+        context=job.metadata.get("context"),
+        timings=job.metadata.get("timings"),
+        profile_url=f"/jobs/{job.id}/profile" if job.metadata.get("profile_files") else None,
     )
 
 
+@router.post("/{chat_id}", response_model=JobResponse)
+async def create_job_for_chat(chat_id: str, req: JobCreateRequest):
+    """
+    Create a job and enqueue it (Celery or the in-process executor), or
+    queue it for the next provider batch with ``offline``. Follow-ups with
+    ``with_history`` also get the chat's earlier turns, bounded by the
+    context builder. With ``profile`` (and JOB_PROFILING_ENABLED) the run is
+    profiled; see ``profile_url`` once it has finished.
+    """
+    if req.profile and not settings.JOB_PROFILING_ENABLED:
+        raise HTTPException(status_code=400, detail="Job profiling is disabled (JOB_PROFILING_ENABLED)")
+    if req.profile and req.offline:
+        raise HTTPException(status_code=400, detail="Offline jobs cannot be profiled")
+    metadata = {}
+    if req.with_history:
+        metadata["with_history"] = True
+    if req.profile:
+        metadata["profile"] = True
+    job = await job_service.create_job(
+        chat_id=chat_id,
+        prompt=req.prompt,
+        metadata=metadata or None,
+    )
+    if req.offline:
+        await enqueue_offline(job.id)
+    else:
+        job_service.enqueue_job(job.id, priority=req.priority)
+    return _job_response(job)
+
+
 @router.get("/{job_id}", response_model=JobResponse)
 async def get_job_status(job_id: str):
     try:
-        job = job_service.get_job(job_id)
+        job = await job_service.aget_job(job_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    return JobResponse(
-        id=job.id,
-        chat_id=job.chat_id,
-        prompt=job.prompt,
-        status=job.status,
-        result_message=job.result_message,
-        output_docx_path=job.output_docx_path,
-        error=job.error,
-    )
+    return _job_response(job)
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    try:
+        cancelled = await job_service.cancel_job(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not cancelled:
+        raise HTTPException(status_code=409, detail="Job can no longer be cancelled")
+    return _job_response(await job_service.aget_job(job_id))
+
+
+@router.get("/{job_id}/logs", response_model=JobLogsResponse)
+async def get_job_logs(job_id: str, offset: int = Query(0, ge=0)):
+    """
+    Log lines from ``offset`` on. Pollers pass back ``next_offset`` and only
+    read new lines; the log is append-only so no lock is taken.
+    """
+    lines = await job_manager.job_manager.read_logs(job_id, offset)  # type: ignore[attr-defined]
+    if lines is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobLogsResponse(job_id=job_id, lines=lines, next_offset=offset + len(lines))
 
 
 @router.get("/{job_id}/events")
-async def stream_job_events(job_id: str):
+async def stream_job_events(job_id: str, last_event_id: Optional[str] = Header(default=None)):
     """
-    Optional SSE endpoint to stream job logs + final result.
+    Optional SSE endpoint to stream job logs, LLM tokens (``event: token``)
+    and the final result.
+
+    Events are pushed from the event bus as they are published; each one
+    carries an ``id`` so a reconnecting client can resume with
+    ``Last-Event-ID``. Resuming a finished job replays the retained events
+    and always ends with its final status.
     """
+    state = await job_manager.job_manager.get_job(job_id)  # type: ignore[attr-defined]
+    if not state:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    resume_from = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
 
     async def event_generator() -> AsyncGenerator[str, None]:
-        last_len = 0
-        while True:
-            state = await job_manager.job_manager.get_job(job_id)  # type: ignore[attr-defined]
-            if not state:
-                raise HTTPException(status_code=404, detail="Job not found")
-
-            logs = state.get("logs", [])
-            if len(logs) > last_len:
-                for line in logs[last_len:]:
-                    yield f"data: {line}\n\n"
-                last_len = len(logs)
-
-            if state["status"] in ("completed", "failed"):
-                import json
-                payload = json.dumps(
-                    {"status": state["status"], "result": state.get("result")}
-                )
-                yield f"data: {payload}\n\n"
+        finished = state["status"] in JobStatus.TERMINAL
+        payload = {"status": state["status"], "result": state.get("result")}
+        if finished and resume_from is None:
+            # Already finished: answer from the job state, the channel
+            # history may have expired.
+            for line in state.get("logs", []):
+                yield f"{_sse_data(line)}\n\n"
+            yield f"data: {json.dumps(payload)}\n\n"
+            return
+
+        if finished:
+            # Resuming a finished job: replay what is left of the history
+            # instead of waiting for events that will never come, and end
+            # with the job state if the final status event was pruned.
+            for event in await event_bus.replay(job_channel(job_id), resume_from):
+                yield _sse_event(event)
+                if _is_final(event):
+                    return
+            yield f"data: {json.dumps(payload)}\n\n"
+            return
+
+        async for event in event_bus.subscribe(job_channel(job_id), last_event_id=resume_from):
+            yield _sse_event(event)
+            if _is_final(event):
                 break
 
-            await asyncio.sleep(0.5)
-
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
 
 @router.get("/{job_id}/docx")
-async def download_job_docx(job_id: str):
+def download_job_docx(job_id: str, request: Request):
+    """
+    The job's DOCX, from the artifact store when it was stored there (strong
+    ETag, Range). ``output_docx_url`` points at the immutable
+    ``/artifacts/...`` URL instead, which skips the job lookup.
+    """
     try:
         job = job_service.get_job(job_id)
     except KeyError:
@@ -93,15 +193,37 @@ async def download_job_docx(job_id: str):
     if not job.output_docx_path:
         raise HTTPException(status_code=404, detail="No DOCX generated for this job")
 
+    if job.metadata.get("artifact"):
+        artifact = Artifact.from_dict(job.metadata["artifact"])
+        return serve_artifact(artifact, f"{job.id}_ts.docx", request, "no-cache")
+
     path = Path(job.output_docx_path)
     if not path.exists():
         raise HTTPException(status_code=404, detail="DOCX file not found")
 
-    return FileResponse(
-        path,
-        filename=path.name,
-        media_type=(
-            "application/vnd.openxmlformats-officedocument."
-            "wordprocessingml.document"
-        ),
-    )
+    return FileResponse(path, filename=path.name, media_type=DOCX_MEDIA_TYPE)
+
+
+@router.get("/{job_id}/profile")
+async def download_job_profile(job_id: str, format: str = Query("text", pattern="^(text|pstats)$")):
+    """
+    Profile of a job run with ``profile``: a text report (top functions by
+    cumulative time, top allocation sites) or the raw ``.prof`` for pstats /
+    snakeviz with ``format=pstats``.
+    """
+    try:
+        job = await job_service.aget_job(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    files = job.metadata.get("profile_files")
+    if not files:
+        raise HTTPException(status_code=404, detail="No profile recorded for this job")
+
+    path = Path(files["report"] if format == "text" else files["pstats"])
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Profile file not found")
+
+    if format == "text":
+        return FileResponse(path, filename=path.name, media_type="text/plain; charset=utf-8")
+    return FileResponse(path, filename=path.name, media_type="application/octet-stream")
@@ -1,6 +1,11 @@
 from fastapi import APIRouter
 from ..llm.provider_registry import list_providers_and_models
 from ..services.agent_registry import list_agents
+from ..services.context_builder import context_builder
+from ..services.event_bus import event_bus
+from ..services.result_cache import result_cache
+from ..storage.memory_store import MEMORY_STORE
+from ..utils.memory import process_rss_bytes
 from ..schemas import ProviderModelsResponse, AgentsListResponse, AgentInfo
 
 router = APIRouter(prefix="/meta", tags=["meta"])
@@ -15,3 +20,15 @@ async def get_models():
 async def get_agents():
     agents = list_agents()
     return {"data": [AgentInfo(**a) for a in agents]}
+
+
+@router.get("/memory")
+async def get_memory_usage():
+    """Memory gauges of this API process (worker processes report their own)."""
+    return {
+        "rss_bytes": process_rss_bytes(),
+        "store": MEMORY_STORE.stats(),
+        "event_bus": event_bus.stats(),
+        "result_cache": result_cache.stats(),
+        "chat_summaries": context_builder.stats(),
+    }
@@ -1,12 +1,15 @@
 from datetime import datetime
-from typing import Optional, List, Literal
+from typing import Any, Dict, Optional, List, Literal
 from pydantic import BaseModel
 
 
 class MessageSchema(BaseModel):
-    role: Literal["user", "assistant", "system"]
-    content: str
-    timestamp: datetime
+    seq: int
+    # Optional: omitted unless selected with ``fields``
+    role: Optional[Literal["user", "assistant", "system"]] = None
+    content: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    truncated: bool = False  # content cut to ``max_chars``
 
 
 class ChatCreateRequest(BaseModel):
@@ -28,19 +31,64 @@ class ChatResponse(BaseModel):
 class ChatHistoryResponse(BaseModel):
     chat_id: str
     messages: List[MessageSchema]
+    latest_seq: int  # newest message in the chat; poll with ``since``
+    has_more: bool  # older messages (or newer ones with ``since``) remain
+    next_cursor: Optional[int] = None  # pass as ``cursor`` for the previous page
 
 
 class JobCreateRequest(BaseModel):
     prompt: str  # ABAP code input
+    priority: int = 0  # higher runs first (in-process executor only)
+    offline: bool = False  # run through the provider batch API (slower, cheaper)
+    with_history: bool = False  # follow-up: send the chat's earlier turns (bounded)
+    profile: bool = False  # cProfile/tracemalloc the run (needs JOB_PROFILING_ENABLED)
 
 
 class JobResponse(BaseModel):
     job_id: str
-    status: Literal["queued", "running", "completed", "failed"]
+    status: Literal["queued", "running", "completed", "failed", "cancelled"]
     chat_id: str
     result_message: Optional[str] = None
     output_docx_url: Optional[str] = None
     error: Optional[str] = None
+    usage: Optional[Dict[str, Any]] = None  # LLM tokens incl. prompt-cache hits
+    context: Optional[Dict[str, Any]] = None  # history sent with a with_history job
+    timings: Optional[List[Dict[str, Any]]] = None  # spans: queue wait, RAG, LLM, DOCX...
+    profile_url: Optional[str] = None  # set once a profiled job has finished
+
+
+class JobLogsResponse(BaseModel):
+    job_id: str
+    lines: List[str]
+    next_offset: int  # pass as ``offset`` to get only newer lines
+
+
+class BatchObjectRequest(BaseModel):
+    name: str  # object name, used for the DOCX file name
+    source: str  # ABAP code
+
+
+class BatchCreateRequest(BaseModel):
+    objects: List[BatchObjectRequest]
+    offline: bool = False  # run through the provider batch API (slower, cheaper)
+
+
+class BatchItemResponse(BaseModel):
+    name: str
+    job_id: str
+    status: Literal["queued", "running", "completed", "failed", "cancelled"]
+    output_docx_url: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    batch_id: str
+    chat_id: str
+    status: Literal["queued", "running", "completed", "failed", "cancelled"]
+    total: int
+    distinct: int
+    items: List[BatchItemResponse]
+    archive_url: Optional[str] = None
 
 
 class ProviderModelsResponse(BaseModel):
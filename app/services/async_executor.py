@@ -0,0 +1,193 @@
+"""
+In-process async job executor (JOB_EXECUTOR=inprocess).
+
+Runs agent jobs as asyncio tasks in the FastAPI event loop instead of going
+through Celery. Jobs are almost entirely waiting on LLM HTTP calls, so one
+process can run hundreds of them concurrently.
+
+- one priority queue and worker pool per provider, sized by the provider's
+  concurrency limit, so a saturated provider never blocks the others
+- a global semaphore caps total concurrent jobs
+- queued or running jobs can be cancelled
+- shutdown drains queued/running jobs up to a timeout, then cancels the
+  running ones and records the never-started ones as cancelled
+- ``submit`` returns a future resolved when the job has finished, for
+  callers that wait on their jobs (in-process batches)
+"""
+
+import asyncio
+import itertools
+from typing import Dict, List, Optional, Set, Tuple
+
+from ..config import settings
+from ..utils.logger import logger
+from .job_manager import JobStatus, job_manager
+
+
+QueueItem = Tuple[int, int, str]  # (-priority, sequence, job_id)
+
+# Seconds cancelled jobs get at shutdown to record their status.
+CANCEL_GRACE = 5.0
+
+
+class AsyncJobExecutor:
+    def __init__(self, max_concurrency: int, provider_limits: Dict[str, int], default_limit: int) -> None:
+        self.max_concurrency = max_concurrency
+        self.provider_limits = provider_limits
+        self.default_limit = default_limit
+        self._queues: Dict[str, "asyncio.PriorityQueue[QueueItem]"] = {}
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._done: Dict[str, "asyncio.Future[None]"] = {}
+        self._cancelled: Set[str] = set()
+        self._global: Optional[asyncio.Semaphore] = None
+        self._seq = itertools.count()
+        self._accepting = False
+
+    @property
+    def started(self) -> bool:
+        return self._accepting
+
+    async def start(self) -> None:
+        self._global = asyncio.Semaphore(self.max_concurrency)
+        self._accepting = True
+        logger.info(f"[Executor] Started in-process executor (max {self.max_concurrency} concurrent jobs)")
+
+    def _queue_for(self, provider: str) -> "asyncio.PriorityQueue[QueueItem]":
+        queue = self._queues.get(provider)
+        if queue is None:
+            queue = self._queues[provider] = asyncio.PriorityQueue()
+            limit = self.provider_limits.get(provider, self.default_limit)
+            self._workers.extend(
+                asyncio.create_task(self._worker(provider, queue), name=f"executor-{provider}-{i}")
+                for i in range(limit)
+            )
+        return queue
+
+    def submit(self, job_id: str, provider: str, priority: int = 0) -> "asyncio.Future[None]":
+        """
+        Queue a job; higher ``priority`` runs first within its provider. The
+        returned future resolves once the job has finished (whatever its
+        status) or the executor has shut down.
+        """
+        if not self._accepting:
+            raise RuntimeError("Executor is not running")
+        provider = provider.lower()
+        if provider == "anthropic":
+            provider = "claude"
+        done = self._done.get(job_id)
+        if done is None:
+            done = self._done[job_id] = asyncio.get_running_loop().create_future()
+        self._queue_for(provider).put_nowait((-priority, next(self._seq), job_id))
+        return done
+
+    def _finished(self, job_id: str) -> None:
+        done = self._done.pop(job_id, None)
+        if done is not None and not done.done():
+            done.set_result(None)
+
+    async def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job. Returns False if it is unknown/finished."""
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+            return True
+        queued = any(item[2] == job_id for q in self._queues.values() for item in q._queue)  # type: ignore[attr-defined]
+        if queued:
+            self._cancelled.add(job_id)
+            await job_manager.update_job(job_id, JobStatus.CANCELLED, log="Job cancelled")
+        return queued
+
+    @staticmethod
+    async def _run(job_id: str) -> None:
+        # Imported lazily: tasks imports Celery.
+        from ..tasks import _run_job
+
+        try:
+            await _run_job(job_id)
+        except asyncio.CancelledError:
+            # Recorded by the job's own task, so shutdown can wait for it.
+            logger.info(f"[Executor] Job {job_id} cancelled")
+            await job_manager.update_job(job_id, JobStatus.CANCELLED, log="Job cancelled")
+            raise
+
+    async def _worker(self, provider: str, queue: "asyncio.PriorityQueue[QueueItem]") -> None:
+        assert self._global is not None
+        while True:
+            _, _, job_id = await queue.get()
+            try:
+                if job_id in self._cancelled:
+                    self._cancelled.discard(job_id)
+                    continue
+                async with self._global:
+                    task = asyncio.create_task(self._run(job_id), name=f"job-{job_id}")
+                    self._running[job_id] = task
+                    try:
+                        await task
+                    except asyncio.CancelledError:
+                        if not task.cancelled():
+                            raise  # the worker itself is being cancelled
+                    except Exception:
+                        # Already recorded on the job by _run_job.
+                        pass
+                    finally:
+                        self._running.pop(job_id, None)
+            finally:
+                self._finished(job_id)
+                queue.task_done()
+
+    def _take_queued(self) -> List[str]:
+        """Remove every queued job from the queues; ids not already cancelled."""
+        job_ids = []
+        for queue in self._queues.values():
+            while not queue.empty():
+                _, _, job_id = queue.get_nowait()
+                queue.task_done()
+                if job_id in self._cancelled:
+                    self._cancelled.discard(job_id)
+                    self._finished(job_id)
+                else:
+                    job_ids.append(job_id)
+        return job_ids
+
+    async def shutdown(self, drain_timeout: float) -> None:
+        """Stop accepting jobs, let queued/running jobs finish, then cancel the rest."""
+        self._accepting = False
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(q.join() for q in self._queues.values())),
+                timeout=drain_timeout,
+            )
+        except asyncio.TimeoutError:
+            # Taken off the queues first so no worker starts them meanwhile.
+            unstarted = self._take_queued()
+            logger.warning(
+                f"[Executor] Drain timed out; cancelling {len(self._running)} running "
+                f"and {len(unstarted)} queued jobs"
+            )
+            for job_id in unstarted:
+                await job_manager.update_job(job_id, JobStatus.CANCELLED, log="Job cancelled: server shut down before it started")
+                self._finished(job_id)
+            running = list(self._running.values())
+            for task in running:
+                task.cancel()
+            if running:
+                # Let cancelled jobs unwind: record their status, close streams.
+                _, pending = await asyncio.wait(running, timeout=CANCEL_GRACE)
+                if pending:
+                    logger.warning(f"[Executor] {len(pending)} jobs did not stop within {CANCEL_GRACE:g}s")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
+        for job_id in list(self._done):
+            self._finished(job_id)
+        logger.info("[Executor] In-process executor stopped")
+
+
+executor = AsyncJobExecutor(
+    max_concurrency=settings.EXECUTOR_MAX_CONCURRENCY,
+    provider_limits=settings.EXECUTOR_PROVIDER_CONCURRENCY,
+    default_limit=settings.EXECUTOR_DEFAULT_PROVIDER_CONCURRENCY,
+)
@@ -0,0 +1,325 @@
+"""
+Batch TS generation for whole transports/packages of ABAP objects.
+
+A batch is stored as a Job with ``metadata["kind"] == "batch"``; its
+metadata lists the submitted objects and the child job generating each
+one. Identical sources (after comment/whitespace normalisation) share one
+child job. Child jobs are ordinary jobs, so their status, events and DOCX
+downloads work as for single jobs.
+
+Scheduling:
+- Celery: a chain of waves of at most BATCH_MAX_PARALLEL child tasks
+  (each wave a chord), ending in a task that builds the combined archive;
+  the same task is each chord's error callback, so a child task that dies
+  (hard time limit, lost worker, revoke) still finalises the batch
+- in-process: children are submitted to the in-process executor (provider
+  limits, priority, cancel and drain apply), at most BATCH_MAX_PARALLEL at
+  a time, then the same finalizer
+- offline: children go to the provider batch dispatcher (offline_batch.py);
+  the batch is finalised when its last child reaches a terminal state,
+  whether it ran in a provider batch or fell back to the online queue
+
+The finalizer writes ``<batch_id>_ts.zip`` with one DOCX per object and a
+manifest.json. It is idempotent: a batch already finished is returned as-is.
+Children left queued (waves after a failed one) are recorded as cancelled,
+children whose task died as failed.
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import threading
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Set
+
+from ..config import settings
+from ..storage.artifacts import ARTIFACT_STORE, store_artifact
+from ..storage.memory_store import MEMORY_STORE, Job
+from ..utils.docx_generator import GENERATED_DIR
+from ..utils.ids import new_id
+from ..utils.logger import logger
+from .chat_service import aget_chat
+from .job_completion import fail_job
+from .job_manager import JobStatus, job_manager
+from .job_service import create_job
+from .result_cache import normalize_abap
+
+
+BATCH_KIND = "batch"
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+# Keeps in-process batch runners referenced until they finish.
+_RUNNING: Set["asyncio.Task"] = set()
+# Batches being finalised by this process.
+_FINALIZING: Set[str] = set()
+
+
+@dataclass
+class BatchObject:
+    name: str
+    source: str
+
+
+def read_zip_objects(data: bytes) -> List[BatchObject]:
+    """Extract ABAP sources (BATCH_ZIP_EXTENSIONS) from an uploaded zip."""
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile:
+        raise ValueError("Upload is not a valid zip archive")
+
+    objects: List[BatchObject] = []
+    total = 0
+    with archive:
+        for info in archive.infolist():
+            path = PurePosixPath(info.filename)
+            if info.is_dir() or "__MACOSX" in path.parts or path.name.startswith("."):
+                continue
+            if path.suffix.lower() not in settings.BATCH_ZIP_EXTENSIONS:
+                continue
+            total += info.file_size
+            if total > settings.BATCH_MAX_UPLOAD_BYTES:
+                raise ValueError("Zip contents exceed BATCH_MAX_UPLOAD_BYTES")
+            source = archive.read(info).decode("utf-8", errors="replace")
+            objects.append(BatchObject(name=path.stem, source=source))
+    return objects
+
+
+def _unique_names(objects: List[BatchObject]) -> List[str]:
+    seen: Dict[str, int] = {}
+    names = []
+    for obj in objects:
+        base = _SAFE_NAME_RE.sub("_", obj.name).strip("._") or "object"
+        count = seen.get(base.lower(), 0) + 1
+        seen[base.lower()] = count
+        names.append(base if count == 1 else f"{base}_{count}")
+    return names
+
+
+async def create_batch(chat_id: str, objects: List[BatchObject], offline: bool = False) -> Job:
+    """Create the batch record and one child job per distinct source."""
+    if not objects:
+        raise ValueError("A batch needs at least one ABAP object")
+    if len(objects) > settings.BATCH_MAX_OBJECTS:
+        raise ValueError(f"A batch can contain at most {settings.BATCH_MAX_OBJECTS} objects")
+    await aget_chat(chat_id)  # KeyError for unknown chats
+
+    batch_id = new_id("batch")
+    by_source: Dict[str, str] = {}
+    items = []
+    for name, obj in zip(_unique_names(objects), objects):
+        digest = hashlib.sha256(normalize_abap(obj.source).encode("utf-8")).hexdigest()
+        job_id = by_source.get(digest)
+        if job_id is None:
+            job = await create_job(
+                chat_id=chat_id,
+                prompt=obj.source,
+                metadata={"batch_id": batch_id, "object_name": name},
+            )
+            job_id = by_source[digest] = job.id
+        items.append({"name": name, "job_id": job_id})
+
+    job_ids = list(by_source.values())
+    batch = await MEMORY_STORE.create_job(
+        chat_id=chat_id,
+        prompt=f"Batch of {len(items)} ABAP objects",
+        metadata={"kind": BATCH_KIND, "items": items, "job_ids": job_ids, "offline": offline},
+        job_id=batch_id,
+    )
+    logger.info(
+        f"[Batch] Created batch {batch_id}: {len(items)} objects, "
+        f"{len(job_ids)} distinct ({len(items) - len(job_ids)} duplicates)"
+    )
+    return batch
+
+
+def _check_batch(batch: Job) -> Job:
+    if batch.metadata.get("kind") != BATCH_KIND:
+        raise KeyError(f"Batch {batch.id} not found")
+    return batch
+
+
+def get_batch(batch_id: str) -> Job:
+    return _check_batch(MEMORY_STORE.get_job(batch_id))
+
+
+async def aget_batch(batch_id: str) -> Job:
+    return _check_batch(await MEMORY_STORE.aget_job(batch_id))
+
+
+def _waves(job_ids: List[str]) -> List[List[str]]:
+    size = max(1, settings.BATCH_MAX_PARALLEL)
+    return [job_ids[i:i + size] for i in range(0, len(job_ids), size)]
+
+
+def enqueue_batch(batch: Job) -> None:
+    job_ids: List[str] = batch.metadata["job_ids"]
+
+    if settings.JOB_EXECUTOR == "inprocess":
+        task = asyncio.create_task(run_batch_inprocess(batch.id, job_ids), name=f"batch-{batch.id}")
+        _RUNNING.add(task)
+        task.add_done_callback(_RUNNING.discard)
+        return
+
+    from celery import chain, chord, group
+    from ..tasks import batch_progress_task, finalize_batch_task, run_batch_item
+
+    # Each wave is a chord so the next one starts only when it is done
+    # (adjacent groups in a chain would be merged into one). Child task ids
+    # are the job ids, as for single jobs, so they can be revoked.
+    waves = _waves(job_ids)
+    steps = []
+    for i, wave in enumerate(waves):
+        step = chord(
+            group(run_batch_item.si(job_id).set(task_id=job_id) for job_id in wave),
+            batch_progress_task.si(batch.id, i + 1, len(waves)),
+        )
+        # A failed chord stops the chain before the finalizer.
+        step.link_error(finalize_batch_task.si(batch.id))
+        steps.append(step)
+    chain(*steps, finalize_batch_task.si(batch.id)).apply_async()
+    logger.info(f"[Batch] Enqueued batch {batch.id} to Celery in {len(waves)} waves")
+
+
+async def submit_batch(chat_id: str, objects: List[BatchObject], offline: bool = False) -> Job:
+    batch = await create_batch(chat_id, objects, offline=offline)
+    await job_manager.update_job(batch.id, JobStatus.RUNNING, log=f"Scheduling {len(batch.metadata['job_ids'])} jobs")
+    if offline:
+        # Finalised by finalize_when_done once every child is done.
+        from .offline_batch import enqueue_offline
+        for job_id in batch.metadata["job_ids"]:
+            await enqueue_offline(job_id)
+    else:
+        enqueue_batch(batch)
+    return await aget_batch(batch.id)
+
+
+async def record_progress(batch_id: str, wave: int, waves: int) -> None:
+    await job_manager.update_job(batch_id, JobStatus.RUNNING, log=f"Wave {wave}/{waves} finished")
+
+
+async def run_batch_inprocess(batch_id: str, job_ids: List[str]) -> None:
+    from .async_executor import executor
+
+    semaphore = asyncio.Semaphore(max(1, settings.BATCH_MAX_PARALLEL))
+    provider = (await aget_chat((await aget_batch(batch_id)).chat_id)).provider
+
+    async def run(job_id: str) -> None:
+        async with semaphore:
+            if not executor.started:
+                # Shutting down: the child would otherwise stay queued.
+                await job_manager.update_job(job_id, JobStatus.CANCELLED, log="Job cancelled: server shut down before it started")
+                return
+            # Failures and cancellations are recorded on the child job.
+            await executor.submit(job_id, provider=provider)
+
+    try:
+        await asyncio.gather(*(run(job_id) for job_id in job_ids), return_exceptions=True)
+    finally:
+        await finalize_batch(batch_id)
+
+
+async def finalize_when_done(batch_id: str) -> None:
+    """
+    Finalise an offline batch once all its children are terminal. Called
+    whenever a batch child reaches a terminal state; online batches are
+    finalised by their scheduler instead.
+    """
+    batch = await aget_batch(batch_id)
+    if not batch.metadata.get("offline") or batch.status in JobStatus.TERMINAL:
+        return
+    children = await MEMORY_STORE.aget_jobs(batch.metadata["job_ids"])
+    if all(child.status in JobStatus.TERMINAL for child in children):
+        await finalize_batch(batch_id)
+
+
+async def wait_for_runners(timeout: float) -> None:
+    """At shutdown, after the executor: let in-process batches finalise."""
+    if _RUNNING:
+        _, pending = await asyncio.wait(set(_RUNNING), timeout=timeout)
+        if pending:
+            logger.warning(f"[Batch] {len(pending)} batches did not finalise within {timeout:g}s")
+
+
+def _write_archive(path: Path, entries: List[Dict[str, object]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Per writer: another process may be finalising the same batch.
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    # DOCX files are already deflated; store them as-is.
+    with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED) as archive:
+        for entry in entries:
+            docx_path = entry.pop("_docx_path", None)
+            artifact_key = entry.pop("_artifact_key", None)
+            if artifact_key:
+                # The child's local file was moved into the artifact store.
+                with ARTIFACT_STORE.open(str(artifact_key)) as src, archive.open(str(entry["docx"]), "w") as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            elif docx_path and Path(str(docx_path)).exists():
+                archive.write(str(docx_path), arcname=str(entry["docx"]))
+        archive.writestr("manifest.json", json.dumps(entries, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+    tmp.replace(path)
+
+
+async def finalize_batch(batch_id: str) -> Job:
+    """Build the combined archive and mark the batch finished (once)."""
+    batch = await aget_batch(batch_id)
+    if batch.status in JobStatus.TERMINAL or batch_id in _FINALIZING:
+        return batch
+    _FINALIZING.add(batch_id)
+    try:
+        return await _finalize(batch)
+    finally:
+        _FINALIZING.discard(batch_id)
+
+
+async def _finalize(batch: Job) -> Job:
+    batch_id = batch.id
+    children: Dict[str, Job] = {job.id: job for job in await MEMORY_STORE.aget_jobs(batch.metadata["job_ids"])}
+    for child in children.values():
+        # Every runner is done by now: a child left behind never ran (a wave
+        # before it failed) or its task died (time limit, lost worker).
+        if child.status == JobStatus.QUEUED:
+            await job_manager.update_job(child.id, JobStatus.CANCELLED, log="Job cancelled: its batch stopped before it ran")
+            child.status = JobStatus.CANCELLED
+        elif child.status == JobStatus.RUNNING:
+            await fail_job(child.id, RuntimeError("its task was lost"))
+            child.status = JobStatus.FAILED
+
+    entries: List[Dict[str, object]] = []
+    for item in batch.metadata["items"]:
+        child = children[item["job_id"]]
+        done = child.status == JobStatus.COMPLETED and bool(child.output_docx_path)
+        entries.append({
+            "name": item["name"],
+            "job_id": child.id,
+            "status": child.status,
+            "error": child.error,
+            "docx": f"{item['name']}.docx" if done else None,
+            "_docx_path": child.output_docx_path if done else None,
+            "_artifact_key": child.metadata["artifact"]["key"] if done and child.metadata.get("artifact") else None,
+        })
+
+    completed = sum(1 for e in entries if e["status"] == JobStatus.COMPLETED)
+    archive_path = GENERATED_DIR / f"{batch_id}_ts.zip"
+    await asyncio.get_running_loop().run_in_executor(None, _write_archive, archive_path, entries)
+
+    status = JobStatus.COMPLETED if completed else JobStatus.FAILED
+    summary = {"total": len(entries), "completed": completed, "failed": len(entries) - completed}
+    metadata: Dict[str, object] = {"summary": summary}
+    artifact = await store_artifact(str(archive_path))
+    if artifact is not None:
+        metadata["artifact"] = artifact.as_dict()
+    await MEMORY_STORE.update_job(batch_id, output_docx_path=str(archive_path), metadata=metadata)
+    await job_manager.update_job(
+        batch_id,
+        status,
+        log=f"Batch finished: {completed}/{len(entries)} objects documented",
+        result={"output_docx_path": str(archive_path), **summary},
+    )
+    logger.info(f"[Batch] Batch {batch_id} finished: {summary}")
+    return await aget_batch(batch_id)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional, Tuple
 from datetime import datetime  # only needed if you later timestamp messages
  
 from ..storage.memory_store import MEMORY_STORE, Chat, Message
@@ -20,6 +20,11 @@ async def create_chat(provider: str, model: str, agent_id: str, title: str | Non
 # Get a chat synchronously using MEMORY_STORE.get_chat
 def get_chat(chat_id: str) -> Chat:
     return MEMORY_STORE.get_chat(chat_id)
+
+
+# Same, for coroutines: blocking backends are read in a worker thread
+async def aget_chat(chat_id: str) -> Chat:
+    return await MEMORY_STORE.aget_chat(chat_id)
  
  
 # Add a message using MEMORY_STORE's async add_message
@@ -31,4 +36,24 @@ async def add_message_by_id(chat_id: str, role: str, content: str) -> Message:
  
 # If you already have a Chat object and just want history:
 def get_history(chat: Chat) -> List[Message]:
-    return chat.messages
\ No newline at end of file
+    return chat.messages
+
+
+async def last_message_seq(chat_id: str) -> int:
+    return await MEMORY_STORE.alast_message_seq(chat_id)
+
+
+# One page of history, oldest first. Without ``since``: the newest ``limit``
+# messages before ``cursor``; with ``since``: the first ``limit`` messages
+# after it. Also returns whether more messages remain in that direction.
+async def get_history_page(
+    chat_id: str,
+    limit: int,
+    cursor: Optional[int] = None,
+    since: Optional[int] = None,
+) -> Tuple[List[Message], bool]:
+    if since is not None:
+        messages = await MEMORY_STORE.aget_messages(chat_id, after=since, limit=limit + 1)
+        return messages[:limit], len(messages) > limit
+    messages = await MEMORY_STORE.aget_messages(chat_id, before=cursor, limit=limit + 1, newest=True)
+    return messages[-limit:], len(messages) > limit
@@ -0,0 +1,227 @@
+"""
+Bounded chat history for follow-up jobs.
+
+``ContextBuilder.build`` turns a chat's earlier messages into at most
+CHAT_CONTEXT_MAX_TOKENS of prompt:
+
+- the newest messages verbatim (at least CHAT_CONTEXT_MIN_RECENT, truncated
+  if a single message is larger than the budget)
+- everything older as one rolling summary, written by a cheap model
+  (CHAT_SUMMARY_PROVIDER / CHAT_SUMMARY_MODEL)
+
+Summaries are cached per chat together with the last seq they cover, so each
+turn only folds in messages that have just left the verbatim window. When the
+window overflows it is cut back to half the budget, so a summary call happens
+every few turns rather than on every one. The cache is per process; a process
+without it rebuilds the summary once, in CHAT_SUMMARY_CHUNK_TOKENS pieces.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from ..config import settings
+from ..llm.base import ChatMessage
+from ..llm.provider_registry import create_llm_client
+from ..llm.tokens import count_message_tokens, count_tokens
+from ..storage.memory_store import MEMORY_STORE, Chat, Message
+from ..utils.keyed_lock import KeyedLock
+from ..utils.logger import logger
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an SAP ABAP "
+    "documentation assistant. Merge the new messages into the existing summary. Keep "
+    "requirements, decisions, SAP object names, open questions and the structure of any "
+    "generated specification; drop wording that does not affect later answers. "
+    "Reply with the updated summary only, at most {words} words."
+)
+
+_PAGE = 200  # messages loaded per storage read
+_TRUNCATED = "\n[... truncated]"
+
+
+@dataclass(slots=True)
+class _Summary:
+    upto_seq: int  # last message folded in
+    text: str
+
+
+@dataclass(slots=True)
+class HistoryContext:
+    messages: List[ChatMessage]
+    tokens: int
+    verbatim: int  # messages sent as they are
+    summarized_upto: int  # seq covered by the summary (0: none)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "tokens": self.tokens,
+            "verbatim_messages": self.verbatim,
+            "summarized_upto_seq": self.summarized_upto,
+        }
+
+
+class ContextBuilder:
+    def __init__(self, cache_size: int) -> None:
+        self.cache_size = cache_size
+        self._summaries: "OrderedDict[str, _Summary]" = OrderedDict()
+        self._locks = KeyedLock()
+        self.summary_calls = 0
+
+    async def build(self, chat: Chat, provider: str, model: str) -> HistoryContext:
+        """History of ``chat`` for a request to provider/model, within the token budget."""
+        # One builder per chat at a time, so concurrent turns share a summary call.
+        async with self._locks.hold(chat.id):
+            summary = self._cached(chat.id)
+            pending = await self._load_after(chat.id, summary.upto_seq if summary else 0)
+            counts = [self._count(m, provider, model) for m in pending]
+
+            summary_budget = settings.CHAT_SUMMARY_MAX_TOKENS if (summary or pending) else 0
+            recent_budget = max(settings.CHAT_CONTEXT_MAX_TOKENS - summary_budget, 0)
+
+            if sum(counts) > recent_budget:
+                split = len(pending) - self._window(counts, recent_budget // 2)
+                folded, pending, counts = pending[:split], pending[split:], counts[split:]
+                summary = await self._fold(chat.id, summary, folded, provider, model)
+
+            messages: List[ChatMessage] = []
+            if summary is not None:
+                messages.append(ChatMessage(role="user", content=f"Summary of the earlier conversation:\n{summary.text}"))
+            # Kept messages that are still too large are cut to share what is left.
+            remaining = settings.CHAT_CONTEXT_MAX_TOKENS - count_message_tokens(messages, provider, model)
+            caps = counts if sum(counts) <= remaining else _fair_share(counts, max(remaining, 0))
+            for message, tokens, cap in zip(pending, counts, caps):
+                content = message.content if cap >= tokens else _truncate(message.content, cap - 4, provider, model)
+                messages.append(ChatMessage(role=message.role, content=content))
+
+            return HistoryContext(
+                messages=messages,
+                tokens=count_message_tokens(messages, provider, model),
+                verbatim=len(pending),
+                summarized_upto=summary.upto_seq if summary else 0,
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {"summaries": len(self._summaries), "summary_calls": self.summary_calls}
+
+    # -----------------------
+    # Internals
+    # -----------------------
+
+    def _cached(self, chat_id: str) -> Optional[_Summary]:
+        summary = self._summaries.get(chat_id)
+        if summary is not None:
+            self._summaries.move_to_end(chat_id)
+        return summary
+
+    def _store(self, chat_id: str, summary: _Summary) -> None:
+        self._summaries[chat_id] = summary
+        self._summaries.move_to_end(chat_id)
+        while len(self._summaries) > self.cache_size:
+            self._summaries.popitem(last=False)
+
+    @staticmethod
+    async def _load_after(chat_id: str, after: int) -> List[Message]:
+        messages: List[Message] = []
+        while True:
+            page = await MEMORY_STORE.aget_messages(chat_id, after=after, limit=_PAGE)
+            messages.extend(page)
+            if len(page) < _PAGE:
+                return messages
+            after = page[-1].seq
+
+    @staticmethod
+    def _count(message: Message, provider: str, model: str) -> int:
+        return count_tokens(message.content, provider, model) + 4
+
+    @staticmethod
+    def _window(counts: List[int], budget: int) -> int:
+        """How many of the newest messages to keep verbatim."""
+        keep, used = 0, 0
+        for tokens in reversed(counts):
+            if keep >= settings.CHAT_CONTEXT_MIN_RECENT and used + tokens > budget:
+                break
+            keep += 1
+            used += tokens
+        return min(keep, len(counts))
+
+    async def _fold(
+        self,
+        chat_id: str,
+        summary: Optional[_Summary],
+        messages: List[Message],
+        provider: str,
+        model: str,
+    ) -> Optional[_Summary]:
+        """
+        Merge ``messages`` into the chat's summary, one chunk per call. On
+        failure the older summary is kept and the messages are left out of
+        this turn's prompt; the next turn tries again.
+        """
+        for chunk in _chunks(messages, settings.CHAT_SUMMARY_CHUNK_TOKENS, provider, model):
+            try:
+                text = await self._summarize(summary.text if summary else "", chunk)
+            except Exception as exc:
+                logger.warning(f"[Context] Summarizing chat {chat_id} failed: {exc}")
+                return summary
+            summary = _Summary(upto_seq=chunk[-1].seq, text=text.strip())
+            self._store(chat_id, summary)
+        return summary
+
+    async def _summarize(self, previous: str, messages: List[Message]) -> str:
+        client = create_llm_client(settings.CHAT_SUMMARY_PROVIDER, settings.CHAT_SUMMARY_MODEL)
+        transcript = "\n\n".join(f"{m.role.upper()}:\n{m.content}" for m in messages)
+        self.summary_calls += 1
+        return await client.chat([
+            ChatMessage(
+                role="system",
+                content=SUMMARY_SYSTEM_PROMPT.format(words=settings.CHAT_SUMMARY_MAX_TOKENS * 3 // 4),
+                cache=True,
+            ),
+            ChatMessage(
+                role="user",
+                content=f"Current summary:\n{previous or '(none)'}\n\nNew messages:\n\n{transcript}\n",
+            ),
+        ])
+
+
+def _chunks(messages: List[Message], budget: int, provider: str, model: str) -> List[List[Message]]:
+    chunks: List[List[Message]] = []
+    current: List[Message] = []
+    used = 0
+    for message in messages:
+        tokens = count_tokens(message.content, provider, model)
+        if current and used + tokens > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(message)
+        used += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _fair_share(counts: List[int], budget: int) -> List[int]:
+    """Split ``budget`` so small messages stay whole and large ones get equal caps."""
+    caps = list(counts)
+    left = budget
+    order = sorted(range(len(counts)), key=counts.__getitem__)
+    for n, i in enumerate(order):
+        caps[i] = min(counts[i], left // (len(order) - n))
+        left -= caps[i]
+    return caps
+
+
+def _truncate(text: str, tokens: int, provider: str, model: str) -> str:
+    """Keep the start of ``text`` within about ``tokens`` tokens."""
+    tokens -= count_tokens(_TRUNCATED, provider, model)
+    if tokens <= 0:
+        return _TRUNCATED.strip()
+    # Start from a generous character estimate and shrink until it fits.
+    end = min(len(text), tokens * 4)
+    while end > 0 and count_tokens(text[:end], provider, model) > tokens:
+        end = int(end * 0.9)
+    return text[:end] + _TRUNCATED
+
+
+context_builder = ContextBuilder(settings.CHAT_SUMMARY_CACHE_SIZE)
@@ -0,0 +1,262 @@
+"""
+Push-based job event bus.
+
+Publishers (Celery tasks, the job manager) push events onto a per-job
+channel; SSE handlers subscribe and are woken only when something is
+published, so idle streams cost nothing. Every event gets a monotonically
+increasing id per channel and a bounded history is kept so clients can
+resume with ``Last-Event-ID``. Token chunks have a history of their own
+(EVENT_TOKEN_HISTORY_SIZE): a long stream only drops its oldest tokens from
+replay, never the log and status events.
+
+Backends:
+- ``InMemoryEventBus``: asyncio fan-out inside one process.
+- ``RedisEventBus``: Redis pub/sub for live delivery plus a capped list for
+  replay, so API replicas see events published by Celery workers. Any
+  ``redis.asyncio``-compatible client (e.g. fakeredis) can be injected.
+"""
+
+import asyncio
+import json
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Set
+
+from ..config import settings
+from ..utils.logger import logger
+
+
+@dataclass(slots=True)
+class JobEvent:
+    id: int
+    type: str  # "log" | "token" | "status"
+    data: Any
+
+    def to_json(self) -> str:
+        return json.dumps({"id": self.id, "type": self.type, "data": self.data})
+
+    @classmethod
+    def from_json(cls, raw: Any) -> "JobEvent":
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        obj = json.loads(raw)
+        return cls(id=obj["id"], type=obj["type"], data=obj["data"])
+
+
+def job_channel(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def _is_token(type: str) -> bool:
+    return type == "token"
+
+
+class EventBus:
+    async def publish(self, channel: str, type: str, data: Any) -> JobEvent:
+        raise NotImplementedError
+
+    def subscribe(self, channel: str, last_event_id: Optional[int] = None) -> AsyncIterator[JobEvent]:
+        """
+        Yield events after ``last_event_id`` (replayed from history), then
+        live events as they are published. Runs until the consumer stops.
+        """
+        raise NotImplementedError
+
+    async def replay(self, channel: str, last_event_id: Optional[int] = None) -> List[JobEvent]:
+        """The retained events after ``last_event_id``, oldest first."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """Size gauges for /meta/memory (process-local state only)."""
+        return {}
+
+
+class InMemoryEventBus(EventBus):
+    def __init__(self, history_size: int = 2000, history_ttl: int = 3600, token_history_size: int = 500) -> None:
+        self._history: Dict[str, Deque[JobEvent]] = {}
+        self._tokens: Dict[str, Deque[JobEvent]] = {}
+        self._seq: Dict[str, int] = {}
+        self._touched: Dict[str, float] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._history_size = history_size
+        self._token_history_size = token_history_size
+        self._history_ttl = history_ttl
+        self._last_prune = time.monotonic()
+
+    def _prune(self, now: float) -> None:
+        # Forget channels nobody has published to or watched for a while.
+        for channel, touched in list(self._touched.items()):
+            if now - touched > self._history_ttl and channel not in self._subscribers:
+                self._history.pop(channel, None)
+                self._tokens.pop(channel, None)
+                self._seq.pop(channel, None)
+                del self._touched[channel]
+        self._last_prune = now
+
+    async def publish(self, channel: str, type: str, data: Any) -> JobEvent:
+        now = time.monotonic()
+        self._touched[channel] = now
+        if now - self._last_prune > 60:
+            self._prune(now)
+
+        seq = self._seq.get(channel, 0) + 1
+        self._seq[channel] = seq
+        event = JobEvent(id=seq, type=type, data=data)
+        if _is_token(type):
+            self._tokens.setdefault(channel, deque(maxlen=self._token_history_size)).append(event)
+        else:
+            self._history.setdefault(channel, deque(maxlen=self._history_size)).append(event)
+        for queue in self._subscribers.get(channel, ()):
+            queue.put_nowait(event)
+        return event
+
+    async def subscribe(self, channel: str, last_event_id: Optional[int] = None) -> AsyncIterator[JobEvent]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(channel, set()).add(queue)
+        last = last_event_id or 0
+        try:
+            # Snapshot first: anything published from here on is also queued
+            # and gets de-duplicated by id below.
+            for event in await self.replay(channel, last):
+                last = event.id
+                yield event
+            while True:
+                event = await queue.get()
+                if event.id > last:
+                    last = event.id
+                    yield event
+        finally:
+            subs = self._subscribers.get(channel)
+            if subs is not None:
+                subs.discard(queue)
+                if not subs:
+                    del self._subscribers[channel]
+
+    async def replay(self, channel: str, last_event_id: Optional[int] = None) -> List[JobEvent]:
+        history = [*self._history.get(channel, ()), *self._tokens.get(channel, ())]
+        last = last_event_id or 0
+        return sorted((event for event in history if event.id > last), key=lambda e: e.id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "channels": len(self._history),
+            "events": sum(len(history) for history in self._history.values()),
+            "token_events": sum(len(tokens) for tokens in self._tokens.values()),
+            "subscribers": sum(len(subs) for subs in self._subscribers.values()),
+        }
+
+
+class RedisEventBus(EventBus):
+    """
+    Layout per channel ``<prefix>:<channel>``:
+    - ``:seq``     INCR counter for event ids
+    - ``:history`` capped list of JSON log/status events (replay)
+    - ``:tokens``  capped list of JSON token chunks (replay)
+    - the channel key itself is the pub/sub channel
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        prefix: str = "chatpwc:events",
+        history_size: int = 2000,
+        history_ttl: int = 3600,
+        token_history_size: int = 500,
+    ) -> None:
+        self._client_factory = client_factory
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        self._prefix = prefix
+        self._history_size = history_size
+        self._token_history_size = token_history_size
+        self._history_ttl = history_ttl
+
+    def _client(self) -> Any:
+        # redis.asyncio connections are bound to the loop that opened them,
+        # so keep one client per running loop.
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._client_factory()
+            self._clients[loop] = client
+        return client
+
+    def _key(self, channel: str) -> str:
+        return f"{self._prefix}:{channel}"
+
+    async def publish(self, channel: str, type: str, data: Any) -> JobEvent:
+        client = self._client()
+        key = self._key(channel)
+        seq = await client.incr(f"{key}:seq")
+        event = JobEvent(id=int(seq), type=type, data=data)
+        raw = event.to_json()
+        if _is_token(type):
+            history, size = f"{key}:tokens", self._token_history_size
+        else:
+            history, size = f"{key}:history", self._history_size
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.rpush(history, raw)
+            pipe.ltrim(history, -size, -1)
+            pipe.expire(history, self._history_ttl)
+            pipe.expire(f"{key}:seq", self._history_ttl)
+            pipe.publish(key, raw)
+            await pipe.execute()
+        return event
+
+    async def subscribe(self, channel: str, last_event_id: Optional[int] = None) -> AsyncIterator[JobEvent]:
+        client = self._client()
+        key = self._key(channel)
+        pubsub = client.pubsub()
+        # Subscribe before reading history so nothing falls in between.
+        await pubsub.subscribe(key)
+        last = last_event_id or 0
+        try:
+            for event in await self.replay(channel, last):
+                last = event.id
+                yield event
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                event = JobEvent.from_json(message["data"])
+                if event.id > last:
+                    last = event.id
+                    yield event
+        finally:
+            await pubsub.unsubscribe(key)
+            await pubsub.close()
+
+    async def replay(self, channel: str, last_event_id: Optional[int] = None) -> List[JobEvent]:
+        client = self._client()
+        key = self._key(channel)
+        history = [
+            JobEvent.from_json(raw)
+            for name in ("history", "tokens")
+            for raw in await client.lrange(f"{key}:{name}", 0, -1)
+        ]
+        last = last_event_id or 0
+        return sorted((event for event in history if event.id > last), key=lambda e: e.id)
+
+
+def create_event_bus() -> EventBus:
+    backend = settings.EVENT_BUS_BACKEND.lower()
+    if backend == "redis":
+        import redis.asyncio as aioredis
+
+        logger.info(f"[EventBus] Using Redis event bus at {settings.REDIS_URL}")
+        return RedisEventBus(
+            client_factory=lambda: aioredis.from_url(settings.REDIS_URL),
+            history_size=settings.EVENT_HISTORY_SIZE,
+            history_ttl=settings.EVENT_HISTORY_TTL,
+            token_history_size=settings.EVENT_TOKEN_HISTORY_SIZE,
+        )
+    if backend == "memory":
+        return InMemoryEventBus(
+            history_size=settings.EVENT_HISTORY_SIZE,
+            history_ttl=settings.EVENT_HISTORY_TTL,
+            token_history_size=settings.EVENT_TOKEN_HISTORY_SIZE,
+        )
+    raise ValueError(f"Unknown event bus backend: {backend}")
+
+
+event_bus = create_event_bus()
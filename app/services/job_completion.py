@@ -0,0 +1,102 @@
+"""
+Shared job completion path.
+
+Used by ``tasks._run_job`` (online runs) and by the offline provider-batch
+dispatcher, so a result is recorded the same way however it was produced:
+result cache, chat history, job record and job events.
+"""
+
+import asyncio
+from typing import Optional
+
+from ..agents.base_agent import AgentResult, BaseAgent
+from ..config import settings
+from ..llm.usage import LLMUsage
+from ..storage.artifacts import store_artifact
+from ..storage.memory_store import MEMORY_STORE, Chat
+from ..utils.logger import logger
+from ..utils.metrics import RESULT_CACHE_LOOKUPS
+from .chat_service import add_message_by_id
+from .job_manager import JobStatus, job_manager
+from .result_cache import job_cache_key, result_cache
+
+
+def cache_key_for(prompt: str, chat: Chat, agent: BaseAgent) -> Optional[str]:
+    return job_cache_key(prompt, chat, agent) if settings.RESULT_CACHE_ENABLED else None
+
+
+async def serve_from_cache(job_id: str, cache_key: Optional[str]) -> Optional[AgentResult]:
+    """Return the cached result for the job (recording the hit), if any."""
+    if not cache_key:
+        return None
+    # Disk reads and the DOCX copy: off the event loop.
+    loop = asyncio.get_running_loop()
+    cached = await loop.run_in_executor(None, result_cache.get, cache_key)
+    RESULT_CACHE_LOOKUPS.labels("miss" if cached is None else "hit").inc()
+    if cached is None:
+        return None
+    logger.info(f"[Jobs] Job {job_id} served from result cache")
+    await MEMORY_STORE.update_job(job_id, log="Served from result cache", metadata={"cache_hit": True})
+    docx_path = await loop.run_in_executor(None, cached.materialize_docx, job_id)
+    return AgentResult(text=cached.text, output_docx_path=docx_path)
+
+
+async def record_job_usage(job_id: str, usage: LLMUsage) -> None:
+    """Store the job's token usage (incl. prompt-cache hits) in its metadata."""
+    if not usage.calls:
+        return
+    stats = usage.as_dict()
+    logger.info(
+        f"[Jobs] Job {job_id} used {usage.input_tokens} input tokens "
+        f"({usage.cached_input_tokens} cached), {usage.output_tokens} output tokens"
+    )
+    await MEMORY_STORE.update_job(job_id, metadata={"llm_usage": stats})
+
+
+async def complete_job(
+    job_id: str,
+    chat: Chat,
+    result: AgentResult,
+    cache_key: Optional[str] = None,
+) -> None:
+    if cache_key:
+        # File copies: off the event loop. Before store_artifact, which
+        # removes the local DOCX.
+        await asyncio.get_running_loop().run_in_executor(
+            None, result_cache.put, cache_key, result.text, result.output_docx_path
+        )
+
+    # Update chat history
+    await add_message_by_id(chat.id, "assistant", result.text)
+
+    # Update Job record; the DOCX is moved into the artifact store and
+    # downloaded from there.
+    artifact = await store_artifact(result.output_docx_path)
+    await MEMORY_STORE.update_job(
+        job_id,
+        result_message=result.text,
+        output_docx_path=result.output_docx_path,
+        metadata={"artifact": artifact.as_dict()} if artifact else None,
+    )
+
+    await job_manager.update_job(
+        job_id,
+        JobStatus.COMPLETED,
+        log="Job completed successfully",
+        result={
+            "result_message": result.text,
+            "output_docx_path": result.output_docx_path,
+        },
+    )
+
+
+async def fail_job(job_id: str, exc: BaseException) -> None:
+    # Some exceptions (a bare TimeoutError) have no message.
+    error = str(exc) or repr(exc)
+    await MEMORY_STORE.update_job(job_id, error=error)
+    await job_manager.update_job(
+        job_id,
+        JobStatus.FAILED,
+        log=f"Job failed: {error}",
+        result=None,
+    )
@@ -1,11 +1,23 @@
 """
-In-memory job manager to track async jobs (Celery tasks).
+Job manager to track async jobs (Celery tasks).
 Jobs have: id, status, logs, result, metadata.
+
+State lives on the Job records in MEMORY_STORE, so it is shared with other
+processes whenever a shared storage backend is configured. Every log line
+and status change is also published to the job's channel on the event bus,
+which is what SSE clients subscribe to. Streamed tokens are coalesced into
+chunks (JOB_TOKEN_FLUSH_CHARS / JOB_TOKEN_FLUSH_INTERVAL) before they are
+published, so a long stream costs a few events per second, not one per token.
 """
 
-import asyncio
-import uuid
-from typing import Any, Dict, Optional
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .event_bus import event_bus, job_channel
+from ..config import settings
+from ..storage.memory_store import MEMORY_STORE, Job
+from ..utils.logger import logger
 
 
 class JobStatus:
@@ -13,24 +25,37 @@ class JobStatus:
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    TERMINAL = (COMPLETED, FAILED, CANCELLED)
+
+
+def _state(job: Job) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "logs": job.logs,
+        "result": job.output_payload,
+        "metadata": job.metadata,
+    }
+
+
+@dataclass
+class _TokenBuffer:
+    started: float
+    parts: List[str] = field(default_factory=list)
+    size: int = 0
 
 
 class JobManager:
-    def __init__(self) -> None:
-        self._jobs: Dict[str, Dict[str, Any]] = {}
-        self._lock = asyncio.Lock()
-
-    async def create_job(self, metadata: Optional[Dict[str, Any]] = None) -> str:
-        async with self._lock:
-            job_id = str(uuid.uuid4())
-            self._jobs[job_id] = {
-                "id": job_id,
-                "status": JobStatus.QUEUED,
-                "logs": [],
-                "result": None,
-                "metadata": metadata or {},
-            }
-            return job_id
+    def __init__(self, store=MEMORY_STORE) -> None:
+        self._store = store
+        self._tokens: Dict[str, _TokenBuffer] = {}
+
+    async def create_job(self, job_id: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Attach tracking metadata to a job already created in the store."""
+        await self._store.update_job(job_id, status=JobStatus.QUEUED, metadata=metadata or {})
+        return job_id
 
     async def update_job(
         self,
@@ -39,20 +64,67 @@ class JobManager:
         log: Optional[str] = None,
         result: Any = None,
     ) -> None:
-        async with self._lock:
-            job = self._jobs.get(job_id)
-            if not job:
-                return
-            if status:
-                job["status"] = status
-            if log:
-                job["logs"].append(log)
-            if result is not None:
-                job["result"] = result
+        try:
+            job = await self._store.update_job(job_id, status=status, log=log, output_payload=result)
+        except KeyError:
+            return
+
+        # Buffered tokens come before the event that follows them.
+        await self.flush_tokens(job_id)
+        channel = job_channel(job_id)
+        if log:
+            await event_bus.publish(channel, "log", log)
+        if status:
+            await event_bus.publish(channel, "status", {"status": status, "result": result})
+        if status in JobStatus.TERMINAL and job.metadata.get("batch_id"):
+            await self._batch_child_finished(job.metadata["batch_id"])
+
+    @staticmethod
+    async def _batch_child_finished(batch_id: str) -> None:
+        # Imported lazily: batch_service depends on this module.
+        from .batch_service import finalize_when_done
+
+        try:
+            await finalize_when_done(batch_id)
+        except Exception:
+            # The child's own status is recorded; don't fail it over this.
+            logger.exception(f"[Jobs] Finalising batch {batch_id} failed")
+
+    async def append_tokens(self, job_id: str, text: str) -> None:
+        """
+        Buffer streamed LLM output and publish it in chunks; tokens are not
+        kept on the job. The limits are checked as tokens arrive, so call
+        ``flush_tokens`` once the stream ends.
+        """
+        buffer = self._tokens.get(job_id)
+        if buffer is None:
+            buffer = self._tokens[job_id] = _TokenBuffer(time.monotonic())
+        buffer.parts.append(text)
+        buffer.size += len(text)
+        if (
+            buffer.size >= settings.JOB_TOKEN_FLUSH_CHARS
+            or time.monotonic() - buffer.started >= settings.JOB_TOKEN_FLUSH_INTERVAL
+        ):
+            await self.flush_tokens(job_id)
+
+    async def flush_tokens(self, job_id: str) -> None:
+        """Publish the job's buffered tokens, if any."""
+        buffer = self._tokens.pop(job_id, None)
+        if buffer is not None:
+            await event_bus.publish(job_channel(job_id), "token", "".join(buffer.parts))
+
+    async def read_logs(self, job_id: str, offset: int = 0) -> Optional[List[str]]:
+        """Log lines from ``offset`` on; cheap enough for frequent polling."""
+        try:
+            return await self._store.aread_logs(job_id, offset)
+        except KeyError:
+            return None
 
     async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
-        async with self._lock:
-            return self._jobs.get(job_id)
+        try:
+            return _state(await self._store.aget_job(job_id))
+        except KeyError:
+            return None
 
 
 job_manager = JobManager()
@@ -1,32 +1,73 @@
+import time
 from typing import Optional
+from ..config import settings
 from ..storage.memory_store import MEMORY_STORE, Job
 from ..utils.ids import new_id
-from ..services.chat_service import get_chat
-from ..services.job_manager import job_manager
+from ..services.chat_service import aget_chat, get_chat
+from ..services.job_manager import JobStatus, job_manager
 from ..utils.logger import logger
+from ..utils.tracing import span
 
-# Lazy import so FastAPI can start without Celery
-def enqueue_job(job_id: str) -> None:
-    from ..tasks import run_agent_job
-    logger.info(f"[JobService] Enqueuing job {job_id} to Celery")
-    run_agent_job.apply_async(args=[job_id])
 
+def enqueue_job(job_id: str, priority: int = 0) -> None:
+    """
+    Dispatch a job to the configured executor: Celery (default) or the
+    in-process asyncio executor (JOB_EXECUTOR=inprocess).
+    """
+    with span("enqueue", executor=settings.JOB_EXECUTOR):
+        if settings.JOB_EXECUTOR == "inprocess":
+            from .async_executor import executor
+            chat = get_chat(get_job(job_id).chat_id)
+            logger.info(f"[JobService] Enqueuing job {job_id} to in-process executor")
+            executor.submit(job_id, provider=chat.provider, priority=priority)
+            return
+
+        # Lazy import so FastAPI can start without Celery
+        from ..tasks import run_agent_job
+        logger.info(f"[JobService] Enqueuing job {job_id} to Celery")
+        # Job id doubles as the Celery task id so the task can be revoked.
+        run_agent_job.apply_async(args=[job_id], task_id=job_id)
+
+
+async def cancel_job(job_id: str) -> bool:
+    """
+    Cancel a queued (or, in-process, running) job. Returns False when the
+    job has already finished.
+    """
+    job = await aget_job(job_id)
+    if job.status in JobStatus.TERMINAL:
+        return False
+
+    if settings.JOB_EXECUTOR == "inprocess":
+        from .async_executor import executor
+        return await executor.cancel(job_id)
+
+    if job.status != JobStatus.QUEUED:
+        return False
+    from ..tasks import run_agent_job
+    run_agent_job.app.control.revoke(job_id)
+    await job_manager.update_job(job_id, JobStatus.CANCELLED, log="Job cancelled")
+    return True
 
-async def create_job(chat_id: str, prompt: str) -> Job:
-    chat = get_chat(chat_id)
 
-    job_id = new_id("job")
-    job = Job(id=job_id, chat_id=chat_id, prompt=prompt)
-    MEMORY_STORE.jobs[job_id] = job   # FIXED storage usage
+async def create_job(chat_id: str, prompt: str, metadata: Optional[dict] = None) -> Job:
+    chat = await aget_chat(chat_id)
 
-    await job_manager.create_job(metadata={"chat_id": chat_id, "agent_id": chat.agent_id})
+    job = await MEMORY_STORE.create_job(
+        chat_id=chat_id,
+        prompt=prompt,
+        # created_at: start of the job's queue wait
+        metadata={"chat_id": chat_id, "agent_id": chat.agent_id, "created_at": time.time(), **(metadata or {})},
+        job_id=new_id("job"),
+    )
 
-    logger.info(f"[JobService] Created job {job_id} for chat {chat_id}")
+    logger.info(f"[JobService] Created job {job.id} for chat {chat_id}")
     return job
 
 
 def get_job(job_id: str) -> Job:
-    job = MEMORY_STORE.jobs.get(job_id)
-    if not job:
-        raise KeyError(f"Job {job_id} not found")
-    return job
+    return MEMORY_STORE.get_job(job_id)
+
+
+async def aget_job(job_id: str) -> Job:
+    return await MEMORY_STORE.aget_job(job_id)
@@ -0,0 +1,254 @@
+"""
+Offline mode: run queued jobs through provider batch APIs.
+
+Jobs submitted with ``offline=True`` are collected by the
+``OfflineBatchDispatcher`` instead of running immediately. Every
+LLM_BATCH_FLUSH_INTERVAL seconds (or once LLM_BATCH_MAX_REQUESTS are
+pending) they are grouped per (provider, model) and submitted as one
+provider batch. Open batches are polled every LLM_BATCH_POLL_INTERVAL
+seconds. Finished results go through the normal completion path
+(result cache, chat history, job status/events); the TS batch archive is
+built once the last child of a batch is terminal (``finalize_when_done``).
+
+Jobs whose agent needs several dependent calls (``batch_messages`` returns
+None) and follow-ups sent with chat history fall back to the online queue.
+
+The dispatcher runs on one event loop: the API loop with
+JOB_EXECUTOR=inprocess, otherwise a single Celery worker consuming the
+LLM_BATCH_QUEUE queue (``celery worker -Q offline -c 1``). Queued job ids
+and open batches are persisted to LLM_BATCH_STATE_PATH (before ``add``
+returns, so before the Celery message is acked) and resumed when the
+dispatcher starts.
+"""
+
+import asyncio
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..llm.batch_api import BatchRequest, BatchResult, batch_backend_for
+from ..storage.memory_store import MEMORY_STORE
+from ..utils.docx_generator import GENERATED_DIR
+from ..utils.logger import logger
+from .agent_registry import get_agent
+from .chat_service import aget_chat
+from .job_completion import cache_key_for, complete_job, fail_job, record_job_usage, serve_from_cache
+from .job_manager import JobStatus, job_manager
+
+
+class OfflineBatchDispatcher:
+    def __init__(self, state_path: Path) -> None:
+        self.state_path = state_path
+        self._pending: List[str] = []
+        self._open: List[Dict] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_flush = 0.0
+        self._last_poll = 0.0
+
+    # -----------------------
+    # State
+    # -----------------------
+
+    def _load_state(self) -> None:
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            state = {}
+        except (OSError, ValueError) as exc:
+            logger.warning(f"[OfflineBatch] Ignoring unreadable state file: {exc}")
+            state = {}
+        if isinstance(state, list):  # older files held only the open batches
+            state = {"open": state}
+        self._open = state.get("open", [])
+        # A job is listed as pending until its batch is recorded as open; a
+        # crash in between must not submit it twice.
+        submitted = {job_id for entry in self._open for job_id in entry["job_ids"]}
+        pending = [j for j in state.get("pending", []) if j not in submitted]
+        self._pending = pending + [j for j in self._pending if j not in pending]
+
+    def _save_state(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"pending": self._pending, "open": self._open}), encoding="utf-8")
+        tmp.replace(self.state_path)
+
+    # -----------------------
+    # Public API
+    # -----------------------
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._load_state()
+        self._wakeup = asyncio.Event()
+        self._last_flush = time.monotonic()
+        self._task = asyncio.create_task(self._loop(), name="offline-batch-dispatcher")
+        if self._open or self._pending:
+            logger.info(
+                f"[OfflineBatch] Resuming {len(self._pending)} queued jobs and "
+                f"{len(self._open)} open provider batches"
+            )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def add(self, job_id: str) -> None:
+        self.start()
+        if job_id not in self._pending:
+            self._pending.append(job_id)
+            self._save_state()
+        await job_manager.update_job(job_id, JobStatus.QUEUED, log="Queued for offline batch submission")
+        if len(self._pending) >= settings.LLM_BATCH_MAX_REQUESTS:
+            assert self._wakeup is not None
+            self._wakeup.set()
+
+    # -----------------------
+    # Loop
+    # -----------------------
+
+    async def _loop(self) -> None:
+        assert self._wakeup is not None
+        tick = min(settings.LLM_BATCH_FLUSH_INTERVAL, settings.LLM_BATCH_POLL_INTERVAL)
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=tick)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            now = time.monotonic()
+            try:
+                if self._pending and (
+                    len(self._pending) >= settings.LLM_BATCH_MAX_REQUESTS
+                    or now - self._last_flush >= settings.LLM_BATCH_FLUSH_INTERVAL
+                ):
+                    self._last_flush = now
+                    await self.flush()
+                if self._open and now - self._last_poll >= settings.LLM_BATCH_POLL_INTERVAL:
+                    self._last_poll = now
+                    await self.poll()
+            except Exception as exc:
+                logger.exception(f"[OfflineBatch] Dispatcher iteration failed: {exc}")
+
+    async def flush(self) -> None:
+        """Submit pending jobs as provider batches."""
+        from .job_service import enqueue_job
+
+        # Jobs stay in the persisted pending list until they are handled.
+        pending = list(self._pending)
+        try:
+            await self._submit(pending, enqueue_job)
+        finally:
+            handled = set(pending)
+            self._pending = [j for j in self._pending if j not in handled]
+            self._save_state()
+
+    async def _submit(self, pending: List[str], enqueue_job) -> None:
+        groups: Dict[Tuple[str, str], List[BatchRequest]] = defaultdict(list)
+
+        for job_id in pending:
+            try:
+                job = await MEMORY_STORE.aget_job(job_id)
+                if job.status in JobStatus.TERMINAL or job.metadata.get("provider_batch_id"):
+                    continue  # cancelled while waiting, or already submitted
+                chat = await aget_chat(job.chat_id)
+                agent = get_agent(chat.agent_id)
+
+                cached = await serve_from_cache(job_id, cache_key_for(job.prompt, chat, agent))
+                if cached is not None:
+                    await complete_job(job_id, chat, cached)
+                    continue
+
+                # Follow-ups need the chat's history at run time.
+                messages = None if job.metadata.get("with_history") else agent.batch_messages(job.prompt)
+                if messages is None:
+                    await job_manager.update_job(job_id, JobStatus.QUEUED, log="Needs several calls or chat history; running online")
+                    enqueue_job(job_id)
+                    continue
+
+                provider = "claude" if chat.provider.lower() == "anthropic" else chat.provider.lower()
+                _, client = batch_backend_for(provider, chat.model)
+                groups[(provider, chat.model)].append(BatchRequest(job_id, client.request_params(messages)))
+            except Exception as exc:
+                logger.exception(f"[OfflineBatch] Could not prepare job {job_id}")
+                await fail_job(job_id, exc)
+
+        for (provider, model), requests in groups.items():
+            backend, _ = batch_backend_for(provider, model)
+            for i in range(0, len(requests), settings.LLM_BATCH_MAX_REQUESTS):
+                chunk = requests[i:i + settings.LLM_BATCH_MAX_REQUESTS]
+                job_ids = [r.custom_id for r in chunk]
+                try:
+                    batch_id = await backend.submit(chunk)
+                except Exception as exc:
+                    logger.exception(f"[OfflineBatch] Submitting {len(chunk)} {provider}/{model} requests failed")
+                    for job_id in job_ids:
+                        await fail_job(job_id, exc)
+                    continue
+
+                self._open.append({"provider": provider, "model": model, "batch_id": batch_id, "job_ids": job_ids})
+                self._save_state()
+                logger.info(f"[OfflineBatch] Submitted {len(chunk)} jobs to {backend.name} batch {batch_id}")
+                for job_id in job_ids:
+                    await MEMORY_STORE.update_job(job_id, metadata={"provider_batch_id": batch_id})
+                    await job_manager.update_job(job_id, JobStatus.RUNNING, log=f"Submitted to {backend.name} batch {batch_id}")
+
+    async def poll(self) -> None:
+        """Collect results of finished provider batches."""
+        for entry in list(self._open):
+            backend, _ = batch_backend_for(entry["provider"], entry["model"])
+            try:
+                if not await backend.is_done(entry["batch_id"]):
+                    continue
+                results = {r.custom_id: r for r in await backend.results(entry["batch_id"])}
+            except Exception as exc:
+                logger.warning(f"[OfflineBatch] Polling {entry['batch_id']} failed: {exc}")
+                continue
+
+            for job_id in entry["job_ids"]:
+                await self._finish(job_id, results.get(job_id))
+            self._open.remove(entry)
+            self._save_state()
+            logger.info(f"[OfflineBatch] Provider batch {entry['batch_id']} finished ({len(entry['job_ids'])} jobs)")
+
+    async def _finish(self, job_id: str, result: Optional[BatchResult]) -> None:
+        """Complete or fail one job."""
+        job = await MEMORY_STORE.aget_job(job_id)
+        if job.status in JobStatus.TERMINAL:
+            return
+        chat = await aget_chat(job.chat_id)
+        agent = get_agent(chat.agent_id)
+        try:
+            if result is None or result.text is None:
+                raise RuntimeError(result.error if result else "Missing from provider batch output")
+            if result.usage is not None:
+                await record_job_usage(job_id, result.usage)
+            agent_result = await agent.from_completion(job_id, job.prompt, result.text)
+            await complete_job(job_id, chat, agent_result, cache_key_for(job.prompt, chat, agent))
+        except Exception as exc:
+            logger.warning(f"[OfflineBatch] Job {job_id} failed: {exc}")
+            await fail_job(job_id, exc)
+
+
+offline_dispatcher = OfflineBatchDispatcher(
+    Path(settings.LLM_BATCH_STATE_PATH) if settings.LLM_BATCH_STATE_PATH else GENERATED_DIR.parent / ".llm_batches.json"
+)
+
+
+async def enqueue_offline(job_id: str) -> None:
+    """Queue a job for the next provider batch submission."""
+    if settings.JOB_EXECUTOR == "inprocess":
+        await offline_dispatcher.add(job_id)
+        return
+
+    from ..tasks import collect_offline_job
+    collect_offline_job.apply_async(args=[job_id], queue=settings.LLM_BATCH_QUEUE)
@@ -0,0 +1,233 @@
+"""
+Content-addressed cache of agent results.
+
+Jobs are keyed by a hash of (normalised ABAP source, provider, model, agent
+id, RAG KB version, agent system prompt). A hit reuses the stored markdown
+and DOCX instead of calling the LLM again.
+
+Two tiers:
+- memory: LRU with TTL, bounded by entry count (per process)
+- disk: JSON + DOCX files under RESULT_CACHE_DIR, bounded by total size and
+  shared by every process on the node
+
+Files are written to a temporary name and renamed into place, so readers in
+other processes never see a partial DOCX. Each process keeps a running
+estimate of the disk tier's size; the directory is only scanned (in a
+background thread) when the estimate exceeds RESULT_CACHE_MAX_BYTES or
+RESULT_CACHE_SCAN_INTERVAL has passed, which also picks up what other
+processes wrote.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+from ..agents.base_agent import BaseAgent
+from ..config import settings
+from ..rag.simple_rag import kb_version
+from ..storage.memory_store import Chat
+from ..utils.abap_parser import strip_comments
+from ..utils.docx_generator import GENERATED_DIR
+from ..utils.logger import logger
+
+
+def _copy_atomic(source: str, target: Path) -> None:
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    shutil.copyfile(source, tmp)
+    os.replace(tmp, target)
+
+
+def normalize_abap(source: str) -> str:
+    """Drop comments, trailing whitespace and blank lines; keep case (literals)."""
+    lines = (line.rstrip() for line in strip_comments(source).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def job_cache_key(prompt: str, chat: Chat, agent: BaseAgent) -> str:
+    digest = hashlib.sha256()
+    for part in (
+        normalize_abap(prompt),
+        chat.provider.lower(),
+        chat.model,
+        agent.id,
+        kb_version(),
+        agent.system_prompt,
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@dataclass(slots=True)
+class CachedResult:
+    text: str
+    docx_path: Optional[str]
+    created_at: float
+
+    def materialize_docx(self, job_id: str) -> Optional[str]:
+        """Copy the cached DOCX to this job's output path."""
+        if not self.docx_path or not Path(self.docx_path).exists():
+            return None
+        target = GENERATED_DIR / f"{job_id}_ts.docx"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        _copy_atomic(self.docx_path, target)
+        return str(target)
+
+
+class ResultCache:
+    def __init__(
+        self, cache_dir: Path, ttl: int, max_entries: int, max_bytes: int, scan_interval: float = 300.0,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.scan_interval = scan_interval
+        self._memory: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Disk tier size as of the last scan plus what this process wrote
+        # since; None until the first scan.
+        self._disk_bytes: Optional[int] = None
+        self._last_scan = 0.0
+        self._evicting = False
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        base = self.cache_dir / key[:2] / key
+        return base.with_suffix(".json"), base.with_suffix(".docx")
+
+    def _expired(self, entry: CachedResult) -> bool:
+        return time.time() - entry.created_at > self.ttl
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._expired(entry):
+                    del self._memory[key]
+                else:
+                    self._memory.move_to_end(key)
+                    return entry
+
+        meta_path, _ = self._paths(key)
+        try:
+            entry = CachedResult(**json.loads(meta_path.read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError):
+            return None
+        if self._expired(entry):
+            self._remove_files(key)
+            return None
+        # Bump mtime: disk eviction is least-recently-used by mtime.
+        os.utime(meta_path)
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, text: str, docx_path: Optional[str]) -> CachedResult:
+        meta_path, cached_docx = self._paths(key)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        stored_docx = None
+        written = 0
+        if docx_path and Path(docx_path).exists():
+            _copy_atomic(docx_path, cached_docx)
+            stored_docx = str(cached_docx)
+            written += cached_docx.stat().st_size
+
+        entry = CachedResult(text=text, docx_path=stored_docx, created_at=time.time())
+        raw = json.dumps(asdict(entry)).encode("utf-8")
+        tmp = meta_path.with_name(f"{meta_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(raw)
+        os.replace(tmp, meta_path)
+        written += len(raw)
+
+        self._remember(key, entry)
+        self._note_written(written)
+        return entry
+
+    def _remember(self, key: str, entry: CachedResult) -> None:
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "text_bytes": sum(len(entry.text) for entry in self._memory.values()),
+            }
+
+    def _remove_files(self, key: str) -> None:
+        for path in self._paths(key):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _note_written(self, size: int) -> None:
+        """Account for a write; start a background scan/eviction when due."""
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += size
+            due = (
+                self._disk_bytes is None
+                or self._disk_bytes > self.max_bytes
+                or time.monotonic() - self._last_scan > self.scan_interval
+            )
+            if not due or self._evicting:
+                return
+            self._evicting = True
+        threading.Thread(target=self._evict_disk, name="result-cache-evict", daemon=True).start()
+
+    @staticmethod
+    def _size(path: Path) -> int:
+        try:
+            return path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _evict_disk(self) -> None:
+        try:
+            entries = []
+            total = 0
+            for meta_path in self.cache_dir.glob("*/*.json"):
+                try:
+                    mtime = meta_path.stat().st_mtime
+                except FileNotFoundError:
+                    continue  # evicted by another process meanwhile
+                key = meta_path.stem
+                size = sum(self._size(p) for p in self._paths(key))
+                entries.append((mtime, key, size))
+                total += size
+            if total > self.max_bytes:
+                for _, key, size in sorted(entries):
+                    self._remove_files(key)
+                    with self._lock:
+                        self._memory.pop(key, None)
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+                logger.info(f"[ResultCache] Evicted disk entries down to {total} bytes")
+            with self._lock:
+                self._disk_bytes = total
+                self._last_scan = time.monotonic()
+        except OSError as exc:
+            logger.warning(f"[ResultCache] Disk eviction failed: {exc}")
+        finally:
+            with self._lock:
+                self._evicting = False
+
+
+result_cache = ResultCache(
+    cache_dir=Path(settings.RESULT_CACHE_DIR) if settings.RESULT_CACHE_DIR else GENERATED_DIR.parent / ".result_cache",
+    ttl=settings.RESULT_CACHE_TTL,
+    max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+    max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+    scan_interval=settings.RESULT_CACHE_SCAN_INTERVAL,
+)
@@ -0,0 +1,281 @@
+"""
+Content-addressed store for downloadable job outputs (DOCX, batch archives).
+
+Artifacts are named ``<sha256><suffix>``: the name never changes meaning,
+so downloads carry strong ETags and immutable cache headers, identical
+outputs (result cache hits, duplicate objects) are stored once, and any
+replica that can reach the store can serve them without the job record.
+
+Backends (ARTIFACT_BACKEND):
+- local: files under ARTIFACT_DIR (a shared volume with several replicas),
+  served by ``FileResponse`` (pathsend where the server supports it) or
+  handed to nginx with X-Accel-Redirect (sendfile) via ARTIFACT_ACCEL_REDIRECT
+- s3: any S3-compatible service (MinIO or moto_server locally, with
+  ARTIFACT_S3_ENDPOINT_URL); downloads are redirected to presigned URLs, so
+  the bytes never pass through Python. Needs ``boto3``.
+
+DOCX and zip files are already deflated, so artifacts are stored and served
+as-is. ``store_artifact`` removes the ``generated/`` original once the copy
+is stored, so each output is kept on disk once.
+"""
+
+from __future__ import annotations
+
+import abc
+import asyncio
+import hashlib
+import mimetypes
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional
+
+from ..config import settings
+from ..utils.logger import logger
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+_MEDIA_TYPES = {".docx": DOCX_MEDIA_TYPE, ".zip": "application/zip"}
+_HASH_CHUNK = 1024 * 1024
+_KNOWN_MAX = 10_000
+
+
+def media_type_for(key: str) -> str:
+    suffix = Path(key).suffix.lower()
+    return _MEDIA_TYPES.get(suffix) or mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+def is_artifact_key(key: str) -> bool:
+    digest, dot, suffix = key.partition(".")
+    return (
+        len(digest) == 64 and all(c in "0123456789abcdef" for c in digest)
+        and bool(dot) and 0 < len(suffix) <= 8 and suffix.isalnum()
+    )
+
+
+@dataclass(slots=True)
+class Artifact:
+    key: str  # <sha256><suffix>
+    sha256: str
+    size: int
+    media_type: str
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.sha256}"'
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Artifact":
+        return cls(**data)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactStore(abc.ABC):
+    def __init__(self) -> None:
+        # Artifacts never change once stored, so lookups are remembered.
+        self._known: "OrderedDict[str, Artifact]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def put_file(self, path: Path) -> Artifact:
+        """Store the file under its content hash (no-op if already stored)."""
+
+    @abc.abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Readable binary stream of a stored artifact; raises if it is missing."""
+
+    def stat(self, key: str) -> Optional[Artifact]:
+        """The stored artifact, or None."""
+        with self._lock:
+            artifact = self._known.get(key)
+            if artifact is not None:
+                self._known.move_to_end(key)
+                return artifact
+        artifact = self._load(key)
+        if artifact is not None:
+            self._remember(artifact)
+        return artifact
+
+    @abc.abstractmethod
+    def _load(self, key: str) -> Optional[Artifact]:
+        """Look up ``key`` in the backend itself."""
+
+    def _remember(self, artifact: Artifact) -> None:
+        with self._lock:
+            self._known[artifact.key] = artifact
+            while len(self._known) > _KNOWN_MAX:
+                self._known.popitem(last=False)
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Path to serve from, for stores on the local filesystem."""
+        return None
+
+    def download_url(self, artifact: Artifact, content_disposition: str) -> Optional[str]:
+        """Direct (presigned) URL, for remote stores."""
+        return None
+
+
+class LocalArtifactStore(ArtifactStore):
+    def __init__(self, root: Path) -> None:
+        super().__init__()
+        self.root = root
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self._path(key)
+
+    def open(self, key: str) -> BinaryIO:
+        return self._path(key).open("rb")
+
+    def put_file(self, path: Path) -> Artifact:
+        sha = _sha256(path)
+        key = sha + path.suffix.lower()
+        existing = self.stat(key)
+        if existing is not None:
+            return existing
+
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # copyfile uses copy_file_range/sendfile where available; the
+        # rename makes the artifact appear complete or not at all.
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.copyfile(path, tmp)
+        tmp.replace(target)
+        artifact = Artifact(key, sha, target.stat().st_size, media_type_for(key))
+        self._remember(artifact)
+        return artifact
+
+    def _load(self, key: str) -> Optional[Artifact]:
+        path = self._path(key)
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return None
+        return Artifact(key, key.partition(".")[0], size, media_type_for(key))
+
+
+class S3ArtifactStore(ArtifactStore):
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        url_ttl: int = 3600,
+    ) -> None:
+        if boto3 is None:
+            raise RuntimeError("ARTIFACT_BACKEND=s3 needs boto3 (pip install boto3)")
+        super().__init__()
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url_ttl = url_ttl
+        # boto3 clients are thread-safe; one per process.
+        self._client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def put_file(self, path: Path) -> Artifact:
+        sha = _sha256(path)
+        key = sha + path.suffix.lower()
+        existing = self.stat(key)
+        if existing is not None:
+            return existing
+
+        media_type = media_type_for(key)
+        extra = {
+            "ContentType": media_type,
+            "CacheControl": settings.ARTIFACT_CACHE_CONTROL,
+            "Metadata": {"sha256": sha},
+        }
+        self._client.upload_file(str(path), self.bucket, self._object_key(key), ExtraArgs=extra)
+        artifact = Artifact(key, sha, path.stat().st_size, media_type)
+        self._remember(artifact)
+        return artifact
+
+    def _load(self, key: str) -> Optional[Artifact]:
+        try:
+            head = self._client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return Artifact(key, key.partition(".")[0], head["ContentLength"], media_type_for(key))
+
+    def open(self, key: str) -> BinaryIO:
+        return self._client.get_object(Bucket=self.bucket, Key=self._object_key(key))["Body"]
+
+    def download_url(self, artifact: Artifact, content_disposition: str) -> Optional[str]:
+        return self._client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._object_key(artifact.key),
+                "ResponseContentDisposition": content_disposition,
+            },
+            ExpiresIn=self.url_ttl,
+        )
+
+
+def create_artifact_store() -> ArtifactStore:
+    backend = settings.ARTIFACT_BACKEND.lower()
+    if backend == "local":
+        from ..utils.docx_generator import GENERATED_DIR
+
+        root = Path(settings.ARTIFACT_DIR) if settings.ARTIFACT_DIR else GENERATED_DIR / "artifacts"
+        return LocalArtifactStore(root)
+    if backend == "s3":
+        if not settings.ARTIFACT_S3_BUCKET:
+            raise RuntimeError("ARTIFACT_BACKEND=s3 needs ARTIFACT_S3_BUCKET")
+        return S3ArtifactStore(
+            settings.ARTIFACT_S3_BUCKET,
+            prefix=settings.ARTIFACT_S3_PREFIX,
+            endpoint_url=settings.ARTIFACT_S3_ENDPOINT_URL,
+            region=settings.ARTIFACT_S3_REGION,
+            url_ttl=settings.ARTIFACT_S3_URL_TTL,
+        )
+    raise ValueError(f"Unknown ARTIFACT_BACKEND: {settings.ARTIFACT_BACKEND}")
+
+
+ARTIFACT_STORE = create_artifact_store()
+
+
+def _move_into_store(path: Path) -> Artifact:
+    artifact = ARTIFACT_STORE.put_file(path)
+    path.unlink(missing_ok=True)
+    return artifact
+
+
+async def store_artifact(path: Optional[str]) -> Optional[Artifact]:
+    """
+    Move a job output into the store (in a thread): the local file is
+    removed once stored. Failures are logged and return None: the job keeps
+    its local file and is served from that.
+    """
+    if not path or not Path(path).exists():
+        return None
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, _move_into_store, Path(path))
+    except Exception as exc:
+        logger.warning(f"[Artifacts] Could not store {path}: {exc}")
+        return None
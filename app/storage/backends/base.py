@@ -0,0 +1,139 @@
+"""
+Storage backend interface used by MemoryStore.
+
+Backends are synchronous: every operation is a single dict access, a
+pipelined Redis round-trip or a short SQLite transaction, which keeps the
+same implementation usable from FastAPI handlers and Celery workers.
+Backends doing network or disk I/O set ``blocking = True``; MemoryStore's
+async methods run their calls in a worker thread so the event loop keeps
+serving other requests meanwhile.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+from ..memory_store import Chat, Job, Message
+
+
+# Job fields stored as scalars; output_payload/metadata are JSON-encoded.
+JOB_SCALAR_FIELDS = ("id", "chat_id", "prompt", "status", "result_message", "output_docx_path", "error")
+JOB_JSON_FIELDS = ("output_payload", "metadata")
+
+
+def job_to_fields(job: Job) -> Dict[str, str]:
+    """Flatten a Job (without logs) into string fields; None values are omitted."""
+    fields: Dict[str, str] = {}
+    for name in JOB_SCALAR_FIELDS:
+        value = getattr(job, name)
+        if value is not None:
+            fields[name] = value
+    for name in JOB_JSON_FIELDS:
+        value = getattr(job, name)
+        if value is not None:
+            fields[name] = json.dumps(value)
+    return fields
+
+
+def message_to_json(message: Message) -> str:
+    """Serialised message without ``seq`` (backends derive it on read)."""
+    return json.dumps({"role": message.role, "content": message.content, "timestamp": message.timestamp})
+
+
+def encode_job_updates(updates: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        name: json.dumps(value) if name in JOB_JSON_FIELDS else value
+        for name, value in updates.items()
+    }
+
+
+def job_from_fields(fields: Dict[str, Any], logs: List[str]) -> Job:
+    kwargs: Dict[str, Any] = {name: fields.get(name) for name in JOB_SCALAR_FIELDS if fields.get(name) is not None}
+    for name in JOB_JSON_FIELDS:
+        raw = fields.get(name)
+        if raw is not None:
+            kwargs[name] = json.loads(raw)
+    return Job(logs=logs, **kwargs)
+
+
+class StorageBackend:
+    blocking = False
+
+    # ---------- Chats ----------
+    def save_chat(self, chat: Chat) -> None:
+        """Insert or replace chat metadata (messages are appended separately)."""
+        raise NotImplementedError
+
+    def load_chat(self, chat_id: str) -> Optional[Chat]:
+        raise NotImplementedError
+
+    def has_chat(self, chat_id: str) -> bool:
+        return self.load_chat(chat_id) is not None
+
+    def append_message(self, chat_id: str, message: Message) -> None:
+        """Append ``message`` and set its ``seq``."""
+        raise NotImplementedError
+
+    def last_message_seq(self, chat_id: str) -> Optional[int]:
+        """Seq of the newest message, 0 without messages, None if no such chat."""
+        chat = self.load_chat(chat_id)
+        if chat is None:
+            return None
+        return chat.messages[-1].seq if chat.messages else 0
+
+    def load_messages(
+        self,
+        chat_id: str,
+        after: int = 0,
+        before: Optional[int] = None,
+        limit: int = 50,
+        newest: bool = False,
+    ) -> List[Message]:
+        chat = self.load_chat(chat_id)
+        if chat is None:
+            return []
+        selected = [m for m in chat.messages if m.seq > after and (before is None or m.seq < before)]
+        return selected[-limit:] if newest else selected[:limit]
+
+    # ---------- Jobs ----------
+    def save_job(self, job: Job) -> None:
+        raise NotImplementedError
+
+    def load_job(self, job_id: str) -> Optional[Job]:
+        raise NotImplementedError
+
+    def load_jobs(self, job_ids: List[str]) -> List[Optional[Job]]:
+        """
+        Several jobs in one round-trip where the backend allows it, in
+        ``job_ids`` order (None for missing ones). Shared backends leave
+        their ``logs`` empty.
+        """
+        return [self.load_job(job_id) for job_id in job_ids]
+
+    def update_job(
+        self,
+        job_id: str,
+        updates: Dict[str, Any],
+        log: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Job]:
+        """
+        Apply field ``updates``, merge ``metadata`` into the job's metadata
+        (top-level keys) and append ``log`` in one atomic write, so
+        concurrent writers in other processes don't lose each other's keys.
+        Returns the updated job, or None if it does not exist; shared
+        backends leave its ``logs`` empty rather than reading them back (see
+        ``read_logs``).
+        """
+        raise NotImplementedError
+
+    def read_logs(self, job_id: str, offset: int = 0) -> Optional[List[str]]:
+        """Log lines from ``offset`` on, or None if the job does not exist."""
+        job = self.load_job(job_id)
+        return None if job is None else job.logs[offset:]
+
+    # ---------- Monitoring ----------
+    def stats(self) -> Dict[str, Any]:
+        """Size gauges (record counts, evictions...) for /meta/memory."""
+        return {}
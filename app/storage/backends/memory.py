@@ -0,0 +1,240 @@
+"""
+In-process storage backend (the default; fine for a single process).
+
+Chats and jobs live in LRU maps bounded by count and idle time. Records
+leaving memory are spilled to JSON files under ``spill_dir`` and loaded
+back (and made recent again) when accessed; spilled files are deleted after
+``spill_retention`` seconds. Without a spill dir evicted records are
+dropped. Jobs that are still queued or running are never evicted.
+
+Job updates are copy-on-write, so a reader holding a Job never sees a
+half-applied update. Log and message lists are append-only and shared
+between versions.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .base import StorageBackend, job_from_fields, job_to_fields
+from ..memory_store import Chat, Job, Message
+
+_ACTIVE_STATUSES = ("queued", "running")
+_SWEEP_INTERVAL = 600.0  # seconds between spill retention sweeps
+
+
+@dataclass(slots=True)
+class _Entry:
+    value: Any
+    touched: float
+
+
+def _chat_to_json(chat: Chat) -> Dict[str, Any]:
+    return {
+        "id": chat.id,
+        "title": chat.title,
+        "provider": chat.provider,
+        "model": chat.model,
+        "agent_id": chat.agent_id,
+        "messages": [asdict(m) for m in chat.messages],
+    }
+
+
+def _chat_from_json(data: Dict[str, Any]) -> Chat:
+    messages = [Message(**{**m, "seq": i}) for i, m in enumerate(data.pop("messages", []), start=1)]
+    return Chat(messages=messages, **data)
+
+
+class InMemoryBackend(StorageBackend):
+    def __init__(
+        self,
+        max_chats: int = 2000,
+        max_jobs: int = 1000,
+        idle_ttl: float = 1800.0,
+        spill_dir: Optional[Path] = None,
+        spill_retention: float = 7 * 24 * 3600,
+    ) -> None:
+        self.chats: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.jobs: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.max_chats = max_chats
+        self.max_jobs = max_jobs
+        self.idle_ttl = idle_ttl
+        self.spill_dir = spill_dir
+        self.spill_retention = spill_retention
+        self.evictions = {"chats": 0, "jobs": 0}
+        self.spill_loads = {"chats": 0, "jobs": 0}
+        self._last_sweep = time.monotonic()
+
+    # ---------- LRU ----------
+    def _get(self, kind: str, key: str) -> Optional[Any]:
+        table = getattr(self, kind)
+        entry = table.get(key)
+        if entry is None:
+            return self._load_spilled(kind, key)
+        entry.touched = time.monotonic()
+        table.move_to_end(key)
+        return entry.value
+
+    def _put(self, kind: str, key: str, value: Any) -> None:
+        table = getattr(self, kind)
+        table[key] = _Entry(value, time.monotonic())
+        table.move_to_end(key)
+        self._evict()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        self._evict_table("chats", self.max_chats, now, lambda chat: True)
+        self._evict_table("jobs", self.max_jobs, now, lambda job: job.status not in _ACTIVE_STATUSES)
+        if now - self._last_sweep > _SWEEP_INTERVAL:
+            self._sweep_spill()
+
+    def _evict_table(self, kind: str, limit: int, now: float, evictable: Callable[[Any], bool]) -> None:
+        table: "OrderedDict[str, _Entry]" = getattr(self, kind)
+        excess = len(table) - limit
+        victims = []
+        for key, entry in table.items():  # least recently used first
+            if excess <= 0 and now - entry.touched <= self.idle_ttl:
+                break
+            if evictable(entry.value):
+                victims.append(key)
+                excess -= 1
+        for key in victims:
+            self._spill(kind, table.pop(key).value)
+            self.evictions[kind] += 1
+
+    # ---------- Spill files ----------
+    def _spill_path(self, kind: str, key: str) -> Path:
+        assert self.spill_dir is not None
+        return self.spill_dir / kind / f"{key}.json"
+
+    def _spill(self, kind: str, record: Any) -> None:
+        if self.spill_dir is None:
+            return
+        if kind == "chats":
+            data = _chat_to_json(record)
+        else:
+            data = {"fields": job_to_fields(record), "logs": record.logs}
+        path = self._spill_path(kind, record.id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _load_spilled(self, kind: str, key: str) -> Optional[Any]:
+        if self.spill_dir is None:
+            return None
+        try:
+            data = json.loads(self._spill_path(kind, key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        record = _chat_from_json(data) if kind == "chats" else job_from_fields(data["fields"], data["logs"])
+        self.spill_loads[kind] += 1
+        self._put(kind, key, record)
+        return record
+
+    def _sweep_spill(self) -> None:
+        self._last_sweep = time.monotonic()
+        if self.spill_dir is None:
+            return
+        cutoff = time.time() - self.spill_retention
+        for path in self.spill_dir.glob("*/*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+
+    # ---------- Chats ----------
+    def save_chat(self, chat: Chat) -> None:
+        self._put("chats", chat.id, chat)
+
+    def load_chat(self, chat_id: str) -> Optional[Chat]:
+        return self._get("chats", chat_id)
+
+    def has_chat(self, chat_id: str) -> bool:
+        return self._get("chats", chat_id) is not None
+
+    def append_message(self, chat_id: str, message: Message) -> None:
+        chat = self._get("chats", chat_id)
+        if chat is None:
+            raise KeyError(f"Chat {chat_id} not found")
+        # seq is the 1-based list position, so pages are plain slices.
+        message.seq = len(chat.messages) + 1
+        chat.messages.append(message)
+
+    def last_message_seq(self, chat_id: str) -> Optional[int]:
+        chat = self._get("chats", chat_id)
+        return None if chat is None else len(chat.messages)
+
+    def load_messages(
+        self,
+        chat_id: str,
+        after: int = 0,
+        before: Optional[int] = None,
+        limit: int = 50,
+        newest: bool = False,
+    ) -> List[Message]:
+        chat = self._get("chats", chat_id)
+        if chat is None:
+            return []
+        start = max(after, 0)
+        end = len(chat.messages) if before is None else min(before - 1, len(chat.messages))
+        if newest:
+            start = max(start, end - limit)
+        else:
+            end = min(end, start + limit)
+        return chat.messages[start:end] if start < end else []
+
+    # ---------- Jobs ----------
+    def save_job(self, job: Job) -> None:
+        self._put("jobs", job.id, job)
+
+    def load_job(self, job_id: str) -> Optional[Job]:
+        return self._get("jobs", job_id)
+
+    def update_job(
+        self,
+        job_id: str,
+        updates: Dict[str, Any],
+        log: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Job]:
+        job = self._get("jobs", job_id)
+        if job is None:
+            return None
+        if metadata:
+            updates = {**updates, "metadata": {**job.metadata, **metadata}}
+        if updates:
+            job = replace(job, **updates)
+            entry = self.jobs.get(job_id)
+            if entry is not None:
+                entry.value = job
+        if log:
+            job.logs.append(log)
+        return job
+
+    def read_logs(self, job_id: str, offset: int = 0) -> Optional[List[str]]:
+        job = self._get("jobs", job_id)
+        return None if job is None else job.logs[offset:]
+
+    # ---------- Gauges ----------
+    def stats(self) -> Dict[str, Any]:
+        chats = [e.value for e in self.chats.values()]
+        jobs = [e.value for e in self.jobs.values()]
+        message_bytes = sum(len(m.content) for chat in chats for m in chat.messages)
+        job_bytes = sum(len(job.prompt) + len(job.result_message or "") for job in jobs)
+        return {
+            "chats": len(chats),
+            "messages": sum(len(chat.messages) for chat in chats),
+            "jobs": len(jobs),
+            "active_jobs": sum(1 for job in jobs if job.status in _ACTIVE_STATUSES),
+            "text_bytes": message_bytes + job_bytes,
+            "evictions": dict(self.evictions),
+            "spill_loads": dict(self.spill_loads),
+        }
@@ -0,0 +1,204 @@
+"""
+Redis storage backend, shared by all API replicas and Celery workers.
+
+Layout (``<prefix>`` defaults to ``chatpwc``):
+- ``<prefix>:chat:<id>``           hash   chat metadata
+- ``<prefix>:chat:<id>:messages``  list   JSON messages
+- ``<prefix>:job:<id>``            hash   job fields; one ``meta:<key>`` field
+                                           (JSON) per metadata key
+- ``<prefix>:job:<id>:lines``      list   job log lines
+
+Multi-key reads and writes go through one pipeline round-trip. Metadata
+keys are separate hash fields so merging metadata is a plain HSET, with no
+read-modify-write between processes. Log lines
+are a list so pollers read from an offset with ``LRANGE key offset -1``.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+from .base import StorageBackend, encode_job_updates, job_from_fields, job_to_fields, message_to_json
+from ..memory_store import Chat, Job, Message
+
+
+_META_PREFIX = "meta:"
+
+
+def _decode(value: Any) -> Any:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _metadata_fields(metadata: Dict[str, Any]) -> Dict[str, str]:
+    return {f"{_META_PREFIX}{name}": json.dumps(value) for name, value in metadata.items()}
+
+
+class RedisBackend(StorageBackend):
+    blocking = True
+
+    def __init__(self, client: Any, prefix: str = "chatpwc", ttl: Optional[int] = None) -> None:
+        """
+        ``client`` is a sync ``redis.Redis`` (or compatible fake). ``ttl``, if
+        set, is applied to every key on write.
+        """
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _chat_key(self, chat_id: str) -> str:
+        return f"{self.prefix}:chat:{chat_id}"
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    def _logs_key(self, job_id: str) -> str:
+        return f"{self._job_key(job_id)}:lines"
+
+    @staticmethod
+    def _fields(raw: Any) -> Dict[str, Any]:
+        return {_decode(k): _decode(v) for k, v in raw.items()}
+
+    def _expire(self, pipe: Any, *keys: str) -> None:
+        if self.ttl:
+            for key in keys:
+                pipe.expire(key, self.ttl)
+
+    # ---------- Chats ----------
+    def save_chat(self, chat: Chat) -> None:
+        key = self._chat_key(chat.id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(key, mapping={
+            "id": chat.id,
+            "title": chat.title,
+            "provider": chat.provider,
+            "model": chat.model,
+            "agent_id": chat.agent_id,
+        })
+        self._expire(pipe, key)
+        pipe.execute()
+
+    def load_chat(self, chat_id: str) -> Optional[Chat]:
+        key = self._chat_key(chat_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(key)
+        pipe.lrange(f"{key}:messages", 0, -1)
+        fields, raw_messages = pipe.execute()
+        if not fields:
+            return None
+        return Chat(messages=self._messages(raw_messages, 1), **self._fields(fields))
+
+    @staticmethod
+    def _messages(raw_messages: Any, first_seq: int) -> List[Message]:
+        # seq is the 1-based list position (lists are append-only).
+        return [
+            Message(**json.loads(_decode(raw)), seq=seq)
+            for seq, raw in enumerate(raw_messages, start=first_seq)
+        ]
+
+    def has_chat(self, chat_id: str) -> bool:
+        return bool(self.client.exists(self._chat_key(chat_id)))
+
+    def append_message(self, chat_id: str, message: Message) -> None:
+        key = f"{self._chat_key(chat_id)}:messages"
+        pipe = self.client.pipeline(transaction=False)
+        pipe.rpush(key, message_to_json(message))
+        self._expire(pipe, key, self._chat_key(chat_id))
+        message.seq = int(pipe.execute()[0])
+
+    def last_message_seq(self, chat_id: str) -> Optional[int]:
+        key = self._chat_key(chat_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.exists(key)
+        pipe.llen(f"{key}:messages")
+        exists, length = pipe.execute()
+        return int(length) if exists else None
+
+    def load_messages(
+        self,
+        chat_id: str,
+        after: int = 0,
+        before: Optional[int] = None,
+        limit: int = 50,
+        newest: bool = False,
+    ) -> List[Message]:
+        key = f"{self._chat_key(chat_id)}:messages"
+        start = max(after, 0)
+        length = self.client.llen(key)
+        end = length if before is None else min(before - 1, length)
+        if newest:
+            start = max(start, end - limit)
+        else:
+            end = min(end, start + limit)
+        if start >= end:
+            return []
+        return self._messages(self.client.lrange(key, start, end - 1), start + 1)
+
+    # ---------- Jobs ----------
+    def save_job(self, job: Job) -> None:
+        key, logs_key = self._job_key(job.id), self._logs_key(job.id)
+        pipe = self.client.pipeline(transaction=True)
+        fields = job_to_fields(job)
+        fields.pop("metadata", None)
+        pipe.delete(key, logs_key)
+        pipe.hset(key, mapping={**fields, **_metadata_fields(job.metadata)})
+        if job.logs:
+            pipe.rpush(logs_key, *job.logs)
+        self._expire(pipe, key, logs_key)
+        pipe.execute()
+
+    def _job(self, raw: Any, logs: List[str]) -> Job:
+        fields = self._fields(raw)
+        # Jobs written before metadata keys were split out have one JSON field.
+        metadata = json.loads(fields.pop("metadata")) if "metadata" in fields else {}
+        for name in [name for name in fields if name.startswith(_META_PREFIX)]:
+            metadata[name[len(_META_PREFIX):]] = json.loads(fields.pop(name))
+        job = job_from_fields(fields, logs)
+        job.metadata = metadata
+        return job
+
+    def load_job(self, job_id: str) -> Optional[Job]:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(self._job_key(job_id))
+        pipe.lrange(self._logs_key(job_id), 0, -1)
+        fields, lines = pipe.execute()
+        if not fields:
+            return None
+        return self._job(fields, [_decode(line) for line in lines])
+
+    def load_jobs(self, job_ids: List[str]) -> List[Optional[Job]]:
+        pipe = self.client.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.hgetall(self._job_key(job_id))
+        return [self._job(fields, []) if fields else None for fields in pipe.execute()]
+
+    def read_logs(self, job_id: str, offset: int = 0) -> Optional[List[str]]:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.exists(self._job_key(job_id))
+        pipe.lrange(self._logs_key(job_id), offset, -1)
+        exists, lines = pipe.execute()
+        if not exists:
+            return None
+        return [_decode(line) for line in lines]
+
+    def update_job(
+        self,
+        job_id: str,
+        updates: Dict[str, Any],
+        log: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Job]:
+        key, logs_key = self._job_key(job_id), self._logs_key(job_id)
+        if not self.client.exists(key):
+            return None
+        fields = {**encode_job_updates(updates), **_metadata_fields(metadata or {})}
+        pipe = self.client.pipeline(transaction=True)
+        if fields:
+            pipe.hset(key, mapping=fields)
+        if log:
+            pipe.rpush(logs_key, log)
+        self._expire(pipe, key, logs_key)
+        pipe.hgetall(key)
+        # Only the hash comes back: the log can be long and callers that
+        # need it use read_logs.
+        return self._job(pipe.execute()[-1], [])
@@ -0,0 +1,228 @@
+"""
+SQLite storage backend for single-node deployments.
+
+The API and Celery workers on the same host share one database file; WAL
+mode lets readers proceed while a writer holds the lock.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .base import (
+    JOB_JSON_FIELDS,
+    JOB_SCALAR_FIELDS,
+    StorageBackend,
+    encode_job_updates,
+    job_from_fields,
+    job_to_fields,
+    message_to_json,
+)
+from ..memory_store import Chat, Job, Message
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chats (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    agent_id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_chat ON messages (chat_id, seq);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    chat_id TEXT,
+    prompt TEXT,
+    status TEXT,
+    result_message TEXT,
+    output_docx_path TEXT,
+    error TEXT,
+    output_payload TEXT,
+    metadata TEXT
+);
+CREATE TABLE IF NOT EXISTS job_logs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    line TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_logs_job ON job_logs (job_id, seq);
+"""
+
+_JOB_COLUMNS = JOB_SCALAR_FIELDS + JOB_JSON_FIELDS
+
+
+def _message(row: sqlite3.Row) -> Message:
+    return Message(**json.loads(row["data"]), seq=row["seq"])
+
+
+class SQLiteBackend(StorageBackend):
+    blocking = True
+
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # One connection shared by threads in this process.
+        self._lock = threading.Lock()
+
+    # ---------- Chats ----------
+    def save_chat(self, chat: Chat) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chats (id, title, provider, model, agent_id) VALUES (?, ?, ?, ?, ?)",
+                (chat.id, chat.title, chat.provider, chat.model, chat.agent_id),
+            )
+
+    def load_chat(self, chat_id: str) -> Optional[Chat]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM chats WHERE id = ?", (chat_id,)).fetchone()
+            if row is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT seq, data FROM messages WHERE chat_id = ? ORDER BY seq", (chat_id,)
+            ).fetchall()
+        return Chat(messages=[_message(r) for r in rows], **dict(row))
+
+    def has_chat(self, chat_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM chats WHERE id = ?", (chat_id,)).fetchone() is not None
+
+    def append_message(self, chat_id: str, message: Message) -> None:
+        # seq is the table's rowid: increasing per chat, though not dense.
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO messages (chat_id, data) VALUES (?, ?)",
+                (chat_id, message_to_json(message)),
+            )
+        message.seq = cursor.lastrowid
+
+    def last_message_seq(self, chat_id: str) -> Optional[int]:
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM chats WHERE id = ?", (chat_id,)).fetchone() is None:
+                return None
+            row = self._conn.execute(
+                "SELECT MAX(seq) AS seq FROM messages WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+        return row["seq"] or 0
+
+    def load_messages(
+        self,
+        chat_id: str,
+        after: int = 0,
+        before: Optional[int] = None,
+        limit: int = 50,
+        newest: bool = False,
+    ) -> List[Message]:
+        # Served by the (chat_id, seq) index: cost depends on limit only.
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, data FROM messages WHERE chat_id = ? AND seq > ? AND seq < ? "
+                f"ORDER BY seq {'DESC' if newest else 'ASC'} LIMIT ?",
+                (chat_id, after, before if before is not None else 2 ** 63 - 1, limit),
+            ).fetchall()
+        messages = [_message(r) for r in rows]
+        return messages[::-1] if newest else messages
+
+    # ---------- Jobs ----------
+    def save_job(self, job: Job) -> None:
+        fields = job_to_fields(job)
+        values = [fields.get(c) for c in _JOB_COLUMNS]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO jobs ({', '.join(_JOB_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in _JOB_COLUMNS)})",
+                    values,
+                )
+                self._conn.execute("DELETE FROM job_logs WHERE job_id = ?", (job.id,))
+                self._conn.executemany(
+                    "INSERT INTO job_logs (job_id, line) VALUES (?, ?)",
+                    [(job.id, line) for line in job.logs],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def load_job(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            logs = [
+                r["line"]
+                for r in self._conn.execute(
+                    "SELECT line FROM job_logs WHERE job_id = ? ORDER BY seq", (job_id,)
+                )
+            ]
+        return job_from_fields(dict(row), logs)
+
+    def load_jobs(self, job_ids: List[str]) -> List[Optional[Job]]:
+        by_id: Dict[str, Job] = {}
+        with self._lock:
+            # Chunked below SQLite's default bound-parameter limit.
+            for i in range(0, len(job_ids), 500):
+                chunk = job_ids[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT * FROM jobs WHERE id IN ({', '.join('?' for _ in chunk)})", chunk
+                ).fetchall()
+                by_id.update((row["id"], job_from_fields(dict(row), [])) for row in rows)
+        return [by_id.get(job_id) for job_id in job_ids]
+
+    def read_logs(self, job_id: str, offset: int = 0) -> Optional[List[str]]:
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone() is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT line FROM job_logs WHERE job_id = ? ORDER BY seq LIMIT -1 OFFSET ?",
+                (job_id, offset),
+            ).fetchall()
+        return [r["line"] for r in rows]
+
+    def update_job(
+        self,
+        job_id: str,
+        updates: Dict[str, Any],
+        log: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Job]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                current = self._conn.execute("SELECT metadata FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if current is None:
+                    self._conn.execute("ROLLBACK")
+                    return None
+                if metadata:
+                    # Merged under the write lock: no other process can
+                    # change the job between this read and the update.
+                    merged = {**json.loads(current["metadata"] or "{}"), **metadata}
+                    updates = {**updates, "metadata": merged}
+                encoded = encode_job_updates(updates)
+                if encoded:
+                    self._conn.execute(
+                        f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in encoded)} WHERE id = ?",
+                        [*encoded.values(), job_id],
+                    )
+                if log:
+                    self._conn.execute("INSERT INTO job_logs (job_id, line) VALUES (?, ?)", (job_id, log))
+                row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_from_fields(dict(row), [])
@@ -1,30 +1,41 @@
 """
 memory_store.py
 ---------------
-In-memory persistence layer for Chats, Messages, and Jobs.
+Persistence layer for Chats, Messages, and Jobs.
 
-This is NOT a database, it is temporary runtime storage.
-Used until Redis / Postgres is plugged in.
+Models and the MemoryStore facade. By default data lives in process
+memory; set STORAGE_BACKEND=redis|sqlite to share it across processes.
 """
 
 from __future__ import annotations
-from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Literal, Any
 import asyncio
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Dict, Optional, Literal, Any, TYPE_CHECKING
+import time
 import uuid
 
+from ..utils.keyed_lock import KeyedLock
+
+if TYPE_CHECKING:
+    from .backends.base import StorageBackend
+
 
 # =======================
 # Chat & Message Models
 # =======================
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     role: Literal["user", "assistant", "system"]
     content: str
+    timestamp: float = field(default_factory=time.time)  # epoch seconds
+    # Position in the chat, assigned by the backend on append; increases
+    # with every message and serves as the history cursor.
+    seq: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class Chat:
     id: str
     title: str
@@ -38,10 +49,10 @@ class Chat:
 # Job Model
 # =======================
 
-JobStatus = Literal["queued", "running", "completed", "failed"]
+JobStatus = Literal["queued", "running", "completed", "failed", "cancelled"]
 
 
-@dataclass
+@dataclass(slots=True)
 class Job:
     id: str
     chat_id: str
@@ -68,53 +79,132 @@ class Job:
 
 class MemoryStore:
     """
-    Generic in-memory storage with concurrency locks.
-    Replace with Redis/DB later.
+    Chat/job storage facade.
+
+    Persistence is delegated to a pluggable StorageBackend (in-memory,
+    Redis or SQLite, see ``STORAGE_BACKEND``) so the API process and
+    Celery workers can share the same chats and jobs.
+
+    Writes to the same chat or job are serialised by a per-key lock; writes
+    to different chats/jobs never wait on each other. Metadata merges happen
+    inside the backend's write, so they are also safe across processes.
+    Reads take no store lock: the in-memory backend updates jobs
+    copy-on-write, and logs and messages are append-only, so pollers can
+    read new log lines by offset.
+
+    The async methods run calls to blocking (Redis/SQLite) backends in a
+    worker thread. Each read has an async twin (``aget_job``...) for use
+    from coroutines; the plain getters are for sync code (threadpool routes,
+    Celery signal handlers).
     """
 
-    def __init__(self) -> None:
-        self.chats: Dict[str, Chat] = {}
-        self.jobs: Dict[str, Job] = {}
-        self._lock = asyncio.Lock()
+    def __init__(self, backend: Optional["StorageBackend"] = None) -> None:
+        self.backend = backend or create_storage_backend()
+        self._chat_locks = KeyedLock()
+        self._job_locks = KeyedLock()
+
+    async def _call(self, fn, *args, **kwargs):
+        if self.backend.blocking:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
 
     # ---------- Chat Methods ----------
     async def create_chat(self, title: str, provider: str, model: str, agent_id: str) -> Chat:
-        async with self._lock:
-            chat_id = str(uuid.uuid4())
-            chat = Chat(id=chat_id, title=title, provider=provider, model=model, agent_id=agent_id)
-            self.chats[chat_id] = chat
-            return chat
+        # New random id: nothing else can be writing to it.
+        chat_id = str(uuid.uuid4())
+        chat = Chat(id=chat_id, title=title, provider=provider, model=model, agent_id=agent_id)
+        await self._call(self.backend.save_chat, chat)
+        return chat
 
     async def add_message(self, chat_id: str, role: Literal["user", "assistant", "system"], content: str) -> Message:
-        async with self._lock:
-            chat = self.chats.get(chat_id)
-            if not chat:
+        async with self._chat_locks.hold(chat_id):
+            if not await self._call(self.backend.has_chat, chat_id):
                 raise KeyError(f"Chat {chat_id} not found")
 
             message = Message(role=role, content=content)
-            chat.messages.append(message)
+            await self._call(self.backend.append_message, chat_id, message)
             return message
 
+    def last_message_seq(self, chat_id: str) -> int:
+        """Seq of the newest message (0 if none); changes whenever history does."""
+        seq = self.backend.last_message_seq(chat_id)
+        if seq is None:
+            raise KeyError(f"Chat {chat_id} not found")
+        return seq
+
+    async def alast_message_seq(self, chat_id: str) -> int:
+        return await self._call(self.last_message_seq, chat_id)
+
+    def get_messages(
+        self,
+        chat_id: str,
+        after: int = 0,
+        before: Optional[int] = None,
+        limit: int = 50,
+        newest: bool = False,
+    ) -> List[Message]:
+        """
+        Up to ``limit`` messages with ``after < seq < before``, oldest first;
+        the newest ones of that range when ``newest`` is set.
+        """
+        return self.backend.load_messages(chat_id, after, before, limit, newest)
+
+    async def aget_messages(
+        self,
+        chat_id: str,
+        after: int = 0,
+        before: Optional[int] = None,
+        limit: int = 50,
+        newest: bool = False,
+    ) -> List[Message]:
+        return await self._call(self.get_messages, chat_id, after, before, limit, newest)
+
     def get_chat(self, chat_id: str) -> Chat:
-        chat = self.chats.get(chat_id)
+        chat = self.backend.load_chat(chat_id)
         if not chat:
             raise KeyError(f"Chat {chat_id} not found")
         return chat
 
+    async def aget_chat(self, chat_id: str) -> Chat:
+        return await self._call(self.get_chat, chat_id)
+
     # ---------- Job Methods ----------
-    async def create_job(self, chat_id: str, prompt: str, metadata: Optional[Dict[str, Any]] = None) -> Job:
-        async with self._lock:
-            job_id = str(uuid.uuid4())
+    async def create_job(
+        self,
+        chat_id: str,
+        prompt: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        job_id: Optional[str] = None,
+    ) -> Job:
+        job_id = job_id or str(uuid.uuid4())
+        async with self._job_locks.hold(job_id):
             job = Job(id=job_id, chat_id=chat_id, prompt=prompt, metadata=metadata or {})
-            self.jobs[job_id] = job
+            await self._call(self.backend.save_job, job)
             return job
 
     def get_job(self, job_id: str) -> Job:
-        job = self.jobs.get(job_id)
+        job = self.backend.load_job(job_id)
         if not job:
             raise KeyError(f"Job {job_id} not found")
         return job
 
+    async def aget_job(self, job_id: str) -> Job:
+        return await self._call(self.get_job, job_id)
+
+    def get_jobs(self, job_ids: List[str]) -> List[Job]:
+        """
+        Several jobs in one backend round-trip, in order; their logs may be
+        empty (use ``read_logs``).
+        """
+        jobs = self.backend.load_jobs(job_ids)
+        for job_id, job in zip(job_ids, jobs):
+            if job is None:
+                raise KeyError(f"Job {job_id} not found")
+        return jobs  # type: ignore[return-value]
+
+    async def aget_jobs(self, job_ids: List[str]) -> List[Job]:
+        return await self._call(self.get_jobs, job_ids)
+
     async def update_job(
         self,
         job_id: str,
@@ -124,28 +214,73 @@ class MemoryStore:
         output_docx_path: Optional[str] = None,
         output_payload: Optional[Dict[str, Any]] = None,
         error: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
     ) -> Job:
-        async with self._lock:
-            job = self.jobs.get(job_id)
-            if not job:
-                raise KeyError(f"Job {job_id} not found")
-
+        async with self._job_locks.hold(job_id):
+            updates: Dict[str, Any] = {}
             if status:
-                job.status = status
-            if log:
-                job.logs.append(log)
+                updates["status"] = status
             if result_message:
-                job.result_message = result_message
+                updates["result_message"] = result_message
             if output_docx_path:
-                job.output_docx_path = output_docx_path
+                updates["output_docx_path"] = output_docx_path
             if output_payload:
-                job.output_payload = output_payload
+                updates["output_payload"] = output_payload
             if error:
-                job.error = error
+                updates["error"] = error
 
+            job = await self._call(self.backend.update_job, job_id, updates, log=log, metadata=metadata)
+            if not job:
+                raise KeyError(f"Job {job_id} not found")
             return job
 
+    def read_logs(self, job_id: str, offset: int = 0) -> List[str]:
+        """Log lines of a job from ``offset`` on (lock-free, append-only)."""
+        lines = self.backend.read_logs(job_id, offset)
+        if lines is None:
+            raise KeyError(f"Job {job_id} not found")
+        return lines
+
+    async def aread_logs(self, job_id: str, offset: int = 0) -> List[str]:
+        return await self._call(self.read_logs, job_id, offset)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.backend.stats(),
+            "locked_chats": len(self._chat_locks),
+            "locked_jobs": len(self._job_locks),
+        }
+
+
+def create_storage_backend() -> "StorageBackend":
+    # Imported here: the backends import the models defined above.
+    from ..config import settings
+
+    backend = settings.STORAGE_BACKEND.lower()
+    if backend == "memory":
+        from .backends.memory import InMemoryBackend
+        spill_dir = None
+        if settings.MEMORY_SPILL_ENABLED:
+            spill_dir = (
+                Path(settings.MEMORY_SPILL_DIR) if settings.MEMORY_SPILL_DIR
+                else Path(__file__).resolve().parents[2] / ".memory_spill"
+            )
+        return InMemoryBackend(
+            max_chats=settings.MEMORY_MAX_CHATS,
+            max_jobs=settings.MEMORY_MAX_JOBS,
+            idle_ttl=settings.MEMORY_IDLE_TTL,
+            spill_dir=spill_dir,
+            spill_retention=settings.MEMORY_SPILL_RETENTION,
+        )
+    if backend == "redis":
+        import redis
+        from .backends.redis_backend import RedisBackend
+        return RedisBackend(redis.Redis.from_url(settings.REDIS_URL), ttl=settings.STORAGE_TTL)
+    if backend == "sqlite":
+        from .backends.sqlite_backend import SQLiteBackend
+        return SQLiteBackend(settings.SQLITE_PATH)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
 
 # Global instance
 MEMORY_STORE = MemoryStore()
-
@@ -4,76 +4,204 @@ Each task runs an agent against a chat/job and updates job_manager & memory_stor
 """
 
 import asyncio
+import time
+from contextlib import nullcontext
 from typing import Optional
 
 from celery import shared_task
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
+
+from .agents.base_agent import BaseAgent
+from .config import settings
 
 from .services.job_manager import job_manager, JobStatus
-from .services.chat_service import get_chat, add_message
+from .services.chat_service import aget_chat
 from .services.agent_registry import get_agent
-from .llm.provider_registry import create_llm_client
-from .storage.memory_store import JOB_STORE
+from .services.batch_service import finalize_batch, record_progress
+from .services.offline_batch import offline_dispatcher
+from .services.chat_service import add_message_by_id
+from .services.context_builder import context_builder
+from .services.job_completion import cache_key_for, complete_job, fail_job, record_job_usage, serve_from_cache
+from .llm.base import LLMClient
+from .llm.provider_registry import aclose_llm_clients, create_resilient_llm_client
+from .llm.usage import track_usage
+from .rag.simple_rag import warm_up as warm_up_rag
+from .storage.memory_store import MEMORY_STORE, Chat, Job
+from .utils.event_loop import on_shutdown, run_sync, shutdown_worker_loop
 from .utils.logger import logger
+from .utils.metrics import JOB_SECONDS, JOBS
+from .utils.profiling import profile_job
+from .utils.tracing import record_span, setup_tracing, span, track_spans
 
 
 async def _run_job(job_id: str) -> None:
-    job = JOB_STORE.get(job_id)
-    if not job:
-        logger.error(f"[Celery] Job {job_id} not found in JOB_STORE")
+    try:
+        job = await MEMORY_STORE.aget_job(job_id)
+    except KeyError:
+        logger.error(f"[Celery] Job {job_id} not found in MEMORY_STORE")
+        return
+    if job.status in JobStatus.TERMINAL:
+        # Redelivered (acks_late) or revoked after it was picked up.
+        logger.info(f"[Celery] Job {job_id} already {job.status}; skipping")
         return
 
-    chat = get_chat(job.chat_id)
+    chat = await aget_chat(job.chat_id)
     agent = get_agent(chat.agent_id)
-    llm_client = create_llm_client(chat.provider, chat.model)
+    llm_client = create_resilient_llm_client(chat.provider, chat.model)
 
-    await job_manager.update_job(job_id, JobStatus.RUNNING, log="Starting agent execution")
+    created_at = job.metadata.get("created_at")
+    status = JobStatus.FAILED
+    profile = None
+    profiling = profile_job(job_id) if job.metadata.get("profile") else nullcontext()
+    with track_spans("job", job_id=job_id, agent=agent.id) as trace:
+        if created_at:
+            record_span("queue_wait", max(time.time() - created_at, 0.0))
+        await job_manager.update_job(job_id, JobStatus.RUNNING, log="Starting agent execution")
+        limit = settings.JOB_SOFT_TIME_LIMIT
+        started = time.monotonic()
+        try:
+            with profiling as profile:
+                await asyncio.wait_for(_execute(job, chat, agent, llm_client), limit)
+            status = JobStatus.COMPLETED
+        except asyncio.CancelledError:
+            status = JobStatus.CANCELLED
+            raise
+        except asyncio.TimeoutError as exc:
+            # Also raised by timeouts inside the job (TimeoutError on 3.11+);
+            # only the limit is reported as such.
+            if limit is None or time.monotonic() - started < limit:
+                logger.exception(f"[Celery] Job {job_id} failed: {exc!r}")
+                await fail_job(job_id, exc)
+                raise
+            error = TimeoutError(f"Job exceeded its time limit ({limit:g}s)")
+            logger.error(f"[Celery] Job {job_id} failed: {error}")
+            await fail_job(job_id, error)
+            raise error
+        except Exception as exc:
+            logger.exception(f"[Celery] Job {job_id} failed: {exc}")
+            await fail_job(job_id, exc)
+            raise
+        finally:
+            JOBS.labels(status).inc()
+            if created_at:
+                JOB_SECONDS.labels(status).observe(time.time() - created_at)
+            metadata = {"timings": trace.as_list()}
+            if profile is not None and profile.report_path is not None:
+                metadata["profile_files"] = profile.as_dict()
+            await MEMORY_STORE.update_job(job_id, metadata=metadata)
 
-    try:
-        # Take last user message or prompt string
-        prompt = job.prompt
 
+async def _execute(job: Job, chat: Chat, agent: BaseAgent, llm_client: LLMClient) -> None:
+    job_id = job.id
+
+    async def on_token(text: str) -> None:
+        await job_manager.append_tokens(job_id, text)
+
+    # Take last user message or prompt string
+    prompt = job.prompt
+    with_history = bool(job.metadata.get("with_history"))
+
+    # Answers to follow-ups depend on the conversation, not just the prompt;
+    # a profiled job is asked for to measure a real run.
+    uncached = with_history or job.metadata.get("profile")
+    cache_key = None if uncached else cache_key_for(prompt, chat, agent)
+    with span("result_cache"):
+        result = await serve_from_cache(job_id, cache_key)
+    if result is None:
         logger.info(f"[Celery] Running agent {agent.name} for job {job_id}")
-        result = await agent.run(
-            chat=chat,
-            llm_client=llm_client,
-            job_id=job_id,
-            prompt=prompt,
-        )
-
-        # Update chat history
-        add_message(chat, "assistant", result.text)
-
-        # Update Job dataclass
-        job.status = "completed"
-        job.result_message = result.text
-        job.output_docx_path = result.output_docx_path
-
-        await job_manager.update_job(
-            job_id,
-            JobStatus.COMPLETED,
-            log="Job completed successfully",
-            result={
-                "result_message": result.text,
-                "output_docx_path": result.output_docx_path,
-            },
-        )
-
-    except Exception as exc:
-        logger.exception(f"[Celery] Job {job_id} failed: {exc}")
-        job.status = "failed"
-        job.error = str(exc)
-        await job_manager.update_job(
-            job_id,
-            JobStatus.FAILED,
-            log=f"Job failed: {exc}",
-            result=None,
-        )
-        raise
+        with track_usage() as usage:
+            try:
+                history = None
+                if with_history:
+                    with span("history"):
+                        context = await context_builder.build(chat, chat.provider, chat.model)
+                    history = context.messages
+                    await MEMORY_STORE.update_job(job_id, metadata={"context": context.as_dict()})
+                with span("agent", agent=agent.id):
+                    result = await agent.run(
+                        chat=chat,
+                        llm_client=llm_client,
+                        job_id=job_id,
+                        prompt=prompt,
+                        on_token=on_token,
+                        history=history,
+                    )
+            finally:
+                await job_manager.flush_tokens(job_id)
+                await record_job_usage(job_id, usage)
+        if any(model != chat.model for model in usage.models):
+            # Failed over or hedged to another model: the result must not be
+            # cached under the requested one.
+            cache_key = None
+    else:
+        cache_key = None  # already cached
+
+    with span("complete"):
+        if with_history:
+            # Recorded after the run so it is not part of its own history.
+            await add_message_by_id(chat.id, "user", prompt)
+        await complete_job(job_id, chat, result, cache_key)
 
 
 @shared_task(name="run_agent_job")
 def run_agent_job(job_id: str) -> None:
     """
-    Celery entry point. Runs the async _run_job inside an event loop.
+    Celery entry point. Runs the async _run_job on the worker's persistent
+    event loop so pooled LLM clients and connections survive across tasks.
     """
-    asyncio.run(_run_job(job_id))
+    run_sync(_run_job(job_id))
+
+
+@shared_task(name="run_batch_item")
+def run_batch_item(job_id: str) -> None:
+    """
+    One object of a batch. Failures are recorded on the child job and not
+    re-raised, so the batch's chord callback still runs.
+    """
+    try:
+        run_sync(_run_job(job_id))
+    except Exception:
+        pass
+
+
+@shared_task(name="collect_offline_job")
+def collect_offline_job(job_id: str) -> None:
+    """
+    Hand a job to the offline batch dispatcher, which keeps running on this
+    worker's persistent loop. Route to a single worker (LLM_BATCH_QUEUE).
+    """
+    run_sync(offline_dispatcher.add(job_id))
+
+
+@shared_task(name="batch_progress")
+def batch_progress_task(batch_id: str, wave: int, waves: int) -> None:
+    run_sync(record_progress(batch_id, wave, waves))
+
+
+@shared_task(name="finalize_batch")
+def finalize_batch_task(batch_id: str) -> None:
+    run_sync(finalize_batch(batch_id))
+
+
+on_shutdown(aclose_llm_clients)
+
+
+@worker_init.connect
+def _warm_up_rag(sender=None, **kwargs) -> None:
+    # Runs in the parent before the pool forks.
+    warm_up_rag()
+    # Pools that don't fork (threads, solo) run tasks in this process.
+    if str(getattr(sender, "pool_cls", "prefork")) not in ("prefork", "processes"):
+        setup_tracing()
+
+
+@worker_process_init.connect
+def _setup_tracing(**kwargs) -> None:
+    # In each pool process: exporter threads do not survive the fork.
+    setup_tracing()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def _close_worker_loop(**kwargs) -> None:
+    shutdown_worker_loop()
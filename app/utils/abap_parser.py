@@ -0,0 +1,261 @@
+"""
+abap_parser.py
+--------------
+Lightweight structural parser for ABAP source.
+
+It is not a full ABAP grammar; it recognises the block statements that
+matter for documentation (FORM, METHOD, FUNCTION, MODULE), the statements
+that reference SAP objects (SELECT/JOIN/TABLES/UPDATE..., INCLUDE,
+CALL FUNCTION, class references) and splits large programs into units
+that can be documented independently.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+
+
+_BLOCKS = {
+    "FORM": "ENDFORM",
+    "METHOD": "ENDMETHOD",
+    "FUNCTION": "ENDFUNCTION",
+    "MODULE": "ENDMODULE",
+}
+_BLOCK_START_RE = re.compile(r"^\s*(FORM|METHOD|FUNCTION|MODULE)\s+([\w/~>-]+)", re.IGNORECASE)
+_BLOCK_END_RE = re.compile(r"^\s*(ENDFORM|ENDMETHOD|ENDFUNCTION|ENDMODULE)\s*\.", re.IGNORECASE)
+
+_PROGRAM_RE = re.compile(r"^\s*(?:REPORT|PROGRAM|FUNCTION-POOL|CLASS-POOL)\s+([\w/]+)", re.IGNORECASE | re.MULTILINE)
+_INCLUDE_RE = re.compile(r"^\s*INCLUDE\s+([\w/]+)\s*\.", re.IGNORECASE | re.MULTILINE)
+_TABLE_RE = re.compile(
+    r"\b(?:FROM|JOIN|UPDATE|MODIFY|INSERT\s+INTO|INSERT)\s+([A-Za-z/][\w/]*)"
+    r"|^\s*TABLES\s*:?\s*([\w/,\s]+)\.",
+    re.IGNORECASE | re.MULTILINE,
+)
+_SELECT_RE = re.compile(r"\bSELECT\b", re.IGNORECASE)
+_FUNCTION_CALL_RE = re.compile(r"\bCALL\s+FUNCTION\s+'([\w/]+)'", re.IGNORECASE)
+_CLASS_RE = re.compile(
+    r"\bTYPE\s+REF\s+TO\s+([\w/]+)|\b([\w/]+)=>|\bNEW\s+([\w/]+)\s*\(|^\s*CLASS\s+([\w/]+)\s+(?:DEFINITION|IMPLEMENTATION)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Prefixes that conventionally denote local/internal data objects rather
+# than dictionary tables.
+_LOCAL_PREFIXES = ("lt_", "gt_", "it_", "ls_", "gs_", "wa_", "lv_", "gv_", "lo_", "go_", "@")
+_NOT_TABLES = {"table", "corresponding", "sorted", "standard", "hashed", "data", "value", "fields"}
+
+
+def strip_comments(source: str) -> str:
+    """Drop full-line ``*`` comments and trailing ``"`` comments outside literals."""
+    out: List[str] = []
+    for line in source.splitlines():
+        if line.startswith("*"):
+            out.append("")
+            continue
+        in_literal: Optional[str] = None
+        for i, ch in enumerate(line):
+            if in_literal:
+                if ch == in_literal:
+                    in_literal = None
+            elif ch in ("'", "`", "|"):
+                in_literal = ch
+            elif ch == '"':
+                line = line[:i]
+                break
+        out.append(line)
+    return "\n".join(out)
+
+
+def _is_table_name(name: str) -> bool:
+    lowered = name.lower()
+    return bool(lowered) and not lowered.startswith(_LOCAL_PREFIXES) and lowered not in _NOT_TABLES
+
+
+def find_tables(source: str) -> List[str]:
+    found: List[str] = []
+    for m in _TABLE_RE.finditer(source):
+        names = [m.group(1)] if m.group(1) else re.split(r"[,\s]+", m.group(2) or "")
+        for name in names:
+            if name and _is_table_name(name):
+                found.append(name.upper())
+    return _dedupe(found)
+
+
+def _dedupe(items: List[str]) -> List[str]:
+    seen: Set[str] = set()
+    return [x for x in items if not (x in seen or seen.add(x))]
+
+
+@dataclass
+class AbapUnit:
+    kind: str          # FORM | METHOD | FUNCTION | MODULE | MAIN
+    name: str
+    source: str
+    start_line: int
+    end_line: int
+    tables: List[str] = field(default_factory=list)
+    selects: int = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.kind} {self.name}" if self.kind != "MAIN" else "Main program / event blocks"
+
+
+@dataclass
+class AbapProgram:
+    name: Optional[str]
+    units: List[AbapUnit]
+    includes: List[str]
+    tables: List[str]
+    function_modules: List[str]
+    classes: List[str]
+
+    def sap_objects(self) -> List[str]:
+        """All referenced SAP objects, used as the retrieval query."""
+        objects = [self.name] if self.name else []
+        return _dedupe(objects + self.includes + self.tables + self.function_modules + self.classes)
+
+    def summary(self) -> str:
+        """Compact object inventory for prompts."""
+        lines = [f"Program: {self.name or '(unnamed)'}"]
+        for label, items in (
+            ("Includes", self.includes),
+            ("Tables", self.tables),
+            ("Function modules", self.function_modules),
+            ("Classes", self.classes),
+            ("Units", [u.label for u in self.units]),
+        ):
+            if items:
+                lines.append(f"{label}: {', '.join(items)}")
+        return "\n".join(lines)
+
+
+def parse_abap(source: str) -> AbapProgram:
+    code = strip_comments(source)
+    raw_lines = source.splitlines()
+    code_lines = code.splitlines()
+
+    units: List[AbapUnit] = []
+    main_lines: List[str] = []
+    main_start: Optional[int] = None
+    main_end = 0
+
+    i = 0
+    while i < len(code_lines):
+        m = _BLOCK_START_RE.match(code_lines[i])
+        if m:
+            kind, name = m.group(1).upper(), m.group(2)
+            end_kw = _BLOCKS[kind]
+            j = i + 1
+            while j < len(code_lines):
+                end = _BLOCK_END_RE.match(code_lines[j])
+                if end and end.group(1).upper() == end_kw:
+                    break
+                j += 1
+            j = min(j, len(code_lines) - 1)
+            unit_code = "\n".join(code_lines[i:j + 1])
+            units.append(
+                AbapUnit(
+                    kind=kind,
+                    name=name.rstrip("."),
+                    source="\n".join(raw_lines[i:j + 1]),
+                    start_line=i + 1,
+                    end_line=j + 1,
+                    tables=find_tables(unit_code),
+                    selects=len(_SELECT_RE.findall(unit_code)),
+                )
+            )
+            i = j + 1
+            continue
+        if code_lines[i].strip():
+            if main_start is None:
+                main_start = i + 1
+            main_end = i + 1
+            main_lines.append(raw_lines[i])
+        i += 1
+
+    if main_lines:
+        main_code = strip_comments("\n".join(main_lines))
+        units.insert(
+            0,
+            AbapUnit(
+                kind="MAIN",
+                name="MAIN",
+                source="\n".join(main_lines),
+                start_line=main_start or 1,
+                end_line=main_end,
+                tables=find_tables(main_code),
+                selects=len(_SELECT_RE.findall(main_code)),
+            ),
+        )
+
+    classes: List[str] = []
+    for m in _CLASS_RE.finditer(code):
+        name = next(g for g in m.groups() if g)
+        if _is_table_name(name):
+            classes.append(name.upper())
+
+    program = _PROGRAM_RE.search(code)
+    return AbapProgram(
+        name=program.group(1).upper() if program else None,
+        units=units,
+        includes=_dedupe([x.upper() for x in _INCLUDE_RE.findall(code)]),
+        tables=find_tables(code),
+        function_modules=_dedupe([x.upper() for x in _FUNCTION_CALL_RE.findall(code)]),
+        classes=_dedupe(classes),
+    )
+
+
+def group_units(units: List[AbapUnit], max_chars: int) -> List[List[AbapUnit]]:
+    """
+    Pack consecutive units into groups of at most ``max_chars`` source
+    characters. A unit larger than ``max_chars`` is split on line
+    boundaries into several parts.
+    """
+    groups: List[List[AbapUnit]] = []
+    current: List[AbapUnit] = []
+    size = 0
+    for unit in units:
+        for part in _split_unit(unit, max_chars):
+            if current and size + len(part.source) > max_chars:
+                groups.append(current)
+                current, size = [], 0
+            current.append(part)
+            size += len(part.source)
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _split_unit(unit: AbapUnit, max_chars: int) -> List[AbapUnit]:
+    if len(unit.source) <= max_chars:
+        return [unit]
+    parts: List[AbapUnit] = []
+    lines = unit.source.splitlines()
+    buf: List[str] = []
+    buf_chars = 0  # length of buf's lines, each with its newline
+    start = unit.start_line
+    for offset, line in enumerate(lines):
+        if buf and buf_chars + len(line) > max_chars:
+            parts.append(_part(unit, buf, start, len(parts) + 1))
+            start = unit.start_line + offset
+            buf, buf_chars = [], 0
+        buf.append(line)
+        buf_chars += len(line) + 1
+    if buf:
+        parts.append(_part(unit, buf, start, len(parts) + 1))
+    return parts
+
+
+def _part(unit: AbapUnit, lines: List[str], start: int, n: int) -> AbapUnit:
+    source = "\n".join(lines)
+    return AbapUnit(
+        kind=unit.kind,
+        name=f"{unit.name} (part {n})",
+        source=source,
+        start_line=start,
+        end_line=start + len(lines) - 1,
+        tables=unit.tables,
+        selects=len(_SELECT_RE.findall(source)),
+    )
@@ -1,23 +1,198 @@
+"""
+DOCX generation for TS documents.
+
+``StreamingDocxBuilder`` renders markdown into a document while the LLM is
+still streaming: complete blocks (headings, lists, tables, code) are
+appended as they arrive, on a small thread pool so the event loop is never
+blocked. ``finish()`` only flushes the last block and saves the file.
+
+Two engines render from the cached template (see docx_template.py):
+python-docx on a cloned prototype, and the direct OOXML writer. With
+DOCX_ENGINE=auto documents switch to the OOXML writer once they exceed
+DOCX_OOXML_MIN_BLOCKS blocks.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from docx import Document
+from typing import Iterable, List, Optional
 
+from docx.shared import Pt
 
-def create_ts_docx(ts_text: str, output_path: Path) -> None:
+from ..config import settings
+from .docx_template import get_docx_template
+from .ooxml_writer import OoxmlDocxWriter
+from .tracing import span
+from .markdown_blocks import (
+    Block,
+    CodeBlock,
+    Heading,
+    ListItem,
+    MarkdownBlockParser,
+    Paragraph,
+    Quote,
+    Table,
+    inline_spans,
+    parse_markdown,
+)
+
+
+GENERATED_DIR = Path(__file__).resolve().parents[2] / "generated"
+DOCX_TITLE = "Technical Specification"
+
+# python-docx is pure Python; keep its work off the event loop.
+_RENDER_POOL = ThreadPoolExecutor(max_workers=settings.DOCX_RENDER_WORKERS, thread_name_prefix="docx")
+
+_CODE_FONT = "Consolas"
+_MAX_LIST_LEVEL = 3  # the default template has List Bullet/Number 1-3
+
+
+def _add_runs(paragraph, text: str) -> None:
+    for chunk, bold, italic, code in inline_spans(text):
+        run = paragraph.add_run(chunk)
+        run.bold = bold or None
+        run.italic = italic or None
+        if code:
+            run.font.name = _CODE_FONT
+
+
+def _render_block(doc, block: Block) -> None:
+    if isinstance(block, Heading):
+        # Level 1 is the document title; markdown "#" maps to level 1 too.
+        # Inline markdown becomes runs, as in the OOXML writer.
+        _add_runs(doc.add_heading("", level=min(block.level, 9)), block.text)
+    elif isinstance(block, Paragraph):
+        _add_runs(doc.add_paragraph(), block.text)
+    elif isinstance(block, ListItem):
+        level = min(block.level, _MAX_LIST_LEVEL - 1)
+        style = "List Number" if block.ordered else "List Bullet"
+        if level:
+            style = f"{style} {level + 1}"
+        _add_runs(doc.add_paragraph(style=style), block.text)
+    elif isinstance(block, Table):
+        columns = max(len(row) for row in block.rows)
+        table = doc.add_table(rows=len(block.rows), cols=columns)
+        table.style = "Table Grid"
+        for r, row in enumerate(block.rows):
+            for c, value in enumerate(row):
+                paragraph = table.cell(r, c).paragraphs[0]
+                _add_runs(paragraph, value)
+                if r == 0:
+                    for run in paragraph.runs:
+                        run.bold = True
+    elif isinstance(block, CodeBlock):
+        paragraph = doc.add_paragraph()
+        lines = block.code.split("\n")
+        for i, line in enumerate(lines):
+            run = paragraph.add_run(line)
+            run.font.name = _CODE_FONT
+            run.font.size = Pt(9)
+            if i < len(lines) - 1:
+                run.add_break()
+    elif isinstance(block, Quote):
+        _add_runs(doc.add_paragraph(style="Quote"), block.text)
+
+
+def render_blocks(doc, blocks: Iterable[Block]) -> None:
+    for block in blocks:
+        _render_block(doc, block)
+
+
+def _title() -> Heading:
+    return Heading(1, DOCX_TITLE)
+
+
+def _use_ooxml(block_count: int) -> bool:
+    engine = settings.DOCX_ENGINE
+    return engine == "ooxml" or (engine == "auto" and block_count > settings.DOCX_OOXML_MIN_BLOCKS)
+
+
+class StreamingDocxBuilder:
     """
-    Very simple DOCX generator:
-    - Splits by lines
-    - Lines starting with '## ' become headings
-    - Others become paragraphs
+    Build a DOCX incrementally from streamed markdown.
+
+    ``feed`` is cheap and never blocks: it splits complete blocks off the
+    stream and queues their rendering on the render pool, in order.
     """
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    doc = Document()
 
-    doc.add_heading("Technical Specification", level=1)
+    def __init__(self, output_path: Path) -> None:
+        self.output_path = Path(output_path)
+        self._parser = MarkdownBlockParser()
+        self._blocks: List[Block] = [_title()]
+        self._doc = None
+        self._writer: Optional[OoxmlDocxWriter] = None
+        self._tail: Optional[asyncio.Future] = None
+
+    def _render(self, blocks: List[Block]) -> None:
+        self._blocks.extend(blocks)
+        if self._writer is not None:
+            self._writer.add(blocks)
+        elif _use_ooxml(len(self._blocks)):
+            # Switch engines: re-render everything so far as OOXML.
+            self._writer = OoxmlDocxWriter(get_docx_template())
+            self._writer.add(self._blocks)
+            self._doc = None
+        elif self._doc is None:
+            self._doc = get_docx_template().new_document()
+            render_blocks(self._doc, self._blocks)
+        else:
+            render_blocks(self._doc, blocks)
+
+    def _schedule(self, blocks: List[Block]) -> None:
+        previous = self._tail
+
+        async def render() -> None:
+            if previous is not None:
+                await previous
+            await asyncio.get_running_loop().run_in_executor(_RENDER_POOL, self._render, blocks)
+
+        self._tail = asyncio.ensure_future(render())
+
+    async def feed(self, text: str) -> None:
+        blocks = self._parser.feed(text)
+        if blocks:
+            self._schedule(blocks)
+
+    async def finish(self) -> Path:
+        """Render what is left and write the file."""
+        self._schedule(self._parser.close())
+        assert self._tail is not None
+        await self._tail
+        await asyncio.get_running_loop().run_in_executor(_RENDER_POOL, self._save)
+        return self.output_path
+
+    def _save(self) -> None:
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        if self._writer is not None:
+            self._writer.save(self.output_path)
+        else:
+            assert self._doc is not None
+            self._doc.save(str(self.output_path))
+
+    async def abort(self) -> None:
+        """Drop the document (e.g. the completion failed midway)."""
+        if self._tail is not None and not self._tail.done():
+            self._tail.cancel()
+        self._doc = None
+        self._writer = None
+
+
+def create_ts_docx(ts_text: str, output_path: Path) -> None:
+    """Render a complete markdown TS to DOCX (synchronous)."""
+    with span("docx_render"):
+        blocks = [_title()] + parse_markdown(ts_text)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        template = get_docx_template()
+        if _use_ooxml(len(blocks)):
+            writer = OoxmlDocxWriter(template)
+            writer.add(blocks)
+            writer.save(output_path)
+        else:
+            doc = template.new_document()
+            render_blocks(doc, blocks)
+            doc.save(str(output_path))
 
-    for line in ts_text.splitlines():
-        if line.startswith("## "):
-            doc.add_heading(line[3:].strip(), level=2)
-        elif line.strip():
-            doc.add_paragraph(line)
 
-    doc.save(str(output_path))
+async def render_ts_docx(ts_text: str, output_path: Path) -> None:
+    """``create_ts_docx`` on the render pool."""
+    await asyncio.get_running_loop().run_in_executor(_RENDER_POOL, create_ts_docx, ts_text, output_path)
@@ -0,0 +1,78 @@
+"""
+Per-process cache of the TS DOCX template.
+
+The template (DOCX_TEMPLATE_PATH, or python-docx's default) is read and
+parsed once. Jobs then either:
+- deep-copy the parsed python-docx prototype (no zip/XML re-parse), or
+- use the raw package parts and style ids for the direct OOXML writer.
+"""
+
+import copy
+import io
+import re
+import zipfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import docx
+from docx import Document
+
+from ..config import settings
+
+
+DOCUMENT_PART = "word/document.xml"
+_STYLE_RE = re.compile(
+    r"<w:style\b[^>]*\bw:styleId=\"([^\"]+)\"[^>]*>(?:(?!</w:style>).)*?<w:name w:val=\"([^\"]+)\"",
+    re.S,
+)
+
+
+class DocxTemplate:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            # Kept in archive order; [Content_Types].xml must stay first.
+            self.parts: List[Tuple[str, bytes]] = [(name, archive.read(name)) for name in archive.namelist()]
+        members = dict(self.parts)
+
+        styles = members.get("word/styles.xml", b"").decode("utf-8")
+        # Style names are matched case-insensitively ("heading 1" vs "Heading 1").
+        self.style_ids: Dict[str, str] = {
+            name.lower(): style_id for style_id, name in _STYLE_RE.findall(styles)
+        }
+
+        document = members[DOCUMENT_PART].decode("utf-8")
+        self.body_head, self.body_tail = self._split_body(document)
+
+        self._prototype = Document(io.BytesIO(data))
+
+    @staticmethod
+    def _split_body(document: str) -> Tuple[str, str]:
+        """Split document.xml where generated content goes: before the body's
+        final sectPr (page setup), after any template content."""
+        body_end = document.rindex("</w:body>")
+        sect = document.rfind("<w:sectPr", 0, body_end)
+        last_para = document.rfind("</w:p>", 0, body_end)
+        cut = sect if sect > last_para else body_end
+        return document[:cut], document[cut:]
+
+    def style_id(self, name: str) -> Optional[str]:
+        return self.style_ids.get(name.lower())
+
+    def new_document(self):
+        """A fresh python-docx Document cloned from the parsed template."""
+        return copy.deepcopy(self._prototype)
+
+
+def _default_template_path() -> Path:
+    return Path(docx.__file__).resolve().parent / "templates" / "default.docx"
+
+
+@lru_cache(maxsize=None)
+def _load_template(path: str) -> DocxTemplate:
+    return DocxTemplate(Path(path).read_bytes())
+
+
+def get_docx_template() -> DocxTemplate:
+    return _load_template(settings.DOCX_TEMPLATE_PATH or str(_default_template_path()))
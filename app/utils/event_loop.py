@@ -0,0 +1,74 @@
+"""
+Persistent per-process event loop for sync entry points (Celery tasks).
+
+``asyncio.run`` per task creates and tears down a loop every time, which
+also throws away every loop-bound resource (HTTP connection pools, Redis
+connections). Instead, one loop runs forever in a daemon thread and sync
+callers submit coroutines to it.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Coroutine, List, Optional, TypeVar
+
+from .logger import logger
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+_shutdown_hooks: List[Callable[[], Awaitable[None]]] = []
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="worker-event-loop", daemon=True)
+            _thread.start()
+            logger.info("[EventLoop] Started persistent worker event loop")
+        return _loop
+
+
+def run_sync(coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+    """Run ``coro`` on the persistent loop and block until it finishes."""
+    future = asyncio.run_coroutine_threadsafe(coro, get_worker_loop())
+    try:
+        return future.result(timeout)
+    except BaseException:
+        # Timed out or interrupted (e.g. a Celery time limit): don't leave
+        # the coroutine running on the loop.
+        future.cancel()
+        raise
+
+
+def on_shutdown(hook: Callable[[], Awaitable[None]]) -> None:
+    """Register an async cleanup hook run on the loop before it stops."""
+    _shutdown_hooks.append(hook)
+
+
+def shutdown_worker_loop(timeout: float = 10.0) -> None:
+    global _loop, _thread
+    with _lock:
+        loop, thread = _loop, _thread
+        _loop, _thread = None, None
+    if loop is None or loop.is_closed():
+        return
+
+    async def _run_hooks() -> None:
+        for hook in _shutdown_hooks:
+            try:
+                await hook()
+            except Exception as exc:
+                logger.warning(f"[EventLoop] Shutdown hook failed: {exc}")
+
+    try:
+        asyncio.run_coroutine_threadsafe(_run_hooks(), loop).result(timeout)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout)
+        loop.close()
+        logger.info("[EventLoop] Stopped persistent worker event loop")
@@ -0,0 +1,182 @@
+"""
+Incremental markdown block parser.
+
+Feeds on arbitrary text deltas (as streamed by the LLM) and emits complete
+blocks as soon as they are closed: headings, paragraphs, bullet/numbered
+list items (nested by indentation), pipe tables, fenced code blocks and
+quotes. Only the markdown subset used in our TS documents is supported.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+
+@dataclass
+class Heading:
+    level: int
+    text: str
+
+
+@dataclass
+class Paragraph:
+    text: str
+
+
+@dataclass
+class ListItem:
+    text: str
+    level: int = 0
+    ordered: bool = False
+
+
+@dataclass
+class Table:
+    rows: List[List[str]]
+
+
+@dataclass
+class CodeBlock:
+    code: str
+    language: str = ""
+
+
+@dataclass
+class Quote:
+    text: str
+
+
+Block = Union[Heading, Paragraph, ListItem, Table, CodeBlock, Quote]
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_LIST_RE = re.compile(r"^(\s*)([-*+]|\d+[.)])\s+(.*)$")
+_RULE_RE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_TABLE_SEP_RE = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+_INLINE_RE = re.compile(r"\*\*(.+?)\*\*|__(.+?)__|`([^`]+)`|\*(?!\s)(.+?)\*|(?<!\w)_(?!\s)(.+?)_(?!\w)")
+
+
+def _split_row(line: str) -> List[str]:
+    cells = line.strip()
+    if cells.startswith("|"):
+        cells = cells[1:]
+    if cells.endswith("|"):
+        cells = cells[:-1]
+    return [cell.strip() for cell in cells.split("|")]
+
+
+def inline_spans(text: str) -> List[Tuple[str, bool, bool, bool]]:
+    """Split inline markdown into ``(text, bold, italic, code)`` runs."""
+    spans: List[Tuple[str, bool, bool, bool]] = []
+    pos = 0
+    for match in _INLINE_RE.finditer(text):
+        if match.start() > pos:
+            spans.append((text[pos:match.start()], False, False, False))
+        bold, bold_alt, code, italic, italic_alt = match.groups()
+        if code is not None:
+            spans.append((code, False, False, True))
+        elif bold is not None or bold_alt is not None:
+            spans.append((bold or bold_alt, True, False, False))
+        else:
+            spans.append((italic or italic_alt, False, True, False))
+        pos = match.end()
+    if pos < len(text):
+        spans.append((text[pos:], False, False, False))
+    return spans
+
+
+class MarkdownBlockParser:
+    def __init__(self) -> None:
+        self._partial = ""
+        self._paragraph: List[str] = []
+        self._table: List[List[str]] = []
+        self._code: Optional[Tuple[str, List[str]]] = None
+
+    def feed(self, text: str) -> List[Block]:
+        """Consume a text delta; return the blocks it completed."""
+        blocks: List[Block] = []
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._line(line.rstrip("\r"), blocks)
+        return blocks
+
+    def close(self) -> List[Block]:
+        """Flush the trailing partial line and any open block."""
+        blocks: List[Block] = []
+        if self._partial:
+            self._line(self._partial, blocks)
+            self._partial = ""
+        if self._code is not None:
+            language, code_lines = self._code
+            blocks.append(CodeBlock("\n".join(code_lines), language))
+            self._code = None
+        self._flush(blocks)
+        return blocks
+
+    def _flush(self, blocks: List[Block]) -> None:
+        if self._paragraph:
+            blocks.append(Paragraph(" ".join(self._paragraph)))
+            self._paragraph = []
+        if self._table:
+            blocks.append(Table(self._table))
+            self._table = []
+
+    def _line(self, line: str, blocks: List[Block]) -> None:
+        stripped = line.strip()
+
+        if self._code is not None:
+            if stripped.startswith("```"):
+                language, code_lines = self._code
+                blocks.append(CodeBlock("\n".join(code_lines), language))
+                self._code = None
+            else:
+                self._code[1].append(line)
+            return
+
+        if stripped.startswith("```"):
+            self._flush(blocks)
+            self._code = (stripped[3:].strip(), [])
+            return
+
+        if stripped.startswith("|"):
+            if self._paragraph:
+                self._flush(blocks)
+            if not _TABLE_SEP_RE.match(stripped):
+                self._table.append(_split_row(stripped))
+            return
+
+        if self._table:
+            self._flush(blocks)
+
+        if not stripped:
+            self._flush(blocks)
+            return
+
+        heading = _HEADING_RE.match(stripped)
+        if heading:
+            self._flush(blocks)
+            blocks.append(Heading(len(heading.group(1)), heading.group(2)))
+            return
+
+        if _RULE_RE.match(stripped):
+            self._flush(blocks)
+            return
+
+        item = _LIST_RE.match(line)
+        if item:
+            self._flush(blocks)
+            indent = len(item.group(1).expandtabs(4))
+            blocks.append(ListItem(item.group(3).strip(), level=indent // 2, ordered=item.group(2)[0].isdigit()))
+            return
+
+        if stripped.startswith(">"):
+            self._flush(blocks)
+            blocks.append(Quote(stripped.lstrip(">").strip()))
+            return
+
+        self._paragraph.append(stripped)
+
+
+def parse_markdown(text: str) -> List[Block]:
+    parser = MarkdownBlockParser()
+    return parser.feed(text) + parser.close()
@@ -0,0 +1,20 @@
+"""Process memory gauges."""
+
+import os
+from typing import Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None if it can't be read."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
@@ -0,0 +1,69 @@
+"""
+Prometheus metrics, exported by GET /metrics.
+
+Needs ``prometheus_client``; without it (or with METRICS_ENABLED off) the
+metrics below are no-ops and /metrics answers 501. Celery prefork workers
+are separate processes: set PROMETHEUS_MULTIPROC_DIR to a directory shared
+by the API and the workers on a node and /metrics reports all of them.
+"""
+
+import os
+from typing import Any, Optional, Tuple
+
+from ..config import settings
+
+try:
+    import prometheus_client
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+# Seconds; job stages range from a cache lookup to a long LLM stream.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+
+class _NullMetric:
+    def labels(self, *args: Any, **kwargs: Any) -> "_NullMetric":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+
+ENABLED = prometheus_client is not None and settings.METRICS_ENABLED
+
+
+def _histogram(name: str, doc: str, labels: Tuple[str, ...]) -> Any:
+    return Histogram(name, doc, labels, buckets=LATENCY_BUCKETS) if ENABLED else _NullMetric()
+
+
+def _counter(name: str, doc: str, labels: Tuple[str, ...]) -> Any:
+    return Counter(name, doc, labels) if ENABLED else _NullMetric()
+
+
+STAGE_SECONDS = _histogram("chatpwc_stage_seconds", "Duration of job stages", ("stage",))
+JOB_SECONDS = _histogram("chatpwc_job_seconds", "Job latency from creation to a final status", ("status",))
+JOBS = _counter("chatpwc_jobs", "Jobs that reached a final status", ("status",))
+LLM_SECONDS = _histogram("chatpwc_llm_request_seconds", "LLM request duration", ("provider", "model", "kind"))
+LLM_TTFT_SECONDS = _histogram("chatpwc_llm_ttft_seconds", "Time to first streamed token", ("provider", "model"))
+LLM_TOKENS = _counter("chatpwc_llm_tokens", "LLM tokens by type", ("provider", "model", "type"))
+LLM_RETRIES = _counter("chatpwc_llm_retries", "Retried LLM requests", ("provider", "model", "reason"))
+LLM_HEDGES = _counter("chatpwc_llm_hedges", "Hedged LLM requests", ("provider", "model"))
+LLM_FAILOVERS = _counter("chatpwc_llm_failovers", "Failovers to another model", ("provider", "model"))
+RESULT_CACHE_LOOKUPS = _counter("chatpwc_result_cache_lookups", "Result cache lookups", ("result",))
+
+
+def render() -> Optional[Tuple[bytes, str]]:
+    """Exposition body and content type, or None when metrics are off."""
+    if not ENABLED:
+        return None
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
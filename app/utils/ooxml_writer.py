@@ -0,0 +1,116 @@
+"""
+Direct OOXML writer for large TS documents.
+
+Renders markdown blocks straight to WordprocessingML strings and writes the
+package by copying the cached template parts unchanged, replacing only
+``word/document.xml``. No python-docx objects are created, so cost is
+linear in output size and a few times lower than the object model.
+"""
+
+import re
+import zipfile
+from pathlib import Path
+from typing import Iterable, List, Optional
+from xml.sax.saxutils import escape
+
+from .docx_template import DOCUMENT_PART, DocxTemplate
+from .markdown_blocks import Block, CodeBlock, Heading, ListItem, Paragraph, Quote, Table, inline_spans
+
+
+# Characters that are not allowed in XML 1.0 documents.
+_INVALID_XML_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_CODE_FONT = "Consolas"
+_CODE_SIZE = 18  # half-points
+_TABLE_WIDTH = 8640  # twips; text width of a Letter/A4 page with default margins
+_MAX_LIST_LEVEL = 3
+
+
+def _text(value: str) -> str:
+    return escape(_INVALID_XML_RE.sub("", value))
+
+
+def _run(text: str, bold: bool = False, italic: bool = False, code: bool = False, size: Optional[int] = None) -> str:
+    props = ""
+    if code:
+        props += f'<w:rFonts w:ascii="{_CODE_FONT}" w:hAnsi="{_CODE_FONT}" w:cs="{_CODE_FONT}"/>'
+    if bold:
+        props += "<w:b/>"
+    if italic:
+        props += "<w:i/>"
+    if size:
+        props += f'<w:sz w:val="{size}"/>'
+    rpr = f"<w:rPr>{props}</w:rPr>" if props else ""
+    return f'<w:r>{rpr}<w:t xml:space="preserve">{_text(text)}</w:t></w:r>'
+
+
+def _inline(text: str, bold: bool = False) -> str:
+    return "".join(_run(span, bold=b or bold, italic=i, code=c) for span, b, i, c in inline_spans(text))
+
+
+class OoxmlDocxWriter:
+    """Accumulates body XML for ``blocks`` and writes a DOCX from the template."""
+
+    def __init__(self, template: DocxTemplate) -> None:
+        self.template = template
+        self._body: List[str] = []
+
+    def _paragraph(self, content: str, style: Optional[str] = None) -> str:
+        style_id = self.template.style_id(style) if style else None
+        ppr = f'<w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>' if style_id else ""
+        return f"<w:p>{ppr}{content}</w:p>"
+
+    def _table(self, rows: List[List[str]]) -> str:
+        columns = max(len(row) for row in rows)
+        width = _TABLE_WIDTH // columns
+        style_id = self.template.style_id("Table Grid")
+        tbl_style = f'<w:tblStyle w:val="{style_id}"/>' if style_id else ""
+        parts = [
+            f'<w:tbl><w:tblPr>{tbl_style}<w:tblW w:w="0" w:type="auto"/><w:tblLook w:val="04A0"/></w:tblPr>',
+            "<w:tblGrid>" + f'<w:gridCol w:w="{width}"/>' * columns + "</w:tblGrid>",
+        ]
+        for r, row in enumerate(rows):
+            cells = row + [""] * (columns - len(row))
+            parts.append("<w:tr>")
+            for value in cells:
+                parts.append(
+                    f'<w:tc><w:tcPr><w:tcW w:w="{width}" w:type="dxa"/></w:tcPr>'
+                    f"{self._paragraph(_inline(value, bold=r == 0))}</w:tc>"
+                )
+            parts.append("</w:tr>")
+        parts.append("</w:tbl>")
+        return "".join(parts)
+
+    def _block(self, block: Block) -> str:
+        if isinstance(block, Heading):
+            return self._paragraph(_inline(block.text), f"Heading {min(block.level, 9)}")
+        if isinstance(block, Paragraph):
+            return self._paragraph(_inline(block.text))
+        if isinstance(block, ListItem):
+            level = min(block.level, _MAX_LIST_LEVEL - 1)
+            style = "List Number" if block.ordered else "List Bullet"
+            if level:
+                style = f"{style} {level + 1}"
+            return self._paragraph(_inline(block.text), style)
+        if isinstance(block, Table):
+            return self._table(block.rows)
+        if isinstance(block, CodeBlock):
+            runs = "<w:r><w:br/></w:r>".join(
+                _run(line, code=True, size=_CODE_SIZE) for line in block.code.split("\n")
+            )
+            return self._paragraph(runs)
+        if isinstance(block, Quote):
+            return self._paragraph(_inline(block.text), "Quote")
+        return ""
+
+    def add(self, blocks: Iterable[Block]) -> None:
+        self._body.extend(self._block(block) for block in blocks)
+
+    def save(self, output_path: Path) -> None:
+        document = self.template.body_head + "".join(self._body) + self.template.body_tail
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+            for name, data in self.template.parts:
+                if name == DOCUMENT_PART:
+                    archive.writestr(name, document.encode("utf-8"))
+                else:
+                    archive.writestr(name, data)
@@ -0,0 +1,103 @@
+"""
+Opt-in profiling of single jobs (``profile=true`` with JOB_PROFILING_ENABLED).
+
+``profile_job(job_id)`` runs cProfile and tracemalloc around the job and
+writes two files to JOB_PROFILE_DIR: ``{job_id}.prof`` (pstats, for
+snakeviz / ``python -m pstats``) and ``{job_id}.txt`` (top functions by
+cumulative time and top allocation sites), served by GET /jobs/{id}/profile.
+
+Both profilers are per process, so one job is profiled at a time; a job
+asking while another is profiled runs without. cProfile sees the event
+loop thread, which includes other jobs interleaved on it (in-process
+executor); work in executor threads (DOCX rendering) is not in the
+cProfile output but its allocations are in the tracemalloc report.
+"""
+
+import cProfile
+import io
+import pstats
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+from ..config import settings
+from .docx_generator import GENERATED_DIR
+from .logger import logger
+
+PROFILE_DIR = Path(settings.JOB_PROFILE_DIR) if settings.JOB_PROFILE_DIR else GENERATED_DIR.parent / ".job_profiles"
+
+_active = threading.Lock()
+
+
+@dataclass
+class JobProfile:
+    pstats_path: Optional[Path] = None
+    report_path: Optional[Path] = None
+
+    def as_dict(self) -> dict:
+        return {"pstats": str(self.pstats_path), "report": str(self.report_path)}
+
+
+@contextmanager
+def profile_job(job_id: str) -> Iterator[JobProfile]:
+    """
+    Profile the block. The yielded ``JobProfile`` has its paths set once the
+    block exits, and stays empty if another job holds the profiler.
+    """
+    profile = JobProfile()
+    if not _active.acquire(blocking=False):
+        logger.warning(f"[Profiling] Job {job_id} not profiled: another job is being profiled")
+        yield profile
+        return
+
+    started_tracemalloc = not tracemalloc.is_tracing()
+    try:
+        if started_tracemalloc:
+            tracemalloc.start(settings.JOB_PROFILE_TRACEMALLOC_FRAMES)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield profile
+        finally:
+            profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracemalloc:
+                tracemalloc.stop()
+            try:
+                _write(job_id, profiler, snapshot, current, peak, profile)
+            except OSError as exc:
+                logger.warning(f"[Profiling] Could not write profile of job {job_id}: {exc}")
+    finally:
+        _active.release()
+
+
+def _write(
+    job_id: str,
+    profiler: cProfile.Profile,
+    snapshot: tracemalloc.Snapshot,
+    current: int,
+    peak: int,
+    profile: JobProfile,
+) -> None:
+    pstats_path, report_path = PROFILE_DIR / f"{job_id}.prof", PROFILE_DIR / f"{job_id}.txt"
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(str(pstats_path))
+
+    report = io.StringIO()
+    report.write(f"Job {job_id}\n\n== CPU: top {settings.JOB_PROFILE_TOP} by cumulative time ==\n")
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(settings.JOB_PROFILE_TOP)
+    report.write(
+        f"\n== Memory: traced {current / 1024:.1f} KiB at the end, peak {peak / 1024:.1f} KiB; "
+        f"top {settings.JOB_PROFILE_TOP} allocation sites still held ==\n"
+    )
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    for stat in snapshot.statistics("traceback")[: settings.JOB_PROFILE_TOP]:
+        report.write(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+        report.writelines(f"    {line}\n" for line in stat.traceback.format())
+    report_path.write_text(report.getvalue(), encoding="utf-8")
+
+    profile.pstats_path, profile.report_path = pstats_path, report_path
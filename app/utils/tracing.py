@@ -0,0 +1,121 @@
+"""
+Timing spans for jobs.
+
+``span(name)`` times a block. The duration always goes to the
+``chatpwc_stage_seconds`` histogram; inside ``track_spans()`` (the job
+runner) it is also added to the job's trace, which is stored in the job's
+metadata. With OTEL_ENABLED and the OpenTelemetry SDK installed every span
+is exported too, as a child of the job's span.
+
+The trace lives in a context variable, so spans from parallel tasks of the
+same job (unit calls, hedged requests) land in the same trace. Code run in
+executor threads does not inherit it and only feeds the histogram.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..config import settings
+from .logger import logger
+from .metrics import STAGE_SECONDS
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+_tracer: Optional[Any] = None
+
+
+@dataclass(slots=True)
+class SpanRecord:
+    name: str
+    start: float  # seconds since the trace started
+    seconds: float
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+
+class Trace:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.spans: List[SpanRecord] = []
+
+    def as_list(self) -> List[Dict[str, Any]]:
+        return [
+            {"name": s.name, "start_ms": round(s.start * 1000, 1), "ms": round(s.seconds * 1000, 1), **s.attrs}
+            for s in self.spans
+        ]
+
+
+_CURRENT: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("job_trace", default=None)
+
+
+def setup_tracing() -> None:
+    """Install the OTLP exporter (once per process; call after forking)."""
+    global _tracer
+    if not settings.OTEL_ENABLED or _tracer is not None:
+        return
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("OTEL_ENABLED is set but opentelemetry-sdk / the OTLP exporter is not installed")
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.OTEL_SERVICE_NAME}))
+    exporter = OTLPSpanExporter(endpoint=settings.OTEL_EXPORTER_OTLP_ENDPOINT) if settings.OTEL_EXPORTER_OTLP_ENDPOINT else OTLPSpanExporter()
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    otel_trace.set_tracer_provider(provider)
+    _tracer = otel_trace.get_tracer("chatpwc")
+
+
+@contextmanager
+def track_spans(name: str = "job", **attrs: Any) -> Iterator[Trace]:
+    """Collect the spans of everything run inside the block."""
+    trace = Trace()
+    token = _CURRENT.set(trace)
+    try:
+        if _tracer is None:
+            yield trace
+        else:
+            with _tracer.start_as_current_span(name, attributes=attrs):
+                yield trace
+    finally:
+        _CURRENT.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    """Time the block as stage ``name``."""
+    # Not made the current OTel span: this may wrap an async generator
+    # body, which runs in its consumer's context.
+    otel_span = _tracer.start_span(name, attributes=attrs) if _tracer is not None else None
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - began
+        _record(name, began, seconds, attrs)
+        if otel_span is not None:
+            otel_span.end()
+
+
+def record_span(name: str, seconds: float, **attrs: Any) -> None:
+    """Record a stage measured elsewhere (queue wait, time to first token)."""
+    ended = time.perf_counter()
+    _record(name, ended - seconds, seconds, attrs)
+    if _tracer is not None:
+        end_ns = time.time_ns()
+        otel_span = _tracer.start_span(name, attributes=attrs, start_time=end_ns - int(seconds * 1e9))
+        otel_span.end(end_time=end_ns)
+
+
+def _record(name: str, began: float, seconds: float, attrs: Dict[str, Any]) -> None:
+    STAGE_SECONDS.labels(name).observe(seconds)
+    trace = _CURRENT.get()
+    if trace is not None:
+        trace.spans.append(SpanRecord(name, max(began - trace.started, 0.0), seconds, attrs))
@@ -0,0 +1,114 @@
+"""
+Store contention benchmark: concurrent job updates vs. concurrent readers.
+
+Writer tasks run a stream of short jobs on the event loop (create, 20
+updates with log lines and metadata, complete), while watcher threads poll
+each writer's current job the way status/log pollers do (``read_logs``
+from their last offset plus ``get_job``). For each watcher count the write throughput and latency are
+reported; with per-job write locks and lock-free reads they should stay
+roughly flat as the number of watchers grows.
+
+    python -m benchmarks.bench_store_contention --backend sqlite --watchers 0 16 64 256
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from app.storage.memory_store import MemoryStore
+from app.storage.backends.memory import InMemoryBackend
+from app.storage.backends.sqlite_backend import SQLiteBackend
+
+UPDATES_PER_JOB = 20
+
+
+def make_store(backend: str, tmp: Path) -> MemoryStore:
+    if backend == "memory":
+        return MemoryStore(InMemoryBackend(max_jobs=1_000_000, spill_dir=None))
+    return MemoryStore(SQLiteBackend(str(tmp / "bench.sqlite3")))
+
+
+def watch(store: MemoryStore, current: List[str], slot: int, stop: threading.Event, interval: float, reads: List[int]) -> None:
+    job_id, offset, count = None, 0, 0
+    while not stop.is_set():
+        if current[slot] != job_id:
+            job_id, offset = current[slot], 0
+        offset += len(store.read_logs(job_id, offset))
+        store.get_job(job_id)
+        count += 1
+        time.sleep(interval)
+    reads.append(count)
+
+
+async def write(store: MemoryStore, chat_id: str, current: List[str], slot: int, deadline: float, latencies: List[float]) -> None:
+    while time.perf_counter() < deadline:
+        job_id = current[slot]
+        for i in range(UPDATES_PER_JOB):
+            start = time.perf_counter()
+            if i % 5 == 0:
+                await store.update_job(job_id, status="running", metadata={"step": i}, log=f"step {i}")
+            else:
+                await store.update_job(job_id, log=f"line {i}")
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0)  # let other writers interleave
+        await store.update_job(job_id, status="completed", result_message="done", log="Job completed")
+        current[slot] = (await store.create_job(chat_id, "REPORT zbench.")).id
+
+
+async def run(args: argparse.Namespace, watchers: int, tmp: Path) -> Tuple[float, float, float, float]:
+    store = make_store(args.backend, tmp / f"w{watchers}")
+    chat = await store.create_chat("bench", "openai", "bench", "ts_fs_agent")
+    current = [(await store.create_job(chat.id, "REPORT zbench.")).id for _ in range(args.writers)]
+
+    stop = threading.Event()
+    reads: List[int] = []
+    threads = [
+        threading.Thread(target=watch, args=(store, current, i % args.writers, stop, args.poll_interval, reads), daemon=True)
+        for i in range(watchers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    latencies: List[float] = []
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*(write(store, chat.id, current, w, deadline, latencies) for w in range(args.writers)))
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+    return (
+        len(latencies) / args.duration,
+        statistics.median(latencies) * 1000 if latencies else 0.0,
+        p99 * 1000,
+        sum(reads) / args.duration,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--watchers", type=int, nargs="+", default=[0, 16, 64, 256])
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    args = parser.parse_args()
+
+    print(f"backend={args.backend} writers={args.writers} poll_interval={args.poll_interval}s")
+    print(f"{'watchers':>8} {'writes/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'reads/s':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for watchers in args.watchers:
+            (Path(tmp) / f"w{watchers}").mkdir()
+            writes, p50, p99, reads = asyncio.run(run(args, watchers, Path(tmp)))
+            print(f"{watchers:>8} {writes:>10.0f} {p50:>8.3f} {p99:>8.3f} {reads:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
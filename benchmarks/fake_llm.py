@@ -0,0 +1,486 @@
+"""
+Fake OpenAI / Anthropic API for load tests.
+
+Serves ``POST /v1/chat/completions`` and ``POST /v1/messages``, both plain
+and streamed (SSE, with usage), closely enough for the official SDKs. Each
+request waits a time to first token drawn from a lognormal distribution,
+then produces ``--output-tokens`` tokens of markdown TS at
+``--tokens-per-sec``. A share of requests (``--error-rate``) fails with one
+of ``--error-statuses``: 429/529 with a retry-after header, or 500.
+
+The batch APIs used by offline mode are served too: OpenAI ``/v1/files`` +
+``/v1/batches`` and Anthropic ``/v1/messages/batches``. A batch ends
+``--batch-delay`` seconds after it was created; failed requests (same
+``--error-rate``) show up in the error file / as ``errored`` results.
+
+    python -m benchmarks.fake_llm --port 8900 --latency-ms 800 --tokens-per-sec 60
+
+Point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:8900/v1 and
+ANTHROPIC_BASE_URL=http://127.0.0.1:8900 (any API key).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+_WORDS = (
+    "the program reads material master data from MARA and MARC, validates plant and "
+    "storage location, builds an internal table of open items, calls BAPI_GOODSMVT_CREATE "
+    "for each item and writes an application log entry per document"
+).split()
+_SECTIONS = (
+    "Introduction", "Business Requirement Overview", "Solution Overview", "SAP Objects",
+    "Data Model", "Processing Logic", "Error Handling", "Performance & Security",
+)
+
+
+@dataclass
+class FakeLLMConfig:
+    latency_ms: float = 500.0  # median time to first token
+    latency_sigma: float = 0.5  # lognormal spread; 0 = always latency_ms
+    tokens_per_sec: float = 100.0  # streaming speed
+    output_tokens: int = 400
+    error_rate: float = 0.0
+    error_statuses: Tuple[int, ...] = (429, 500)
+    retry_after: float = 0.2  # seconds, sent with 429/529
+    chunk_interval: float = 0.05  # seconds between stream chunks
+    batch_delay: float = 2.0  # seconds until a submitted batch has ended
+    seed: Optional[int] = None
+
+
+@dataclass
+class FakeLLMStats:
+    requests: int = 0
+    streamed: int = 0
+    batched: int = 0  # requests submitted through the batch APIs
+    errors: Dict[int, int] = field(default_factory=dict)
+    output_tokens: int = 0
+
+
+def _tokens(count: int, rng: random.Random) -> List[str]:
+    """``count`` word tokens of TS-shaped markdown (headings, paragraphs, bullets)."""
+    tokens: List[str] = []
+    per_section = max(count // len(_SECTIONS), 1)
+    for section in _SECTIONS:
+        tokens.append(f"## {section}\n")
+        for i in range(per_section - 1):
+            word = rng.choice(_WORDS)
+            if i % 40 == 39:  # end of paragraph
+                tokens.append(f"{word}.\n\n")
+            elif i % 40 in (30, 33, 36):  # a few bullets per paragraph
+                tokens.append(f"\n- {word}")
+            else:
+                tokens.append(f" {word}")
+        tokens.append("\n\n")
+        if len(tokens) >= count:
+            break
+    return tokens[:count]
+
+
+class FakeLLM:
+    def __init__(self, config: FakeLLMConfig) -> None:
+        self.config = config
+        self.stats = FakeLLMStats()
+        self._rng = random.Random(config.seed)
+        self._files: Dict[str, bytes] = {}
+        self._batches: Dict[str, Dict[str, Any]] = {}
+
+    # -----------------------
+    # Behaviour
+    # -----------------------
+
+    def _first_token_delay(self) -> float:
+        median = self.config.latency_ms / 1000.0
+        if self.config.latency_sigma <= 0:
+            return median
+        return median * math.exp(self._rng.gauss(0.0, self.config.latency_sigma))
+
+    def _error(self) -> Optional[int]:
+        if self.config.error_rate > 0 and self._rng.random() < self.config.error_rate:
+            return self._rng.choice(self.config.error_statuses)
+        return None
+
+    async def _chunks(self, tokens: List[str]) -> AsyncIterator[str]:
+        """Group tokens into chunks paced at tokens_per_sec."""
+        per_chunk = max(1, round(self.config.tokens_per_sec * self.config.chunk_interval))
+        interval = per_chunk / self.config.tokens_per_sec
+        started = time.perf_counter()
+        for i in range(0, len(tokens), per_chunk):
+            delay = started + (i // per_chunk) * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield "".join(tokens[i:i + per_chunk])
+
+    @staticmethod
+    def _input_tokens(texts: List[str]) -> int:
+        return sum(len(t) for t in texts) // 4
+
+    def _openai_usage(self, body: Dict[str, Any], tokens: List[str]) -> Dict[str, int]:
+        usage = {
+            "prompt_tokens": self._input_tokens([m.get("content") or "" for m in body.get("messages", [])]),
+            "completion_tokens": len(tokens),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        return usage
+
+    def _anthropic_usage(self, body: Dict[str, Any], tokens: List[str]) -> Dict[str, int]:
+        texts = [body.get("system") if isinstance(body.get("system"), str) else json.dumps(body.get("system") or "")]
+        texts += [m["content"] if isinstance(m["content"], str) else json.dumps(m["content"]) for m in body.get("messages", [])]
+        return {
+            "input_tokens": self._input_tokens(texts),
+            "output_tokens": len(tokens),
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+        }
+
+    @staticmethod
+    def _openai_completion(model: str, tokens: List[str], usage: Dict[str, int]) -> Dict[str, Any]:
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    @staticmethod
+    def _anthropic_message(model: str) -> Dict[str, Any]:
+        return {
+            "id": f"msg_{uuid.uuid4().hex[:12]}", "type": "message", "role": "assistant", "model": model,
+            "content": [], "stop_reason": None, "stop_sequence": None,
+        }
+
+    @staticmethod
+    def _error_body(status: int, anthropic: bool) -> Dict[str, Any]:
+        kind = {429: "rate_limit_error", 529: "overloaded_error"}.get(status, "api_error")
+        if anthropic:
+            return {"type": "error", "error": {"type": kind, "message": "fake error"}}
+        return {"error": {"message": "fake error", "type": kind, "code": None, "param": None}}
+
+    def _error_response(self, status: int, anthropic: bool) -> Response:
+        self.stats.errors[status] = self.stats.errors.get(status, 0) + 1
+        headers = {"retry-after-ms": str(int(self.config.retry_after * 1000))} if status in (429, 529) else {}
+        return JSONResponse(self._error_body(status, anthropic), status_code=status, headers=headers)
+
+    # -----------------------
+    # OpenAI Chat Completions
+    # -----------------------
+
+    async def openai_chat(self, request: Request) -> Response:
+        body = await request.json()
+        self.stats.requests += 1
+        await asyncio.sleep(self._first_token_delay())
+        status = self._error()
+        if status is not None:
+            return self._error_response(status, anthropic=False)
+
+        model = body.get("model", "fake")
+        tokens = _tokens(self.config.output_tokens, self._rng)
+        self.stats.output_tokens += len(tokens)
+        usage = self._openai_usage(body, tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        if not body.get("stream"):
+            await asyncio.sleep(len(tokens) / self.config.tokens_per_sec)
+            return JSONResponse(self._openai_completion(model, tokens, usage))
+
+        self.stats.streamed += 1
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        async def events() -> AsyncIterator[str]:
+            base = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+            async for text in self._chunks(tokens):
+                chunk = {**base, "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})}\n\n"
+            if include_usage:
+                yield f"data: {json.dumps({**base, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # -----------------------
+    # Anthropic Messages
+    # -----------------------
+
+    async def anthropic_messages(self, request: Request) -> Response:
+        body = await request.json()
+        self.stats.requests += 1
+        await asyncio.sleep(self._first_token_delay())
+        status = self._error()
+        if status is not None:
+            return self._error_response(status, anthropic=True)
+
+        model = body.get("model", "fake")
+        tokens = _tokens(self.config.output_tokens, self._rng)
+        self.stats.output_tokens += len(tokens)
+        usage = self._anthropic_usage(body, tokens)
+        message = self._anthropic_message(model)
+
+        if not body.get("stream"):
+            await asyncio.sleep(len(tokens) / self.config.tokens_per_sec)
+            message.update(content=[{"type": "text", "text": "".join(tokens)}], stop_reason="end_turn", usage=usage)
+            return JSONResponse(message)
+
+        self.stats.streamed += 1
+
+        def event(name: str, data: Dict[str, Any]) -> str:
+            return f"event: {name}\ndata: {json.dumps({'type': name, **data})}\n\n"
+
+        async def events() -> AsyncIterator[str]:
+            yield event("message_start", {"message": {**message, "usage": {**usage, "output_tokens": 1}}})
+            yield event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+            async for text in self._chunks(tokens):
+                yield event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": text}})
+            yield event("content_block_stop", {"index": 0})
+            yield event("message_delta", {
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": len(tokens)},
+            })
+            yield event("message_stop", {})
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # -----------------------
+    # Batch APIs
+    # -----------------------
+
+    def _new_batch(self, kind: str, requests: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """Record a batch of (custom_id, request body); it ends after batch_delay."""
+        self.stats.batched += len(requests)
+        return {"kind": kind, "created": time.time(), "requests": requests, "results": None}
+
+    def _batch_results(self, batch: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Result rows once the batch has ended (built on first access), else None."""
+        if time.time() < batch["created"] + self.config.batch_delay:
+            return None
+        if batch["results"] is None:
+            anthropic = batch["kind"] == "anthropic"
+            rows = []
+            for custom_id, body in batch["requests"]:
+                status = self._error()
+                if status is not None:
+                    self.stats.errors[status] = self.stats.errors.get(status, 0) + 1
+                    rows.append({"custom_id": custom_id, "status": status, "body": self._error_body(status, anthropic)})
+                    continue
+                model = body.get("model", "fake")
+                tokens = _tokens(self.config.output_tokens, self._rng)
+                self.stats.output_tokens += len(tokens)
+                if anthropic:
+                    message = self._anthropic_message(model)
+                    message.update(
+                        content=[{"type": "text", "text": "".join(tokens)}], stop_reason="end_turn",
+                        usage=self._anthropic_usage(body, tokens),
+                    )
+                    rows.append({"custom_id": custom_id, "status": 200, "body": message})
+                else:
+                    rows.append({
+                        "custom_id": custom_id, "status": 200,
+                        "body": self._openai_completion(model, tokens, self._openai_usage(body, tokens)),
+                    })
+            batch["results"] = rows
+        return batch["results"]
+
+    async def openai_file_upload(self, request: Request) -> Response:
+        form = await request.form()
+        upload = form["file"]
+        content = await upload.read()
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        self._files[file_id] = content
+        return JSONResponse(self._openai_file(file_id, upload.filename or "upload", str(form.get("purpose", "batch"))))
+
+    @staticmethod
+    def _openai_file(file_id: str, filename: str, purpose: str, size: int = 0) -> Dict[str, Any]:
+        return {
+            "id": file_id, "object": "file", "bytes": size, "created_at": int(time.time()),
+            "filename": filename, "purpose": purpose, "status": "processed",
+        }
+
+    async def openai_file_content(self, request: Request) -> Response:
+        content = self._files.get(request.path_params["file_id"])
+        if content is None:
+            return JSONResponse(self._error_body(404, anthropic=False), status_code=404)
+        return Response(content, media_type="application/octet-stream")
+
+    async def openai_batch_create(self, request: Request) -> Response:
+        body = await request.json()
+        content = self._files.get(body.get("input_file_id", ""))
+        if content is None:
+            return JSONResponse(self._error_body(404, anthropic=False), status_code=404)
+        rows = [json.loads(line) for line in content.decode("utf-8").splitlines() if line.strip()]
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        batch = self._new_batch("openai", [(row["custom_id"], row["body"]) for row in rows])
+        batch.update(input_file_id=body["input_file_id"], endpoint=body.get("endpoint"), window=body.get("completion_window"))
+        self._batches[batch_id] = batch
+        return JSONResponse(self._openai_batch(batch_id, batch))
+
+    async def openai_batch_retrieve(self, request: Request) -> Response:
+        batch_id = request.path_params["batch_id"]
+        batch = self._batches.get(batch_id)
+        if batch is None or batch["kind"] != "openai":
+            return JSONResponse(self._error_body(404, anthropic=False), status_code=404)
+        return JSONResponse(self._openai_batch(batch_id, batch))
+
+    def _openai_batch(self, batch_id: str, batch: Dict[str, Any]) -> Dict[str, Any]:
+        rows = self._batch_results(batch)
+        data: Dict[str, Any] = {
+            "id": batch_id, "object": "batch", "endpoint": batch["endpoint"], "input_file_id": batch["input_file_id"],
+            "completion_window": batch["window"], "created_at": int(batch["created"]),
+            "status": "in_progress" if rows is None else "completed",
+            "request_counts": {"total": len(batch["requests"]), "completed": 0, "failed": 0},
+        }
+        if rows is None:
+            return data
+        # Output and error files are created once, like the real service.
+        if "output_file_id" not in batch:
+            for name, ok in (("output_file_id", True), ("error_file_id", False)):
+                lines = [
+                    json.dumps({
+                        "id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": row["custom_id"],
+                        "response": {"status_code": row["status"], "request_id": uuid.uuid4().hex, "body": row["body"]},
+                        "error": None,
+                    })
+                    for row in rows if (row["status"] == 200) == ok
+                ]
+                if lines:
+                    file_id = f"file-{uuid.uuid4().hex[:12]}"
+                    self._files[file_id] = ("\n".join(lines) + "\n").encode("utf-8")
+                    batch[name] = file_id
+                else:
+                    batch[name] = None
+        failed = sum(row["status"] != 200 for row in rows)
+        data.update(
+            output_file_id=batch["output_file_id"], error_file_id=batch["error_file_id"],
+            completed_at=int(batch["created"] + self.config.batch_delay),
+            request_counts={"total": len(rows), "completed": len(rows) - failed, "failed": failed},
+        )
+        return data
+
+    async def anthropic_batch_create(self, request: Request) -> Response:
+        body = await request.json()
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:12]}"
+        batch = self._new_batch("anthropic", [(r["custom_id"], r["params"]) for r in body.get("requests", [])])
+        self._batches[batch_id] = batch
+        return JSONResponse(self._anthropic_batch(batch_id, batch, request))
+
+    async def anthropic_batch_retrieve(self, request: Request) -> Response:
+        batch_id = request.path_params["batch_id"]
+        batch = self._batches.get(batch_id)
+        if batch is None or batch["kind"] != "anthropic":
+            return JSONResponse(self._error_body(404, anthropic=True), status_code=404)
+        return JSONResponse(self._anthropic_batch(batch_id, batch, request))
+
+    def _anthropic_batch(self, batch_id: str, batch: Dict[str, Any], request: Request) -> Dict[str, Any]:
+        def iso(ts: float) -> str:
+            return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+
+        rows = self._batch_results(batch)
+        counts = {"processing": len(batch["requests"]), "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        if rows is not None:
+            errored = sum(row["status"] != 200 for row in rows)
+            counts.update(processing=0, succeeded=len(rows) - errored, errored=errored)
+        return {
+            "id": batch_id, "type": "message_batch",
+            "processing_status": "in_progress" if rows is None else "ended",
+            "request_counts": counts,
+            "created_at": iso(batch["created"]), "expires_at": iso(batch["created"] + 86400),
+            "ended_at": None if rows is None else iso(batch["created"] + self.config.batch_delay),
+            "archived_at": None, "cancel_initiated_at": None,
+            "results_url": None if rows is None else str(request.url_for("anthropic_batch_results", batch_id=batch_id)),
+        }
+
+    async def anthropic_batch_results(self, request: Request) -> Response:
+        batch = self._batches.get(request.path_params["batch_id"])
+        rows = self._batch_results(batch) if batch is not None and batch["kind"] == "anthropic" else None
+        if rows is None:
+            return JSONResponse(self._error_body(404, anthropic=True), status_code=404)
+        lines = [
+            json.dumps({
+                "custom_id": row["custom_id"],
+                "result": (
+                    {"type": "succeeded", "message": row["body"]} if row["status"] == 200
+                    else {"type": "errored", "error": row["body"]}
+                ),
+            })
+            for row in rows
+        ]
+        return Response("\n".join(lines) + "\n", media_type="application/binary")
+
+    async def get_stats(self, request: Request) -> Response:
+        return JSONResponse({
+            "requests": self.stats.requests,
+            "streamed": self.stats.streamed,
+            "batched": self.stats.batched,
+            "errors": self.stats.errors,
+            "output_tokens": self.stats.output_tokens,
+        })
+
+
+def create_app(config: FakeLLMConfig) -> Starlette:
+    fake = FakeLLM(config)
+    app = Starlette(routes=[
+        Route("/v1/chat/completions", fake.openai_chat, methods=["POST"]),
+        Route("/v1/messages", fake.anthropic_messages, methods=["POST"]),
+        Route("/v1/files", fake.openai_file_upload, methods=["POST"]),
+        Route("/v1/files/{file_id}/content", fake.openai_file_content, methods=["GET"]),
+        Route("/v1/batches", fake.openai_batch_create, methods=["POST"]),
+        Route("/v1/batches/{batch_id}", fake.openai_batch_retrieve, methods=["GET"]),
+        Route("/v1/messages/batches", fake.anthropic_batch_create, methods=["POST"]),
+        Route("/v1/messages/batches/{batch_id}", fake.anthropic_batch_retrieve, methods=["GET"]),
+        Route(
+            "/v1/messages/batches/{batch_id}/results", fake.anthropic_batch_results,
+            methods=["GET"], name="anthropic_batch_results",
+        ),
+        Route("/stats", fake.get_stats, methods=["GET"]),
+    ])
+    app.state.fake = fake
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = FakeLLMConfig()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="median time to first token")
+    parser.add_argument("--latency-sigma", type=float, default=defaults.latency_sigma, help="lognormal sigma (0: fixed)")
+    parser.add_argument("--tokens-per-sec", type=float, default=defaults.tokens_per_sec)
+    parser.add_argument("--output-tokens", type=int, default=defaults.output_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--error-statuses", default="429,500", help="comma-separated HTTP statuses")
+    parser.add_argument("--batch-delay", type=float, default=defaults.batch_delay, help="seconds until a batch ends")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeLLMConfig:
+    return FakeLLMConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        tokens_per_sec=args.tokens_per_sec,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+        error_statuses=tuple(int(s) for s in args.error_statuses.split(",") if s),
+        batch_delay=args.batch_delay,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
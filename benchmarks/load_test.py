@@ -0,0 +1,320 @@
+"""
+End-to-end load test of the API against a fake LLM.
+
+Starts the fake OpenAI/Anthropic server (``benchmarks.fake_llm``) in this
+process and the FastAPI app as a uvicorn subprocess pointed at it
+(JOB_EXECUTOR=inprocess, memory storage, rate limits lifted). Virtual users
+then loop until ``--jobs`` jobs are done:
+
+    create chat -> submit job -> follow /jobs/{id}/events until the final
+    status -> download the DOCX
+
+Reported per step: p50/p95/p99/max latency, plus completed jobs/sec and
+errors. ``first_token`` is submit -> first streamed token through the whole
+stack; ``job`` is submit -> final status.
+
+    python -m benchmarks.load_test --jobs 200 --concurrency 50 --latency-ms 800 --tokens-per-sec 80
+    python -m benchmarks.load_test --json bench.json                  # save a run
+    python -m benchmarks.load_test --baseline bench.json --max-regression 0.2
+
+With ``--baseline`` the run fails (exit 1) when a step's p95 grows, or the
+throughput drops, by more than ``--max-regression``. ``--api-url`` drives an
+already running deployment instead (start ``python -m benchmarks.fake_llm``
+and set its OPENAI_BASE_URL / ANTHROPIC_BASE_URL yourself).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import uvicorn
+
+from .fake_llm import add_arguments, config_from_args, create_app
+
+STEPS = ("create_chat", "submit_job", "first_token", "job", "download_docx", "end_to_end")
+FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def abap_program(n: int, lines: int) -> str:
+    """A distinct program per job, so the result cache does not short-cut it."""
+    source = [f"REPORT zload_{n:06d}.", "TABLES: mara, marc.", f"DATA lv_total_{n} TYPE i."]
+    for i in range(lines):
+        source.append(
+            f"SELECT SINGLE matnr FROM mara INTO @DATA(lv_matnr_{i}) WHERE matnr = '{n:06d}{i:04d}'."
+        )
+        source.append(f"IF sy-subrc <> 0. MESSAGE e001(zload) WITH '{i}'. ENDIF.")
+    return "\n".join(source) + "\n"
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = {step: [] for step in STEPS}
+        self.errors: Dict[str, int] = {}
+        self.completed = 0
+        self.failed = 0
+
+    def add(self, step: str, seconds: float) -> None:
+        self.samples[step].append(seconds)
+
+    def fail(self, step: str, reason: str) -> None:
+        key = f"{step}: {reason}"
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+    def summary(self, wall: float) -> Dict[str, Any]:
+        return {
+            "steps": {
+                step: {
+                    "count": len(values),
+                    "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+                    "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+                    "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+                    "max_ms": round(max(values, default=0.0) * 1000, 1),
+                }
+                for step, values in self.samples.items()
+            },
+            "completed": self.completed,
+            "failed": self.failed,
+            "wall_seconds": round(wall, 2),
+            "jobs_per_sec": round(self.completed / wall, 2) if wall else 0.0,
+            "errors": self.errors,
+        }
+
+
+async def follow_events(client: httpx.AsyncClient, job_id: str, submitted: float, rec: Recorder) -> Optional[str]:
+    """Read the job's SSE stream until its final status; records first_token."""
+    event: Optional[str] = None
+    first_token = True
+    async with client.stream("GET", f"/jobs/{job_id}/events") as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                event = None
+            elif line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data = line[5:].strip()
+                if event == "token" and first_token:
+                    first_token = False
+                    rec.add("first_token", time.perf_counter() - submitted)
+                elif event is None and data.startswith("{"):
+                    status = json.loads(data).get("status")
+                    if status in FINAL_STATUSES:
+                        return status
+    return None
+
+
+async def run_job(client: httpx.AsyncClient, args: argparse.Namespace, n: int, rec: Recorder) -> None:
+    step = "create_chat"
+    started = time.perf_counter()
+    try:
+        response = await client.post("/chat", json={
+            "title": f"load {n}", "provider": args.provider, "model": args.model, "agent_id": args.agent,
+        })
+        response.raise_for_status()
+        chat_id = response.json()["chat_id"]
+        rec.add(step, time.perf_counter() - started)
+
+        step = "submit_job"
+        submitted = time.perf_counter()
+        response = await client.post(f"/jobs/{chat_id}", json={"prompt": abap_program(n, args.abap_lines)})
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+        rec.add(step, time.perf_counter() - submitted)
+
+        step = "job"
+        status = await asyncio.wait_for(follow_events(client, job_id, submitted, rec), args.job_timeout)
+        rec.add(step, time.perf_counter() - submitted)
+        if status != "completed":
+            rec.failed += 1
+            rec.fail(step, str(status))
+            return
+
+        step = "download_docx"
+        began = time.perf_counter()
+        response = await client.get(f"/jobs/{job_id}/docx", follow_redirects=True)  # S3: presigned URL
+        response.raise_for_status()
+        if not response.content.startswith(b"PK"):
+            raise ValueError("not a DOCX")
+        rec.add(step, time.perf_counter() - began)
+
+        rec.completed += 1
+        rec.add("end_to_end", time.perf_counter() - started)
+    except Exception as exc:
+        rec.failed += 1
+        rec.fail(step, exc.__class__.__name__)
+
+
+async def drive(api_url: str, args: argparse.Namespace, jobs: int, offset: int = 0) -> Dict[str, Any]:
+    rec = Recorder()
+    counter = iter(range(offset, offset + jobs))
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+
+    async with httpx.AsyncClient(base_url=api_url, limits=limits, timeout=args.job_timeout) as client:
+        async def user() -> None:
+            for n in counter:  # shared iterator: users take the next job number
+                await run_job(client, args, n, rec)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(min(args.concurrency, jobs))))
+        return rec.summary(time.perf_counter() - started)
+
+
+def api_env(args: argparse.Namespace, fake_url: str, tmp: Path) -> Dict[str, str]:
+    unlimited = {"rpm": 10**7, "tpm": 10**10, "concurrency": 1024, "max_concurrency": 4096}
+    env = {
+        **os.environ,
+        "JOB_EXECUTOR": "inprocess",
+        "STORAGE_BACKEND": "memory",
+        "EVENT_BUS_BACKEND": "memory",
+        "OPENAI_API_KEY": "fake",
+        "ANTHROPIC_API_KEY": "fake",
+        "OPENAI_BASE_URL": f"{fake_url}/v1",
+        "ANTHROPIC_BASE_URL": fake_url,
+        "LLM_RATE_LIMITS": json.dumps({"openai": unlimited, "claude": unlimited}),
+        "RESULT_CACHE_DIR": str(tmp / "result_cache"),
+        "MEMORY_SPILL_DIR": str(tmp / "memory_spill"),
+        "LLM_BATCH_STATE_PATH": str(tmp / "llm_batches.json"),
+    }
+    for item in args.api_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+
+async def wait_until_up(url: str, process: Optional[subprocess.Popen], timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"API process exited with {process.returncode}")
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"\n{'step':<15}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for step, s in result["steps"].items():
+        print(f"{step:<15}{s['count']:>7}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}")
+    print(
+        f"\ncompleted {result['completed']}, failed {result['failed']} in {result['wall_seconds']}s "
+        f"-> {result['jobs_per_sec']} jobs/s"
+    )
+    for error, count in sorted(result["errors"].items()):
+        print(f"  error {error}: {count}")
+    if "fake_llm" in result:
+        print(f"fake LLM: {result['fake_llm']}")
+
+
+def regressions(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    found = []
+    for step, s in result["steps"].items():
+        before = baseline.get("steps", {}).get(step, {}).get("p95_ms")
+        if before and s["count"] and s["p95_ms"] > before * (1 + tolerance):
+            found.append(f"{step} p95 {before} -> {s['p95_ms']} ms")
+    before = baseline.get("jobs_per_sec")
+    if before and result["jobs_per_sec"] < before * (1 - tolerance):
+        found.append(f"throughput {before} -> {result['jobs_per_sec']} jobs/s")
+    return found
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.api_url:
+        await wait_until_up(args.api_url, None)
+        if args.warmup:
+            await drive(args.api_url, args, args.warmup, offset=10**6)
+        return await drive(args.api_url, args, args.jobs)
+
+    fake_port, api_port = free_port(), free_port()
+    fake_url, api_url = f"http://127.0.0.1:{fake_port}", f"http://127.0.0.1:{api_port}"
+    fake_app = create_app(config_from_args(args))
+    fake_server = uvicorn.Server(uvicorn.Config(fake_app, host="127.0.0.1", port=fake_port, log_level="warning"))
+    fake_task = asyncio.create_task(fake_server.serve())
+
+    with tempfile.TemporaryDirectory(prefix="chatpwc-load-") as tmp:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(api_port),
+             "--log-level", "warning", "--no-access-log"],
+            env=api_env(args, fake_url, Path(tmp)),
+            cwd=Path(__file__).resolve().parents[1],
+            stdout=None if args.api_logs else subprocess.DEVNULL,
+            stderr=None if args.api_logs else subprocess.DEVNULL,
+        )
+        try:
+            await wait_until_up(api_url, process)
+            if args.warmup:
+                await drive(api_url, args, args.warmup, offset=10**6)
+            result = await drive(api_url, args, args.jobs)
+            stats = fake_app.state.fake.stats
+            result["fake_llm"] = {"requests": stats.requests, "errors": stats.errors}
+            return result
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            fake_server.should_exit = True
+            await fake_task
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users")
+    parser.add_argument("--warmup", type=int, default=5, help="jobs run (and not reported) first")
+    parser.add_argument("--provider", default="openai")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--agent", default="ts_fs_agent")
+    parser.add_argument("--abap-lines", type=int, default=40, help="statements per generated program")
+    parser.add_argument("--job-timeout", type=float, default=300.0)
+    parser.add_argument("--api-url", default=None, help="drive a running API instead of starting one")
+    parser.add_argument("--api-env", action="append", default=[], metavar="KEY=VALUE", help="extra API settings")
+    parser.add_argument("--api-logs", action="store_true", help="show the API process output")
+    parser.add_argument("--json", type=Path, default=None, help="write the results here")
+    parser.add_argument("--baseline", type=Path, default=None, help="results of an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+    result["config"] = {k: v for k, v in vars(args).items() if isinstance(v, (int, float, str, list)) and k != "baseline"}
+    print_report(result)
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        found = regressions(result, json.loads(args.baseline.read_text(encoding="utf-8")), args.max_regression)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+        print(f"No regression beyond {args.max_regression:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Micro-benchmarks for the CPU-bound hot paths of a job: RAG retrieval
+(``get_context_for_abap``, cold and memoised), prompt construction in
+``TSFSAgent`` (parsing, grouping, ``_single_messages``), ``create_ts_docx``
+on a ~50 page TS with both engines, and ``MemoryStore`` operations on the
+memory and SQLite backends.
+
+In the spirit of pytest-benchmark: warm-up rounds, then per-round timings
+reported as min / median / mean / stddev / ops per second. ``--json``
+saves the numbers; ``--baseline`` compares medians with an earlier run and
+exits 1 when one is more than ``--max-regression`` slower.
+
+    python -m benchmarks.microbench --rounds 20 rag docx
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+@dataclass
+class BenchResult:
+    name: str
+    rounds: int
+    min_ms: float
+    median_ms: float
+    mean_ms: float
+    stddev_ms: float
+    ops_per_sec: float
+
+
+def _result(name: str, samples: List[float]) -> BenchResult:
+    median = statistics.median(samples)
+    return BenchResult(
+        name=name,
+        rounds=len(samples),
+        min_ms=round(min(samples) * 1000, 3),
+        median_ms=round(median * 1000, 3),
+        mean_ms=round(statistics.fmean(samples) * 1000, 3),
+        stddev_ms=round(statistics.pstdev(samples) * 1000, 3),
+        ops_per_sec=round(1 / median, 1) if median else 0.0,
+    )
+
+
+def bench(
+    name: str,
+    fn: Callable[[], Any],
+    rounds: int,
+    warmup: int = 1,
+    setup: Optional[Callable[[], Any]] = None,
+) -> BenchResult:
+    """Time ``fn`` over ``rounds`` rounds; ``setup`` runs untimed before each."""
+    samples = []
+    for i in range(warmup + rounds):
+        if setup is not None:
+            setup()
+        began = time.perf_counter()
+        fn()
+        if i >= warmup:
+            samples.append(time.perf_counter() - began)
+    return _result(name, samples)
+
+
+def bench_async(name: str, fn: Callable[[], Awaitable[Any]], rounds: int, warmup: int = 1) -> BenchResult:
+    async def run() -> List[float]:
+        samples = []
+        for i in range(warmup + rounds):
+            began = time.perf_counter()
+            await fn()
+            if i >= warmup:
+                samples.append(time.perf_counter() - began)
+        return samples
+
+    return _result(name, asyncio.run(run()))
+
+
+def parser(description: Optional[str]) -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--rounds", type=int, default=20)
+    p.add_argument("--json", type=Path, default=None, help="write the results here")
+    p.add_argument("--baseline", type=Path, default=None, help="results of an earlier run to compare with")
+    p.add_argument("--max-regression", type=float, default=0.2)
+    return p
+
+
+def report(results: List[BenchResult], args: argparse.Namespace) -> None:
+    width = max(len(r.name) for r in results) + 2
+    print(f"{'benchmark':<{width}}{'rounds':>7}{'min ms':>11}{'median ms':>11}{'mean ms':>11}{'stddev':>9}{'ops/s':>10}")
+    for r in results:
+        print(
+            f"{r.name:<{width}}{r.rounds:>7}{r.min_ms:>11}{r.median_ms:>11}"
+            f"{r.mean_ms:>11}{r.stddev_ms:>9}{r.ops_per_sec:>10}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps([asdict(r) for r in results], indent=2), encoding="utf-8")
+    if args.baseline:
+        before: Dict[str, float] = {
+            r["name"]: r["median_ms"] for r in json.loads(args.baseline.read_text(encoding="utf-8"))
+        }
+        slower = [
+            f"{r.name}: {before[r.name]} -> {r.median_ms} ms"
+            for r in results
+            if r.name in before and r.median_ms > before[r.name] * (1 + args.max_regression)
+        ]
+        for line in slower:
+            print(f"REGRESSION {line}")
+        if slower:
+            sys.exit(1)
+
+
+# -----------------------
+# Inputs
+# -----------------------
+
+def sample_abap(forms: int = 30, statements: int = 25) -> str:
+    """A report with includes, selections, FORMs and a local class."""
+    lines = [
+        "REPORT zbench_goods_movement.",
+        "INCLUDE zbench_top.",
+        "TABLES: mara, marc, mard.",
+        "PARAMETERS: p_werks TYPE werks_d OBLIGATORY, p_lgort TYPE lgort_d.",
+        "SELECT-OPTIONS: s_matnr FOR mara-matnr.",
+        "",
+        "CLASS lcl_validator DEFINITION.",
+        "  PUBLIC SECTION.",
+        "    METHODS check_plant IMPORTING iv_werks TYPE werks_d RETURNING VALUE(rv_ok) TYPE abap_bool.",
+        "ENDCLASS.",
+        "",
+        "CLASS lcl_validator IMPLEMENTATION.",
+        "  METHOD check_plant.",
+        "    SELECT SINGLE werks FROM t001w INTO @DATA(lv_werks) WHERE werks = @iv_werks.",
+        "    rv_ok = xsdbool( sy-subrc = 0 ).",
+        "  ENDMETHOD.",
+        "ENDCLASS.",
+        "",
+        "START-OF-SELECTION.",
+    ]
+    lines += [f"  PERFORM process_step_{i}." for i in range(forms)]
+    for i in range(forms):
+        lines.append(f"FORM process_step_{i}.")
+        lines.append(f"  DATA lt_items_{i} TYPE STANDARD TABLE OF mard.")
+        lines.append(f"  SELECT * FROM mard INTO TABLE lt_items_{i} WHERE werks = p_werks AND matnr IN s_matnr.")
+        for j in range(statements):
+            lines.append(f"  LOOP AT lt_items_{i} INTO DATA(ls_item_{j}) WHERE labst > {j}.")
+            lines.append(f"    CALL FUNCTION 'BAPI_GOODSMVT_CREATE' EXPORTING goodsmvt_code = '0{j % 6}'.")
+            lines.append("    IF sy-subrc <> 0. MESSAGE e001(zbench) WITH ls_item_0-matnr. ENDIF.")
+            lines.append("  ENDLOOP.")
+        lines.append("ENDFORM.")
+    return "\n".join(lines) + "\n"
+
+
+def sample_markdown(pages: int = 50) -> str:
+    """A TS of roughly ``pages`` Word pages: headings, prose, lists, tables, code."""
+    paragraph = (
+        "The program selects stock per plant and storage location, validates each material "
+        "against the plant master and posts a goods movement through BAPI_GOODSMVT_CREATE. "
+        "Errors are collected in the application log and shown in an ALV summary at the end."
+    )
+    parts = ["# Technical Specification: ZBENCH_GOODS_MOVEMENT", ""]
+    for page in range(pages):
+        parts += [f"## {page + 1}. Processing step {page + 1}", "", paragraph, "", paragraph, ""]
+        parts += [f"- Check **{name}** for plant `{page:04d}`" for name in ("MARA", "MARC", "MARD", "T001W")]
+        parts += ["", "| Field | Type | Description |", "|---|---|---|"]
+        parts += [f"| FIELD_{i} | CHAR10 | Value {i} of step {page + 1} |" for i in range(8)]
+        parts += ["", "```abap", f"PERFORM process_step_{page}.", "```", "", paragraph, ""]
+    return "\n".join(parts)
+
+
+# -----------------------
+# Benchmarks
+# -----------------------
+
+def bench_rag(rounds: int) -> List[BenchResult]:
+    from app.rag import simple_rag
+
+    simple_rag.warm_up()
+    query = sample_abap()
+    return [
+        bench("rag.get_context_for_abap[cold]", lambda: simple_rag.get_context_for_abap(query), rounds,
+              setup=simple_rag._retrieve.cache_clear),
+        bench("rag.get_context_for_abap[cached]", lambda: simple_rag.get_context_for_abap(query), rounds),
+    ]
+
+
+def bench_prompt(rounds: int) -> List[BenchResult]:
+    from app.agents.ts_fs_agent import TSFSAgent
+    from app.config import settings
+    from app.rag import simple_rag
+    from app.utils.abap_parser import group_units, parse_abap
+
+    simple_rag.warm_up()
+    code = sample_abap()
+    program = parse_abap(code)
+    return [
+        bench("prompt.parse_abap", lambda: parse_abap(code), rounds),
+        bench("prompt.group_units", lambda: group_units(program.units, settings.ABAP_UNIT_CHARS), rounds),
+        bench("prompt.single_messages[cold rag]", lambda: TSFSAgent._single_messages(code, program), rounds,
+              setup=simple_rag._retrieve.cache_clear),
+    ]
+
+
+def bench_docx(rounds: int) -> List[BenchResult]:
+    import tempfile
+    from unittest import mock
+
+    from app.config import settings
+    from app.utils.docx_generator import create_ts_docx
+
+    markdown = sample_markdown()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.docx"
+        for engine in ("ooxml", "python-docx"):
+            with mock.patch.object(settings, "DOCX_ENGINE", engine):
+                results.append(bench(f"docx.create_ts_docx[{engine}]", lambda: create_ts_docx(markdown, path), rounds))
+    return results
+
+
+def bench_store(rounds: int) -> List[BenchResult]:
+    import tempfile
+
+    from app.storage.memory_store import MemoryStore
+    from app.storage.backends.memory import InMemoryBackend
+    from app.storage.backends.sqlite_backend import SQLiteBackend
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, backend in (
+            ("memory", InMemoryBackend(max_jobs=1_000_000, spill_dir=None)),
+            ("sqlite", SQLiteBackend(str(Path(tmp) / "bench.sqlite3"))),
+        ):
+            store = MemoryStore(backend)
+            chat = asyncio.run(store.create_chat("bench", "openai", "gpt-4o-mini", "ts_fs_agent"))
+            for i in range(200):
+                asyncio.run(store.add_message(chat.id, "user" if i % 2 == 0 else "assistant", f"message {i} " * 40))
+            job = asyncio.run(store.create_job(chat.id, "REPORT zbench."))
+            for i in range(200):
+                asyncio.run(store.update_job(job.id, log=f"line {i}"))
+
+            async def update() -> None:
+                await store.update_job(job.id, status="running", metadata={"step": 1}, log="step")
+
+            async def add_message() -> None:
+                await store.add_message(chat.id, "user", "hello " * 40)
+
+            async def create_job() -> None:
+                await store.create_job(chat.id, "REPORT zbench.")
+
+            results += [
+                bench_async(f"store.create_job[{name}]", create_job, rounds),
+                bench_async(f"store.update_job[{name}]", update, rounds),
+                bench_async(f"store.add_message[{name}]", add_message, rounds),
+                bench(f"store.get_job[{name}]", lambda: store.get_job(job.id), rounds),
+                bench(f"store.read_logs[{name}]", lambda: store.read_logs(job.id, 100), rounds),
+                bench(f"store.get_messages[{name}]", lambda: store.get_messages(chat.id, limit=50, newest=True), rounds),
+            ]
+    return results
+
+
+GROUPS: Dict[str, Callable[[int], List[BenchResult]]] = {
+    "rag": bench_rag,
+    "prompt": bench_prompt,
+    "docx": bench_docx,
+    "store": bench_store,
+}
+
+
+def main() -> None:
+    p = parser(__doc__)
+    p.add_argument("groups", nargs="*", help=f"any of {', '.join(GROUPS)} (default: all)")
+    args = p.parse_args()
+    unknown = set(args.groups) - set(GROUPS)
+    if unknown:
+        p.error(f"unknown benchmark groups: {', '.join(sorted(unknown))}")
+    results: List[BenchResult] = []
+    for group in args.groups or GROUPS:
+        results += GROUPS[group](args.rounds)
+    report(results, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,27 @@ Celery application setup for ChatPwC backend.
 
 Celery is used for executing long-running agent jobs (TS/FS generation etc.)
 in the background. Broker/result backend default to Redis.
+
+Jobs spend nearly all their time waiting on LLM streams, so a worker can run
+many at once: with CELERY_WORKER_POOL=threads each pool thread hands its job
+to the process's persistent event loop (``app.utils.event_loop``) and the
+jobs run concurrently there, sharing HTTP connection pools and rate limits.
+CPU work (parsing, DOCX rendering) still shares one GIL, so run about one
+such worker process per core:
+
+    CELERY_WORKER_POOL=threads celery -A celery_app worker --concurrency 50
+
+The prefork pool (the default) runs one job per process.
 """
 
 import os
 from celery import Celery
 
+from app.config import settings
+
+# Pool threads per process: each mostly waits on the shared loop.
+THREADS_DEFAULT_CONCURRENCY = 50
+
 
 def make_celery() -> Celery:
     broker_url = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0")
@@ -20,12 +36,26 @@ def make_celery() -> Celery:
         include=["app.tasks"],  # our Celery tasks live here
     )
 
-    # Optional basic config; extend as needed
+    pool = settings.CELERY_WORKER_POOL.lower()
+    concurrency = settings.CELERY_WORKER_CONCURRENCY
+    if concurrency is None and pool == "threads":
+        concurrency = THREADS_DEFAULT_CONCURRENCY
+
     celery.conf.update(
         task_ignore_result=False,
         task_track_started=True,
         result_expires=3600,
+        worker_pool=pool,
+        worker_prefetch_multiplier=settings.CELERY_PREFETCH_MULTIPLIER,
+        # Acked after the job ran, so a job whose worker died is run again
+        # (tasks skip jobs that already finished).
+        task_acks_late=settings.CELERY_ACKS_LATE,
+        task_reject_on_worker_lost=settings.CELERY_ACKS_LATE,
+        broker_transport_options={"visibility_timeout": settings.CELERY_VISIBILITY_TIMEOUT},
+        task_time_limit=settings.CELERY_TASK_TIME_LIMIT,
     )
+    if concurrency is not None:
+        celery.conf.worker_concurrency = concurrency
 
     return celery
 
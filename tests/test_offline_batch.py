@@ -0,0 +1,94 @@
+"""
+Offline TS batch whose children take different paths: one goes through the
+(fake) provider batch API, the other needs several calls and falls back to
+the online queue. The batch must be finalised whichever child finishes last.
+"""
+
+import os
+import socket
+import tempfile
+import threading
+import time
+
+_STATE_DIR = tempfile.mkdtemp()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+_PORT = _free_port()
+# Settings are read at import time.
+os.environ.update(
+    JOB_EXECUTOR="inprocess",
+    STORAGE_BACKEND="memory",
+    RESULT_CACHE_ENABLED="false",
+    OPENAI_API_KEY="sk-test",
+    OPENAI_BASE_URL=f"http://127.0.0.1:{_PORT}/v1",
+    LLM_BATCH_BACKEND="fake",
+    LLM_BATCH_FAKE_DELAY="0",
+    LLM_BATCH_FLUSH_INTERVAL="0.1",
+    LLM_BATCH_POLL_INTERVAL="0.1",
+    LLM_BATCH_STATE_PATH=os.path.join(_STATE_DIR, "llm_batches.json"),
+    ABAP_SINGLE_PASS_CHARS="200",
+    ABAP_UNIT_CHARS="150",
+)
+
+import pytest  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from benchmarks.fake_llm import FakeLLMConfig, create_app  # noqa: E402
+
+SMALL_SOURCE = "REPORT zsmall.\nSELECT * FROM mara INTO TABLE @DATA(lt_mara).\n"
+LARGE_SOURCE = "REPORT zlarge.\n" + "".join(
+    f"FORM step_{i}.\n  SELECT * FROM mara INTO TABLE @DATA(lt_{i}) UP TO {i + 1} ROWS.\n"
+    f"  LOOP AT lt_{i} INTO DATA(ls_{i}).\n    WRITE ls_{i}-matnr.\n  ENDLOOP.\nENDFORM.\n"
+    for i in range(4)
+)
+
+
+@pytest.fixture(scope="module")
+def client():
+    config = FakeLLMConfig(latency_ms=20, latency_sigma=0, tokens_per_sec=1e5, output_tokens=20)
+    server = uvicorn.Server(uvicorn.Config(create_app(config), port=_PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    with TestClient(app) as test_client:
+        yield test_client
+    server.should_exit = True
+
+
+def test_offline_batch_with_online_fallback_child_is_finalised(client):
+    chat = client.post(
+        "/chat", json={"title": "t", "provider": "openai", "model": "gpt-4o-mini", "agent_id": "ts_fs_agent"}
+    ).json()
+    batch = client.post(
+        f"/batches/{chat['chat_id']}",
+        json={"offline": True, "objects": [
+            {"name": "ZSMALL", "source": SMALL_SOURCE},
+            {"name": "ZLARGE", "source": LARGE_SOURCE},
+        ]},
+    ).json()
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        batch = client.get(f"/batches/{batch['batch_id']}").json()
+        if batch["status"] not in ("queued", "running"):
+            break
+        time.sleep(0.1)
+
+    assert batch["status"] == "completed"
+    assert [item["status"] for item in batch["items"]] == ["completed", "completed"]
+    logs = {
+        item["name"]: client.get(f"/jobs/{item['job_id']}/logs").json()["lines"]
+        for item in batch["items"]
+    }
+    assert any("batch" in line for line in logs["ZSMALL"])
+    assert any("running online" in line for line in logs["ZLARGE"])
+    assert batch["archive_url"]
+    assert client.get(batch["archive_url"]).status_code == 200